@@ -0,0 +1,85 @@
+"""Compare the SentenceSplitter fixed-size path with the native chunker.
+
+Uses the PDFs in ``data/`` when present, otherwise a synthetic corpus built
+by repeating regulatory-style text.
+
+    python -m bench.chunking
+    python -m bench.chunking --synthetic-docs 200 --processes 4
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+
+from llama_index.core.schema import Document
+
+from rag_pipeline.chunkers import FixedSizeChunker, NativeFixedSizeChunker
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+log = logging.getLogger(__name__)
+
+PARAGRAPH = (
+    "The maximum contaminant level for bromate is 0.010 mg/L. Systems using "
+    "ozone must monitor for bromate monthly at the entrance to the "
+    "distribution system. CT values for 3-log Giardia inactivation depend on "
+    "temperature and pH; at 10°C ozone requires about 1.43 mg·min/L. "
+    "Granular activated carbon, anion exchange and high-pressure membranes "
+    "are the best available technologies for PFAS removal.\n\n"
+)
+
+
+def synthetic_corpus(n_docs: int, paragraphs: int = 400) -> list[Document]:
+    return [
+        Document(
+            text=f"Document {i}.\n\n" + PARAGRAPH * paragraphs,
+            metadata={"file_name": f"synthetic-{i}.pdf"},
+        )
+        for i in range(n_docs)
+    ]
+
+
+def load_corpus(data_dir: str, n_docs: int) -> list[Document]:
+    if any(Path(data_dir).glob("*.pdf")):
+        from rag_pipeline.ingest import load_documents
+
+        return load_documents(data_dir)
+    log.info("No PDFs in %s, using %d synthetic documents", data_dir, n_docs)
+    return synthetic_corpus(n_docs)
+
+
+def time_chunker(name: str, chunker, documents: list[Document]) -> float:
+    start = time.perf_counter()
+    nodes = chunker.chunk(documents)
+    elapsed = time.perf_counter() - start
+    chars = sum(len(d.text) for d in documents)
+    print(
+        f"{name:<16} {elapsed:8.2f}s {len(nodes):8d} nodes"
+        f" {chars / elapsed / 1e6:8.2f} Mchar/s"
+    )
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fixed-size chunking")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--synthetic-docs", type=int, default=50)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    documents = load_corpus(args.data_dir, args.synthetic_docs)
+    native = NativeFixedSizeChunker(
+        args.chunk_size, args.chunk_overlap, processes=args.processes
+    )
+    # Build the tokenizer lookup tables outside the timed region.
+    native.chunk(documents[:1])
+
+    baseline = time_chunker(
+        "SentenceSplitter",
+        FixedSizeChunker(args.chunk_size, args.chunk_overlap),
+        documents,
+    )
+    fast = time_chunker("native", native, documents)
+    print(f"speedup: {baseline / fast:.1f}x")
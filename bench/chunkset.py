@@ -0,0 +1,60 @@
+"""Compare memory held by a list of nodes with the same chunks in a ChunkSet.
+
+Chunks a synthetic corpus hierarchically and reports the traced peak while
+chunking plus what stays alive afterwards, which is what ``run_pipeline``
+holds across the three model passes.
+
+    python -m bench.chunkset
+    python -m bench.chunkset --synthetic-docs 50 --strategy fixed
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from bench.chunking import synthetic_corpus
+from rag_pipeline.chunkers import ChunkStrategy, get_chunker
+from rag_pipeline.chunkset import ChunkSet
+
+
+def measure(build) -> tuple[int, float, float]:
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(result), retained / 1e6, peak / 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chunk container memory")
+    parser.add_argument("--synthetic-docs", type=int, default=20)
+    parser.add_argument(
+        "--strategy",
+        type=ChunkStrategy,
+        choices=[ChunkStrategy.FIXED, ChunkStrategy.HIERARCHICAL],
+        default=ChunkStrategy.HIERARCHICAL,
+    )
+    args = parser.parse_args()
+
+    documents = synthetic_corpus(args.synthetic_docs)
+    chunker = get_chunker(args.strategy)
+    # Load tokenizers outside the traced region.
+    chunker.chunk(documents[:1])
+
+    rows = [
+        ("list[BaseNode]", lambda: chunker.chunk(documents)),
+        ("ChunkSet", lambda: ChunkSet.from_documents(chunker, documents)),
+    ]
+    print(f"{'container':<16} {'chunks':>8} {'retained MB':>12} {'peak MB':>10}")
+    results = {}
+    for name, build in rows:
+        n, retained, peak = measure(build)
+        results[name] = (retained, peak)
+        print(f"{name:<16} {n:8d} {retained:12.1f} {peak:10.1f}")
+    (nodes_retained, nodes_peak), (set_retained, set_peak) = results.values()
+    print(
+        f"retained: {nodes_retained / set_retained:.1f}x smaller,"
+        f" peak: {nodes_peak / set_peak:.1f}x smaller"
+    )
@@ -0,0 +1,115 @@
+"""Compare coarse-to-fine and flat retrieval on a hierarchical index.
+
+Builds an in-memory hierarchical index with the offline hash embedder, then
+for every question reports the latency of both searches and the recall of
+coarse-to-fine against the flat top-k over all non-root chunks. Uses the
+PDFs in ``data/`` when present, otherwise a shuffled synthetic corpus.
+
+    python -m bench.coarse_to_fine
+    python -m bench.coarse_to_fine --synthetic-docs 200 --parent-top-k 5
+"""
+
+import argparse
+import random
+import statistics
+import time
+from pathlib import Path
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import Document, QueryBundle
+
+from bench.loadtest import SAMPLE_QUESTIONS, load_requests
+from rag_pipeline.chunkers import HierarchicalChunker
+from rag_pipeline.chunkset import ChunkSet
+from rag_pipeline.offline import HashEmbedding
+from rag_pipeline.retrievers import CoarseToFineRetriever, flat_retrieve, recall
+
+SENTENCES = [
+    "The maximum contaminant level for bromate is {n} mg/L.",
+    "Systems using ozone must monitor bromate monthly at entry point {n}.",
+    "CT values for {n}-log Giardia inactivation depend on temperature and pH.",
+    "Granular activated carbon removes PFAS at removal efficiencies near {n}%.",
+    "Anion exchange resins are regenerated every {n} days in pilot studies.",
+    "Chlorine dioxide residuals above {n} mg/L require daily chlorite sampling.",
+    "Lead service line inventories were due by October {n}.",
+    "Turbidity must stay below {n} NTU in 95% of monthly samples.",
+]
+
+
+def synthetic_corpus(
+    n_docs: int, sentences: int = 600, seed: int = 0
+) -> list[Document]:
+    rng = random.Random(seed)
+    return [
+        Document(
+            text=" ".join(
+                rng.choice(SENTENCES).format(n=rng.randint(1, 999))
+                for _ in range(sentences)
+            ),
+            metadata={"file_name": f"synthetic-{i}.pdf"},
+        )
+        for i in range(n_docs)
+    ]
+
+
+def load_corpus(data_dir: str, n_docs: int) -> list[Document]:
+    if any(Path(data_dir).glob("*.pdf")):
+        from rag_pipeline.ingest import load_documents
+
+        return load_documents(data_dir)
+    return synthetic_corpus(n_docs)
+
+
+def build(
+    documents: list[Document], embed_model: BaseEmbedding
+) -> tuple[VectorStoreIndex, ChunkSet]:
+    chunks = ChunkSet.from_documents(HierarchicalChunker(), documents)
+    index = VectorStoreIndex(nodes=[], embed_model=embed_model)
+    for batch in chunks.iter_nodes():
+        index.insert_nodes(batch)
+    return index, chunks
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark coarse-to-fine retrieval")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--synthetic-docs", type=int, default=40)
+    parser.add_argument("--questions", help="JSONL of questions (default: samples)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--parent-top-k", type=int, nargs="+", default=[1, 3, 10])
+    args = parser.parse_args()
+
+    embed_model = HashEmbedding()
+    index, chunks = build(load_corpus(args.data_dir, args.synthetic_docs), embed_model)
+    depth, _ = chunks.hierarchy()
+    print(f"{len(chunks)} chunks, {int((depth == 0).sum())} roots")
+
+    if args.questions:
+        questions = [p["question"] for p in load_requests(args.questions)]
+    else:
+        questions = SAMPLE_QUESTIONS
+    bundles = [
+        QueryBundle(q, embedding=embed_model.get_query_embedding(q)) for q in questions
+    ]
+    flat = [timed(lambda: flat_retrieve(index, b, args.top_k)) for b in bundles]
+    print(f"{'search':<20} {'median ms':>10} {f'recall@{args.top_k}':>10}")
+    print(f"{'flat':<20} {statistics.median(ms for _, ms in flat):10.1f} {1:10.3f}")
+    for parent_top_k in args.parent_top_k:
+        retriever = CoarseToFineRetriever(
+            index, embed_model, similarity_top_k=args.top_k, parent_top_k=parent_top_k
+        )
+        coarse = [timed(lambda: retriever.retrieve(b)) for b in bundles]
+        median = statistics.median(ms for _, ms in coarse)
+        mean_recall = statistics.mean(
+            recall(c, f) for (c, _), (f, _) in zip(coarse, flat)
+        )
+        print(
+            f"{f'coarse ({parent_top_k} roots)':<20} {median:10.1f} {mean_recall:10.3f}"
+        )
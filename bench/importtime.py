@@ -0,0 +1,96 @@
+"""Enforce an import-time budget for the API and CLI entry points.
+
+Each target is imported in a fresh interpreter under ``-X importtime``. The
+run fails if the median cumulative import time exceeds the target's budget
+or if a module that must stay lazy (llama_index, the Anthropic and Voyage
+SDKs) is imported.
+
+    python -m bench.importtime
+    python -m bench.importtime --repeat 10 --top 15
+"""
+
+import argparse
+import logging
+import re
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+log = logging.getLogger(__name__)
+
+# Cumulative import time budget per module, in milliseconds.
+BUDGETS_MS = {
+    "rag_pipeline.api": 800,
+    "rag_pipeline.query": 150,
+}
+LAZY_PACKAGES = ("llama_index", "anthropic", "voyageai")
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(
+                ImportRecord(module, int(self_us), int(cumulative_us), len(indent) // 2)
+            )
+    return records
+
+
+def measure(module: str) -> list[ImportRecord]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def lazy_violations(records: list[ImportRecord]) -> list[str]:
+    return sorted({r.module.split(".")[0] for r in records} & set(LAZY_PACKAGES))
+
+
+def cumulative_ms(records: list[ImportRecord], module: str) -> float:
+    for r in records:
+        if r.module == module:
+            return r.cumulative_us / 1000
+    raise ValueError(f"{module} not found in importtime output")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check import-time budgets")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Show N slowest imports")
+    args = parser.parse_args()
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        runs = [measure(module) for _ in range(args.repeat)]
+        median = statistics.median(cumulative_ms(r, module) for r in runs)
+        status = "ok" if median <= budget else "OVER BUDGET"
+        print(f"\n{module}: {median:.0f} ms (budget {budget} ms) {status}")
+
+        slowest = sorted(runs[-1], key=lambda r: r.self_us, reverse=True)
+        for r in slowest[: args.top]:
+            print(f"  {r.self_us / 1000:7.1f} ms  {r.module}")
+
+        violations = lazy_violations(runs[-1])
+        if violations:
+            log.error("%s eagerly imports %s", module, ", ".join(violations))
+        failed |= median > budget or bool(violations)
+
+    sys.exit(1 if failed else 0)
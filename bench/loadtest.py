@@ -0,0 +1,344 @@
+"""Load-test the query API and report latency percentiles per variant.
+
+Replays a JSONL file of queries (or generated traffic) against the FastAPI
+app, either in-process or at ``--url``. Open-loop mode sends at a fixed rate
+and measures latency from each request's scheduled start, so queueing
+delay is not hidden when the service falls behind. Closed-loop mode keeps a
+fixed number of requests in flight.
+
+    MOCK_MODE=1 python -m bench.loadtest --rps 50 --duration 30
+    python -m bench.loadtest --file queries.jsonl --concurrency 8 \\
+        --baseline bench/baseline.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import math
+import random
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+log = logging.getLogger(__name__)
+
+REQUEST_FIELDS = ("question", "strategy", "model", "top_k")
+DEFAULT_STRATEGY = "fixed"
+DEFAULT_MODEL = "voyage-3-large"
+STRATEGIES = ["fixed", "semantic", "hierarchical"]
+MODELS = ["voyage-3-large", "voyage-3.5", "voyage-law-2"]
+SAMPLE_QUESTIONS = [
+    "What is the maximum contaminant level (MCL) for bromate?",
+    "What are the best available technologies for PFAS removal?",
+    "What CT value is required for 3-log Giardia inactivation using ozone?",
+    "What disinfection byproducts are regulated under the Stage 1 DBPR?",
+    "How does a sequencing batch reactor treat wastewater?",
+    "What is the purpose of disinfection profiling and benchmarking?",
+    "What are the primary mechanisms by which ozone disinfects water?",
+    "What does the Safe Drinking Water Act regulate?",
+]
+
+PERCENTILES = (50, 95, 99)
+ALL = "all"
+
+
+@dataclass
+class Sample:
+    group: str
+    latency: float
+    ok: bool
+
+
+def load_requests(path: str | Path) -> list[dict[str, Any]]:
+    """Read query payloads from JSONL.
+
+    Lines may be ``QueryRequest`` payloads or eval-set entries with a
+    ``user_input`` field; lines with neither are skipped.
+    """
+    payloads = []
+    for line in Path(path).read_text().splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        if "question" not in row and "user_input" in row:
+            row = {**row, "question": row["user_input"]}
+        if "question" not in row:
+            continue
+        payloads.append({k: row[k] for k in REQUEST_FIELDS if k in row})
+    return payloads
+
+
+def generate_requests(n: int, seed: int = 0) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "question": rng.choice(SAMPLE_QUESTIONS),
+            "strategy": rng.choice(STRATEGIES),
+            "model": rng.choice(MODELS),
+        }
+        for _ in range(n)
+    ]
+
+
+def group_key(payload: dict[str, Any]) -> str:
+    strategy = payload.get("strategy", DEFAULT_STRATEGY)
+    model = payload.get("model", DEFAULT_MODEL)
+    return f"{strategy}_{model}"
+
+
+def make_sender(url: str | None) -> Callable[[dict[str, Any]], bool]:
+    """Return a thread-safe function that POSTs one query and reports success."""
+    local = threading.local()
+    if url is None:
+        from fastapi.testclient import TestClient
+
+        from rag_pipeline.api import app
+
+        def new_client() -> Any:
+            return TestClient(app)
+    else:
+        import httpx
+
+        def new_client() -> Any:
+            return httpx.Client(base_url=url, timeout=120)
+
+    def client() -> Any:
+        if not hasattr(local, "client"):
+            local.client = new_client()
+        return local.client
+
+    def send(payload: dict[str, Any]) -> bool:
+        try:
+            response = client().post("/query", json=payload)
+        except Exception as e:
+            log.debug("Request failed: %s", e)
+            return False
+        return response.status_code == 200
+
+    return send
+
+
+def run_closed_loop(
+    send: Callable[[dict[str, Any]], bool],
+    payloads: list[dict[str, Any]],
+    concurrency: int,
+    total: int,
+) -> tuple[list[Sample], float]:
+    cycle = itertools.cycle(payloads)
+    lock = threading.Lock()
+    remaining = iter(range(total))
+    samples: list[Sample] = []
+
+    def worker() -> None:
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+                payload = next(cycle)
+            start = time.perf_counter()
+            ok = send(payload)
+            latency = time.perf_counter() - start
+            with lock:
+                samples.append(Sample(group_key(payload), latency, ok))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+def run_open_loop(
+    send: Callable[[dict[str, Any]], bool],
+    payloads: list[dict[str, Any]],
+    rps: float,
+    duration: float,
+    max_in_flight: int = 256,
+) -> tuple[list[Sample], float]:
+    total = max(1, int(rps * duration))
+    cycle = itertools.cycle(payloads)
+    samples: list[Sample] = []
+    lock = threading.Lock()
+
+    def fire(payload: dict[str, Any], scheduled: float) -> None:
+        ok = send(payload)
+        latency = time.perf_counter() - scheduled
+        with lock:
+            samples.append(Sample(group_key(payload), latency, ok))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for i in range(total):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(fire, next(cycle), scheduled)
+    return samples, time.perf_counter() - start
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile of ``values`` (0 <= pct <= 100)."""
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    rank = (len(ordered) - 1) * pct / 100
+    lo = int(rank)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+def _group_stats(samples: list[Sample], elapsed: float) -> dict[str, float]:
+    latencies = [s.latency for s in samples if s.ok]
+    errors = sum(not s.ok for s in samples)
+    stats = {
+        "requests": len(samples),
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+    }
+    for pct in PERCENTILES:
+        stats[f"p{pct}_ms"] = percentile(latencies, pct) * 1000
+    return stats
+
+
+def summarize(samples: list[Sample], elapsed: float) -> dict[str, dict[str, float]]:
+    groups: dict[str, list[Sample]] = {}
+    for s in samples:
+        groups.setdefault(s.group, []).append(s)
+    report = {g: _group_stats(groups[g], elapsed) for g in sorted(groups)}
+    report[ALL] = _group_stats(samples, elapsed)
+    return report
+
+
+def compare(
+    report: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    latency_tolerance: float = 0.2,
+    throughput_tolerance: float = 0.2,
+    error_tolerance: float = 0.01,
+) -> list[str]:
+    """Return a description of every regression against ``baseline``.
+
+    A group with no successful requests has NaN percentiles; that counts as
+    a regression unless the baseline had none either.
+    """
+    regressions = []
+    for group, base in baseline.items():
+        current = report.get(group)
+        if current is None:
+            continue
+        for pct in PERCENTILES:
+            key = f"p{pct}_ms"
+            if math.isnan(current[key]):
+                if not math.isnan(base[key]):
+                    regressions.append(
+                        f"{group}: {key} missing, no successful requests"
+                    )
+            elif current[key] > base[key] * (1 + latency_tolerance):
+                regressions.append(
+                    f"{group}: {key} {current[key]:.1f} > {base[key]:.1f}"
+                )
+        if current["error_rate"] > base["error_rate"] + error_tolerance:
+            regressions.append(
+                f"{group}: error_rate {current['error_rate']:.3f}"
+                f" > {base['error_rate']:.3f}"
+            )
+        if current["throughput"] < base["throughput"] * (1 - throughput_tolerance):
+            regressions.append(
+                f"{group}: throughput {current['throughput']:.1f}"
+                f" < {base['throughput']:.1f}"
+            )
+    return regressions
+
+
+def print_report(report: dict[str, dict[str, float]]) -> None:
+    header = ["group", "requests", "err%", "rps", "p50_ms", "p95_ms", "p99_ms"]
+    print("\t".join(header))
+    for group, stats in report.items():
+        row = [
+            group,
+            str(stats["requests"]),
+            f"{stats['error_rate'] * 100:.1f}",
+            f"{stats['throughput']:.1f}",
+        ] + [f"{stats[f'p{pct}_ms']:.1f}" for pct in PERCENTILES]
+        print("\t".join(row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the query API")
+    parser.add_argument(
+        "--url", help="Base URL of a running server (default: in-process)"
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--file", help="JSONL file of query payloads to replay")
+    source.add_argument(
+        "--generate",
+        type=int,
+        default=200,
+        metavar="N",
+        help="Generate N random queries across all variants",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rps", type=float, help="Open loop: requests per second")
+    mode.add_argument(
+        "--concurrency", type=int, default=4, help="Closed loop: requests in flight"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Open loop: seconds to run"
+    )
+    parser.add_argument(
+        "--requests", type=int, help="Closed loop: total requests (default: one pass)"
+    )
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument(
+        "--baseline", help="Fail if the run regresses against this report"
+    )
+    parser.add_argument("--latency-tolerance", type=float, default=0.2)
+    parser.add_argument("--throughput-tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.file:
+        payloads = load_requests(args.file)
+    else:
+        payloads = generate_requests(args.generate, seed=args.seed)
+    if not payloads:
+        log.error("No queries to send")
+        raise SystemExit(1)
+
+    send = make_sender(args.url)
+    if args.rps:
+        log.info("Open loop: %.1f rps for %.0fs", args.rps, args.duration)
+        samples, elapsed = run_open_loop(send, payloads, args.rps, args.duration)
+    else:
+        total = args.requests or len(payloads)
+        log.info("Closed loop: %d requests, concurrency %d", total, args.concurrency)
+        samples, elapsed = run_closed_loop(send, payloads, args.concurrency, total)
+
+    report = summarize(samples, elapsed)
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        log.info("Report written to %s", args.output)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(
+            report,
+            baseline,
+            latency_tolerance=args.latency_tolerance,
+            throughput_tolerance=args.throughput_tolerance,
+        )
+        for r in regressions:
+            log.error("Regression: %s", r)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,207 @@
+"""Bootstrap confidence intervals and paired tests over per-question scores.
+
+``results.json`` is loaded into one array of shape (variant, metric,
+question). Resampling is expressed as matrix products: a (resample,
+question) matrix of multinomial counts turns every variant and metric's
+per-question scores into bootstrap means in a single ``@``, and a matrix of
+random signs does the same for the paired sign-flip test between every
+pair of variants. Missing scores (NaN) are dropped per cell.
+
+    python -m eval.analysis
+    python -m eval.analysis --resamples 20000 --output eval/analysis.json
+"""
+
+import argparse
+import json
+import warnings
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+RESULTS_FILE = Path(__file__).parent / "results.json"
+
+STRATEGIES = ["fixed", "semantic", "hierarchical"]
+MODELS = ["voyage-3-large", "voyage-3.5", "voyage-law-2"]
+METRICS = ["context_precision", "context_recall", "faithfulness", "answer_relevancy"]
+VARIANTS = [f"{s}_{m}" for s in STRATEGIES for m in MODELS]
+
+DEFAULT_RESAMPLES = 10_000
+DEFAULT_LEVEL = 0.95
+DEFAULT_ALPHA = 0.05
+
+
+def score_array(
+    results: dict[str, Any],
+    variants: list[str] = VARIANTS,
+    metrics: list[str] = METRICS,
+) -> np.ndarray:
+    """Per-question scores as (variant, metric, question), NaN where missing."""
+    per_sample = [results.get(v, {}).get("per_sample", {}) for v in variants]
+    n_questions = max(
+        (len(ps.get(m, [])) for ps in per_sample for m in metrics), default=0
+    )
+    scores = np.full((len(variants), len(metrics), n_questions), np.nan)
+    for i, ps in enumerate(per_sample):
+        for j, metric in enumerate(metrics):
+            values = ps.get(metric) or []
+            scores[i, j, : len(values)] = [np.nan if v is None else v for v in values]
+    return scores
+
+
+def _nan_means(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Weighted means over the question axis for each row of ``weights``.
+
+    ``values`` is (..., question) and ``weights`` (k, question); the result
+    is (..., k). NaN values get zero weight.
+    """
+    valid = ~np.isnan(values)
+    sums = np.where(valid, values, 0.0) @ weights.T
+    counts = valid.astype(weights.dtype) @ np.abs(weights).T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def bootstrap_ci(
+    scores: np.ndarray,
+    resamples: int = DEFAULT_RESAMPLES,
+    level: float = DEFAULT_LEVEL,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Mean and percentile bootstrap interval for every (variant, metric).
+
+    Questions are resampled jointly across variants, so intervals of
+    different variants come from the same resampled question sets.
+    """
+    n_questions = scores.shape[-1]
+    rng = np.random.default_rng(seed)
+    counts = rng.multinomial(
+        n_questions, np.full(n_questions, 1 / n_questions), size=resamples
+    ).astype(np.float64)
+    means = _nan_means(scores, counts)
+    tail = (1 - level) / 2
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanquantile(means, [tail, 1 - tail], axis=-1)
+        point = np.nanmean(scores, axis=-1)
+    return point, low, high
+
+
+def paired_test(
+    scores: np.ndarray, resamples: int = DEFAULT_RESAMPLES, seed: int = 0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Paired sign-flip test between every pair of variants.
+
+    Returns the mean per-question difference and a two-sided p-value, both
+    of shape (variant, variant, metric). Only questions scored for both
+    variants count towards a pair.
+    """
+    diff = scores[:, None] - scores[None, :]
+    rng = np.random.default_rng(seed)
+    signs = rng.choice([-1.0, 1.0], size=(resamples, scores.shape[-1]))
+    observed = _nan_means(diff, np.ones((1, scores.shape[-1])))[..., 0]
+    null = _nan_means(diff, signs)
+    # A small tolerance so ties with the observed value count as extreme.
+    extreme = np.abs(null) >= np.abs(observed)[..., None] - 1e-12
+    p_values = (1 + extreme.sum(-1)) / (resamples + 1)
+    p_values[np.isnan(observed)] = np.nan
+    return observed, p_values
+
+
+def holm(p_values: np.ndarray) -> np.ndarray:
+    """Holm-adjust the variant-pair p-values of each metric separately."""
+    n_variants = p_values.shape[0]
+    upper = np.triu_indices(n_variants, 1)
+    pairs = p_values[upper]  # (pair, metric)
+    n_pairs = len(pairs)
+    order = np.argsort(pairs, axis=0)
+    ranked = np.take_along_axis(pairs, order, axis=0)
+    factors = (n_pairs - np.arange(n_pairs))[:, None]
+    adjusted_ranked = np.minimum(np.maximum.accumulate(ranked * factors, axis=0), 1)
+    adjusted = np.empty_like(pairs)
+    np.put_along_axis(adjusted, order, adjusted_ranked, axis=0)
+    out = np.ones_like(p_values)
+    out[upper] = adjusted
+    out[upper[1], upper[0]] = adjusted
+    return out
+
+
+def analyze(
+    results: dict[str, Any],
+    resamples: int = DEFAULT_RESAMPLES,
+    level: float = DEFAULT_LEVEL,
+    seed: int = 0,
+) -> dict[str, Any]:
+    scores = score_array(results)
+    mean, low, high = bootstrap_ci(scores, resamples, level, seed)
+    diff, p_values = paired_test(scores, resamples, seed)
+    return {
+        "variants": VARIANTS,
+        "metrics": METRICS,
+        "n_questions": scores.shape[-1],
+        "level": level,
+        "mean": mean,
+        "low": low,
+        "high": high,
+        "diff": diff,
+        "p": p_values,
+        "p_holm": holm(p_values),
+    }
+
+
+def best_variants(analysis: dict[str, Any]) -> np.ndarray:
+    """Index of the highest-scoring variant for each metric."""
+    mean = np.where(np.isnan(analysis["mean"]), -np.inf, analysis["mean"])
+    return np.argmax(mean, axis=0)
+
+
+def to_json(analysis: dict[str, Any]) -> dict[str, Any]:
+    def clean(value: Any) -> Any:
+        if isinstance(value, np.ndarray):
+            return [clean(v) for v in value.tolist()]
+        if isinstance(value, list):
+            return [clean(v) for v in value]
+        if isinstance(value, float) and np.isnan(value):
+            return None
+        return value
+
+    return {key: clean(value) for key, value in analysis.items()}
+
+
+def print_report(analysis: dict[str, Any], alpha: float = DEFAULT_ALPHA) -> None:
+    level = int(analysis["level"] * 100)
+    print(f"{analysis['n_questions']} questions, {level}% bootstrap intervals")
+    for j, metric in enumerate(analysis["metrics"]):
+        best = best_variants(analysis)[j]
+        print(f"\n{metric} (best: {analysis['variants'][best]})")
+        for i in np.argsort(-np.nan_to_num(analysis["mean"][:, j], nan=-np.inf)):
+            mean = analysis["mean"][i, j]
+            if np.isnan(mean):
+                print(f"  {analysis['variants'][i]:<28} no scores")
+                continue
+            p = analysis["p_holm"][best, i, j]
+            mark = "" if i == best else ("  *" if p < alpha else "")
+            print(
+                f"  {analysis['variants'][i]:<28} {mean:.3f}"
+                f"  [{analysis['low'][i, j]:.3f}, {analysis['high'][i, j]:.3f}]"
+                f"  p={p:.3f}{mark}"
+            )
+    print(f"\n* worse than the best variant at Holm-adjusted p < {alpha}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bootstrap analysis of eval results")
+    parser.add_argument("--results", type=Path, default=RESULTS_FILE)
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument("--level", type=float, default=DEFAULT_LEVEL)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Also write the analysis as JSON")
+    args = parser.parse_args()
+
+    analysis = analyze(
+        json.loads(args.results.read_text()), args.resamples, args.level, args.seed
+    )
+    print_report(analysis)
+    if args.output:
+        args.output.write_text(json.dumps(to_json(analysis), indent=2) + "\n")
+        print(f"\nWrote {args.output}")
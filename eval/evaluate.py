@@ -1,13 +1,27 @@
-"""RAGAS evaluation harness for the 3×3 chunking × embedding matrix."""
+"""RAGAS evaluation harness for the 3×3 chunking × embedding matrix.
+
+Questions come from ``eval/questions.jsonl`` (or any JSONL/Parquet file
+passed as ``--questions-file``). The matrix is split into (variant,
+question range) units that are evaluated by one or more processes and
+merged into ``results.json``; see ``eval.sharding``.
+
+    python -m eval.evaluate
+    python -m eval.evaluate --workers 4
+    python -m eval.evaluate --shard 0/8    # on one machine of eight
+    python -m eval.evaluate --merge        # once all shards finished
+"""
 
 import argparse
 import json
 import logging
 import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
 from pathlib import Path
 from typing import Any, cast
 
-from llama_index.embeddings.voyageai import VoyageEmbedding
 from llama_index.llms.anthropic import Anthropic
 from ragas import EvaluationDataset, SingleTurnSample
 from ragas.dataset_schema import SingleTurnSampleOrMultiTurnSample
@@ -18,107 +32,33 @@ from ragas.metrics._context_recall import LLMContextRecall
 from ragas.metrics._faithfulness import Faithfulness
 from ragas.run_config import RunConfig
 
+from eval.sharding import (
+    DEFAULT_UNIT_SIZE,
+    QUESTIONS_FILE,
+    WorkUnit,
+    load_eval_questions,
+    merge_shards,
+    parse_shard,
+    read_unit,
+    shard_units,
+    shards_dir,
+    split_results,
+    work_units,
+    write_unit,
+)
+from rag_pipeline import llm_cache, postprocessors
 from rag_pipeline.chunkers import ChunkStrategy
-from rag_pipeline.embed import EmbedModelName
+from rag_pipeline.embed import EmbedModelName, get_embed_model
 from rag_pipeline.query import get_query_engine
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 log = logging.getLogger(__name__)
 
 RESULTS_FILE = Path(__file__).parent / "results.json"
+DEFAULT_MAX_WORKERS = 2
 
-EVAL_QUESTIONS = [
-    {
-        "user_input": ("What is the maximum contaminant level (MCL) for bromate?"),
-        "reference": "The MCL for bromate is 0.010 mg/L.",
-    },
-    {
-        "user_input": (
-            "What are the best available technologies"
-            " (BAT) for PFAS removal in drinking water?"
-        ),
-        "reference": (
-            "BAT for PFAS includes granular activated"
-            " carbon (GAC), anion exchange resins, and"
-            " high-pressure membranes such as"
-            " nanofiltration and reverse osmosis."
-        ),
-    },
-    {
-        "user_input": (
-            "What CT value is required for 3-log"
-            " inactivation of Giardia using ozone"
-            " at 10\u00b0C?"
-        ),
-        "reference": (
-            "The CT value for 3-log Giardia"
-            " inactivation with ozone at 10\u00b0C is"
-            " approximately 1.43 mg\u00b7min/L."
-        ),
-    },
-    {
-        "user_input": (
-            "What is the Safe Drinking Water Act (SDWA) and what does it regulate?"
-        ),
-        "reference": (
-            "The SDWA is the federal law that protects"
-            " public drinking water supplies by"
-            " authorizing EPA to set national"
-            " health-based standards for contaminants"
-            " in drinking water."
-        ),
-    },
-    {
-        "user_input": (
-            "What disinfection byproducts are regulated under the Stage 1 DBPR?"
-        ),
-        "reference": (
-            "The Stage 1 DBPR regulates total"
-            " trihalomethanes (TTHM), haloacetic acids"
-            " (HAA5), bromate, and chlorite."
-        ),
-    },
-    {
-        "user_input": ("How does a sequencing batch reactor (SBR) treat wastewater?"),
-        "reference": (
-            "An SBR treats wastewater in a single tank"
-            " through sequential phases: fill, react"
-            " (aeration), settle, decant, and idle."
-        ),
-    },
-    {
-        "user_input": (
-            "What is the purpose of disinfection"
-            " profiling and benchmarking under"
-            " the LT1ESWTR?"
-        ),
-        "reference": (
-            "Disinfection profiling characterizes a"
-            " system's existing disinfection practice"
-            " to ensure that any changes maintain"
-            " adequate microbial inactivation."
-        ),
-    },
-    {
-        "user_input": (
-            "What are the primary mechanisms by which ozone disinfects water?"
-        ),
-        "reference": (
-            "Ozone disinfects through direct oxidation"
-            " by molecular ozone and indirect oxidation"
-            " by hydroxyl radicals produced during"
-            " ozone decomposition."
-        ),
-    },
-]
-
-
-def build_eval_dataset(
-    question_indices: list[int] | None = None,
-) -> EvaluationDataset:
-    questions = EVAL_QUESTIONS
-    if question_indices is not None:
-        questions = [EVAL_QUESTIONS[i] for i in question_indices]
+
+def build_eval_dataset(questions: list[dict[str, str]]) -> EvaluationDataset:
     samples: list[SingleTurnSampleOrMultiTurnSample] = [
         SingleTurnSample(
             user_input=q["user_input"],
@@ -149,115 +89,194 @@ def _save_results(results: dict[str, Any]) -> None:
     log.info("Results written to %s", RESULTS_FILE)
 
 
-def _recalculate_scores(
-    per_sample: dict[str, list[float | None]],
-) -> dict[str, float | None]:
-    scores: dict[str, float | None] = {}
-    for metric, values in per_sample.items():
-        valid = [v for v in values if v is not None]
-        scores[metric] = sum(valid) / len(valid) if valid else None
-    return scores
+def _log_llm_cache_stats() -> None:
+    if os.environ.get(llm_cache.LLM_CACHE_ENV):
+        log.info("LLM cache: %s", llm_cache.stats.summary())
 
 
-def run_evaluation(
+def _log_retrieval_stats() -> None:
+    if any(postprocessors.stats.counts()):
+        log.info("Retrieval: %s", postprocessors.stats.summary())
+
+
+class Evaluator:
+    """RAGAS metrics and judge models, built once per process."""
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self.llm = llm_cache.with_llm_cache(
+            Anthropic(model="claude-haiku-4-5-20251001")
+        )
+        self.embeddings = get_embed_model(EmbedModelName.VOYAGE_3_5)
+        self.metrics = [
+            Faithfulness(),
+            AnswerRelevancy(),
+            ContextPrecision(),
+            LLMContextRecall(),
+        ]
+        self.run_config = RunConfig(
+            max_workers=max_workers, timeout=300, max_retries=15
+        )
+        self._engines: dict[str, Any] = {}
+
+    def query_engine(self, strategy: str, model: str) -> Any:
+        variant = f"{strategy}_{model}"
+        if variant not in self._engines:
+            # Shards are contiguous runs of one variant, so keep only one.
+            self._engines.clear()
+            self._engines[variant] = get_query_engine(
+                ChunkStrategy(strategy), EmbedModelName(model)
+            )
+        return self._engines[variant]
+
+    def evaluate(
+        self, strategy: str, model: str, questions: list[dict[str, str]]
+    ) -> dict[str, Any]:
+        """Per-question scores and samples for ``questions`` on one variant."""
+        dataset = build_eval_dataset(questions)
+        result = ragas_evaluate(
+            query_engine=self.query_engine(strategy, model),
+            dataset=dataset,
+            metrics=self.metrics,
+            llm=self.llm,
+            embeddings=self.embeddings,
+            run_config=self.run_config,
+        )
+        per_sample = {
+            m.name: [_sanitize_for_json(v) for v in result[m.name]]
+            for m in self.metrics
+        }
+        samples = []
+        for sample in dataset.samples:
+            s = cast(SingleTurnSample, sample)
+            samples.append(
+                {
+                    "user_input": s.user_input,
+                    "reference": s.reference,
+                    "response": s.response,
+                    "retrieved_contexts": s.retrieved_contexts,
+                }
+            )
+        return {"per_sample": per_sample, "samples": samples}
+
+
+def run_shard(
+    questions_file: Path = QUESTIONS_FILE,
+    shard: tuple[int, int] = (0, 1),
     *,
+    unit_size: int = DEFAULT_UNIT_SIZE,
     resume: bool = True,
-    question_indices: list[int] | None = None,
-) -> dict[str, Any]:
-    existing = _load_existing_results() if resume or question_indices else {}
-
-    if question_indices is not None and not existing:
-        log.error(
-            "Cannot use --questions without existing results.json to patch into. "
-            "Run a full evaluation first."
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> int:
+    """Evaluate the units of one shard; returns how many were evaluated."""
+    questions = load_eval_questions(questions_file)
+    out_dir = shards_dir(questions, unit_size)
+    units = shard_units(work_units(len(questions), unit_size), *shard)
+    pending = [u for u in units if not (resume and u.path(out_dir).exists())]
+    log.info(
+        "Shard %d/%d: %d of %d units to evaluate",
+        *shard,
+        len(pending),
+        len(units),
+    )
+    if not pending:
+        return 0
+
+    evaluator = Evaluator(max_workers)
+    for unit in pending:
+        log.info("Evaluating %s questions %d-%d", unit.variant, unit.start, unit.stop)
+        data = evaluator.evaluate(
+            unit.strategy, unit.model, questions[unit.start : unit.stop]
         )
-        raise SystemExit(1)
+        write_unit(unit.path(out_dir), {**asdict(unit), **data})
+    _log_llm_cache_stats()
+    _log_retrieval_stats()
+    return len(pending)
 
-    evaluator_llm = Anthropic(model="claude-haiku-4-5-20251001")
-    eval_embeddings = VoyageEmbedding(model_name="voyage-3.5")
-    metrics = [
-        Faithfulness(),
-        AnswerRelevancy(),
-        ContextPrecision(),
-        LLMContextRecall(),
-    ]
 
-    run_config = RunConfig(max_workers=2, timeout=300, max_retries=15)
-
-    results: dict[str, Any] = dict(existing)
-    for strategy in ChunkStrategy:
-        for model in EmbedModelName:
-            variant = f"{strategy.value}_{model.value}"
-
-            if question_indices is None and variant in results:
-                log.info("Skipping %s (already in results file)", variant)
-                continue
-
-            if question_indices is not None and variant not in results:
-                log.warning("Skipping %s (not in results file)", variant)
-                continue
-
-            qi_label = f" (questions {question_indices})" if question_indices else ""
-            log.info("Evaluating %s%s", variant, qi_label)
-
-            dataset = build_eval_dataset(question_indices)
-            query_engine = get_query_engine(strategy, model)
-            result = ragas_evaluate(
-                query_engine=query_engine,
-                dataset=dataset,
-                metrics=metrics,
-                llm=evaluator_llm,
-                embeddings=eval_embeddings,
-                run_config=run_config,
-            )
+def patch_questions(
+    questions_file: Path,
+    question_indices: list[int],
+    *,
+    unit_size: int = DEFAULT_UNIT_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> None:
+    """Re-evaluate specific questions across every evaluated variant."""
+    questions = load_eval_questions(questions_file)
+    if not all(0 <= i < len(questions) for i in question_indices):
+        log.error("Question indices must be in [0, %d)", len(questions))
+        raise SystemExit(1)
+    out_dir = shards_dir(questions, unit_size)
+    by_variant: dict[str, list[WorkUnit]] = {}
+    for unit in work_units(len(questions), unit_size):
+        by_variant.setdefault(unit.variant, []).append(unit)
+
+    evaluator = Evaluator(max_workers)
+    for variant, units in by_variant.items():
+        if not all(u.path(out_dir).exists() for u in units):
+            log.warning("Skipping %s (not fully evaluated)", variant)
+            continue
+        strategy, model = units[0].strategy, units[0].model
+        log.info("Evaluating %s (questions %s)", variant, question_indices)
+        data = evaluator.evaluate(
+            strategy, model, [questions[i] for i in question_indices]
+        )
+        for k, qi in enumerate(question_indices):
+            unit = units[qi // unit_size]
+            stored = read_unit(unit.path(out_dir))
+            for metric, values in data["per_sample"].items():
+                stored["per_sample"][metric][qi - unit.start] = values[k]
+            stored["samples"][qi - unit.start] = data["samples"][k]
+            write_unit(unit.path(out_dir), stored)
+    _log_llm_cache_stats()
+    _log_retrieval_stats()
 
-            if question_indices is not None:
-                # Patch mode: merge new scores into existing results
-                variant_data = results[variant]
-                for m in metrics:
-                    new_scores = [_sanitize_for_json(v) for v in result[m.name]]
-                    for k, qi in enumerate(question_indices):
-                        variant_data["per_sample"][m.name][qi] = new_scores[k]
-                    variant_data["scores"] = _recalculate_scores(
-                        variant_data["per_sample"]
-                    )
-
-                for k, qi in enumerate(question_indices):
-                    s = cast(SingleTurnSample, dataset.samples[k])
-                    variant_data["samples"][qi] = {
-                        "user_input": s.user_input,
-                        "reference": s.reference,
-                        "response": s.response,
-                        "retrieved_contexts": s.retrieved_contexts,
-                    }
-            else:
-                # Full mode: write all scores
-                per_sample = {}
-                for m in metrics:
-                    raw = [_sanitize_for_json(v) for v in result[m.name]]
-                    per_sample[m.name] = raw
-
-                samples = []
-                for sample in dataset.samples:
-                    s = cast(SingleTurnSample, sample)
-                    samples.append(
-                        {
-                            "user_input": s.user_input,
-                            "reference": s.reference,
-                            "response": s.response,
-                            "retrieved_contexts": s.retrieved_contexts,
-                        }
-                    )
-
-                results[variant] = {
-                    "scores": _recalculate_scores(per_sample),
-                    "per_sample": per_sample,
-                    "samples": samples,
-                }
 
-            log.info("  %s", results[variant]["scores"])
-            _save_results(results)
+def run_evaluation(
+    *,
+    questions_file: Path = QUESTIONS_FILE,
+    resume: bool = True,
+    question_indices: list[int] | None = None,
+    workers: int = 1,
+    unit_size: int = DEFAULT_UNIT_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> dict[str, Any]:
+    questions = load_eval_questions(questions_file)
+    out_dir = shards_dir(questions, unit_size)
+    if resume:
+        # Carry over variants from a results.json written before sharding.
+        split_results(_load_existing_results(), questions, out_dir, unit_size)
 
+    if question_indices is not None:
+        patch_questions(
+            questions_file,
+            question_indices,
+            unit_size=unit_size,
+            max_workers=max_workers,
+        )
+    elif workers == 1:
+        run_shard(
+            questions_file, unit_size=unit_size, resume=resume, max_workers=max_workers
+        )
+    else:
+        # Spawn rather than fork: the parent may already hold client threads.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(
+                    run_shard,
+                    questions_file,
+                    (i, workers),
+                    unit_size=unit_size,
+                    resume=resume,
+                    max_workers=max_workers,
+                )
+                for i in range(workers)
+            ]
+            for future in futures:
+                future.result()
+
+    results = merge_shards(out_dir, len(questions))
+    _save_results(results)
     return results
 
 
@@ -280,7 +299,32 @@ def print_results(results: dict[str, Any]) -> None:
 
 
 if __name__ == "__main__":
+
+    def shard_arg(value: str) -> tuple[int, int]:
+        try:
+            return parse_shard(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e)) from None
+
     parser = argparse.ArgumentParser(description="Run RAGAS evaluation")
+    parser.add_argument(
+        "--questions-file",
+        type=Path,
+        default=QUESTIONS_FILE,
+        help="JSONL or Parquet with user_input and reference fields",
+    )
+    parser.add_argument(
+        "--unit-size",
+        type=int,
+        default=DEFAULT_UNIT_SIZE,
+        help="Questions per work unit",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Concurrent RAGAS jobs per process",
+    )
     group = parser.add_mutually_exclusive_group()
     group.add_argument(
         "--fresh",
@@ -294,11 +338,59 @@ if __name__ == "__main__":
         metavar="IDX",
         help="Re-evaluate specific questions (0-indexed) across all variants",
     )
-    args = parser.parse_args()
-
-    results = run_evaluation(
-        resume=not args.fresh,
-        question_indices=args.questions,
+    parser.add_argument(
+        "--llm-cache",
+        type=Path,
+        metavar="PATH",
+        help="Reuse Claude responses from this SQLite file (sets RAG_LLM_CACHE)",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Evaluate the matrix in this many processes, then merge",
     )
+    mode.add_argument(
+        "--shard",
+        type=shard_arg,
+        metavar="I/N",
+        help="Only evaluate shard I of N (0-indexed) and skip the merge",
+    )
+    mode.add_argument(
+        "--merge",
+        action="store_true",
+        help="Only merge finished shards into results.json",
+    )
+    args = parser.parse_args()
+    if args.questions and (args.shard or args.merge or args.workers > 1):
+        parser.error("--questions patches in a single process")
+    if args.llm_cache:
+        # Through the environment so spawned workers and get_llm see it too.
+        os.environ[llm_cache.LLM_CACHE_ENV] = str(args.llm_cache)
+
+    if args.shard:
+        run_shard(
+            args.questions_file,
+            args.shard,
+            unit_size=args.unit_size,
+            resume=not args.fresh,
+            max_workers=args.max_workers,
+        )
+        raise SystemExit(0)
+
+    if args.merge:
+        questions = load_eval_questions(args.questions_file)
+        results = merge_shards(shards_dir(questions, args.unit_size), len(questions))
+        _save_results(results)
+    else:
+        results = run_evaluation(
+            questions_file=args.questions_file,
+            resume=not args.fresh,
+            question_indices=args.questions,
+            workers=args.workers,
+            unit_size=args.unit_size,
+            max_workers=args.max_workers,
+        )
     print("\n--- Results ---")
     print_results(results)
@@ -0,0 +1,208 @@
+"""Question sets and sharded work units for the eval matrix.
+
+The eval is split into units of (variant, question range). Each unit's
+scores are written to their own file under ``eval/shards/<question set>/``,
+so any number of processes can work through disjoint shards of the unit
+list, a run that dies resumes where it stopped, and ``merge_shards``
+rebuilds ``results.json`` from the unit files in a fixed order regardless
+of which process finished first.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+from eval.analysis import MODELS, STRATEGIES
+
+log = logging.getLogger(__name__)
+
+QUESTIONS_FILE = Path(__file__).parent / "questions.jsonl"
+SHARDS_DIR = Path(__file__).parent / "shards"
+DEFAULT_UNIT_SIZE = 50
+
+
+def load_eval_questions(path: str | Path = QUESTIONS_FILE) -> list[dict[str, str]]:
+    """Questions with references from JSONL or Parquet.
+
+    Rows need ``user_input`` (or ``question``) and ``reference`` fields.
+    """
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        rows = pq.read_table(path).to_pylist()
+    else:
+        with path.open() as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [
+        {
+            "user_input": row.get("user_input") or row["question"],
+            "reference": row["reference"],
+        }
+        for row in rows
+    ]
+
+
+def question_set_key(questions: list[dict[str, str]]) -> str:
+    """Stable key for a question set, so shards of different sets never mix."""
+    digest = hashlib.sha256()
+    for q in questions:
+        digest.update(json.dumps(q, sort_keys=True).encode())
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+def shards_dir(
+    questions: list[dict[str, str]], unit_size: int, root: Path = SHARDS_DIR
+) -> Path:
+    """Unit files for one question set split at one unit size."""
+    return root / f"{question_set_key(questions)}-{unit_size}"
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    strategy: str
+    model: str
+    start: int
+    stop: int
+
+    @property
+    def variant(self) -> str:
+        return f"{self.strategy}_{self.model}"
+
+    def path(self, shards_dir: Path) -> Path:
+        return shards_dir / self.variant / f"{self.start:06d}-{self.stop:06d}.json"
+
+
+def work_units(n_questions: int, unit_size: int = DEFAULT_UNIT_SIZE) -> list[WorkUnit]:
+    """Every (variant, question range), variant-major."""
+    return [
+        WorkUnit(strategy, model, start, min(start + unit_size, n_questions))
+        for strategy in STRATEGIES
+        for model in MODELS
+        for start in range(0, n_questions, unit_size)
+    ]
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse ``i/n`` (0-indexed) as used by ``--shard``."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Expected a shard as i/n, got {value!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in [0, {count}), got {value!r}")
+    return index, count
+
+
+def shard_units(units: list[WorkUnit], index: int, count: int) -> list[WorkUnit]:
+    """A contiguous slice of ``units``.
+
+    Contiguous rather than round-robin, so a shard covers as few variants as
+    possible and builds as few query engines.
+    """
+    return units[index * len(units) // count : (index + 1) * len(units) // count]
+
+
+def write_unit(path: Path, data: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data) + "\n")
+    os.replace(tmp, path)
+
+
+def read_unit(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def _recalculate_scores(
+    per_sample: dict[str, list[float | None]],
+) -> dict[str, float | None]:
+    scores: dict[str, float | None] = {}
+    for metric, values in per_sample.items():
+        valid = [v for v in values if v is not None]
+        scores[metric] = sum(valid) / len(valid) if valid else None
+    return scores
+
+
+def merge_shards(shards_dir: Path, n_questions: int) -> dict[str, Any]:
+    """Combine unit files into the ``results.json`` layout.
+
+    Variants come out in matrix order and samples in question order. A
+    variant whose units do not cover every question is left out with a
+    warning.
+    """
+    results: dict[str, Any] = {}
+    for strategy in STRATEGIES:
+        for model in MODELS:
+            variant = f"{strategy}_{model}"
+            units = sorted(
+                (read_unit(p) for p in (shards_dir / variant).glob("*.json")),
+                key=lambda u: u["start"],
+            )
+            covered = 0
+            for unit in units:
+                if unit["start"] != covered:
+                    break
+                covered = unit["stop"]
+            if covered != n_questions:
+                if units:
+                    log.warning(
+                        "Skipping %s: questions %d-%d not evaluated",
+                        variant,
+                        covered,
+                        n_questions,
+                    )
+                continue
+
+            per_sample: dict[str, list[float | None]] = {}
+            samples: list[dict[str, Any]] = []
+            for unit in units:
+                for metric, values in unit["per_sample"].items():
+                    per_sample.setdefault(metric, []).extend(values)
+                samples.extend(unit["samples"])
+            results[variant] = {
+                "scores": _recalculate_scores(per_sample),
+                "per_sample": per_sample,
+                "samples": samples,
+            }
+    return results
+
+
+def split_results(
+    results: dict[str, Any],
+    questions: list[dict[str, str]],
+    out_dir: Path,
+    unit_size: int = DEFAULT_UNIT_SIZE,
+) -> None:
+    """Write unit files for variants of an existing ``results.json``.
+
+    Only variants evaluated on exactly ``questions`` and with no unit files
+    yet are split, so scores from an unsharded run are not evaluated again.
+    """
+    inputs = [q["user_input"] for q in questions]
+    units: dict[str, list[WorkUnit]] = {}
+    for unit in work_units(len(questions), unit_size):
+        units.setdefault(unit.variant, []).append(unit)
+    for variant, variant_units in units.items():
+        data = results.get(variant)
+        if data is None or any((out_dir / variant).glob("*.json")):
+            continue
+        if [s["user_input"] for s in data.get("samples", [])] != inputs:
+            continue
+        for unit in variant_units:
+            write_unit(
+                unit.path(out_dir),
+                {
+                    **asdict(unit),
+                    "per_sample": {
+                        metric: values[unit.start : unit.stop]
+                        for metric, values in data["per_sample"].items()
+                    },
+                    "samples": data["samples"][unit.start : unit.stop],
+                },
+            )
@@ -1,17 +1,31 @@
-"""Generate heatmaps from RAGAS evaluation results."""
+"""Generate heatmaps from RAGAS evaluation results.
+
+Each cell shows the mean score with its bootstrap confidence interval from
+``eval.analysis``. The best variant per metric has a solid outline and
+variants not significantly worse than it (Holm-adjusted paired test) a
+dashed one.
+"""
 
 import json
 from pathlib import Path
+from typing import Any
 
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.patches import Rectangle
+
+from eval.analysis import (
+    DEFAULT_ALPHA,
+    METRICS,
+    MODELS,
+    RESULTS_FILE,
+    STRATEGIES,
+    analyze,
+    best_variants,
+)
 
-RESULTS_FILE = Path(__file__).parent / "results.json"
 FIGURES_DIR = Path(__file__).parent / "figures"
 
-STRATEGIES = ["fixed", "semantic", "hierarchical"]
-MODELS = ["voyage-3-large", "voyage-3.5", "voyage-law-2"]
-METRICS = ["context_precision", "context_recall", "faithfulness", "answer_relevancy"]
 METRIC_LABELS = {
     "context_precision": "Context Precision",
     "context_recall": "Context Recall",
@@ -35,7 +49,69 @@ def build_matrix(results: dict, metric: str) -> np.ndarray:
     return matrix
 
 
-def plot_heatmap(matrix: np.ndarray, metric: str, output_path: Path) -> None:
+def grid(values: np.ndarray) -> np.ndarray:
+    """Reshape a per-variant vector to the strategies × models grid."""
+    return values.reshape(len(STRATEGIES), len(MODELS))
+
+
+def annotate(
+    ax: Any,
+    matrix: np.ndarray,
+    analysis: dict[str, Any] | None,
+    metric: str,
+) -> None:
+    j = METRICS.index(metric)
+    if analysis is not None:
+        low, high = grid(analysis["low"][:, j]), grid(analysis["high"][:, j])
+        best = best_variants(analysis)[j]
+        p_vs_best = grid(analysis["p_holm"][best, :, j])
+
+    for i in range(len(STRATEGIES)):
+        for k in range(len(MODELS)):
+            val = matrix[i, k]
+            if np.isnan(val):
+                continue
+            color = "white" if val < 0.5 else "black"
+            label = f"{val:.3f}"
+            if analysis is not None:
+                label += f"\n[{low[i, k]:.2f}, {high[i, k]:.2f}]"
+            ax.text(
+                k,
+                i,
+                label,
+                ha="center",
+                va="center",
+                fontsize=10,
+                color=color,
+                fontweight="bold",
+            )
+            if analysis is None:
+                continue
+            if i * len(MODELS) + k == best:
+                style = "solid"
+            elif p_vs_best[i, k] >= DEFAULT_ALPHA:
+                style = "dashed"
+            else:
+                continue
+            ax.add_patch(
+                Rectangle(
+                    (k - 0.48, i - 0.48),
+                    0.96,
+                    0.96,
+                    fill=False,
+                    edgecolor="black",
+                    linewidth=1.5,
+                    linestyle=style,
+                )
+            )
+
+
+def plot_heatmap(
+    matrix: np.ndarray,
+    metric: str,
+    output_path: Path,
+    analysis: dict[str, Any] | None = None,
+) -> None:
     fig, ax = plt.subplots(figsize=(6, 4))
 
     im = ax.imshow(matrix, cmap="YlGn", vmin=0, vmax=1, aspect="auto")
@@ -48,21 +124,7 @@ def plot_heatmap(matrix: np.ndarray, metric: str, output_path: Path) -> None:
     ax.set_ylabel("Chunking Strategy", fontsize=10)
     ax.set_title(METRIC_LABELS[metric], fontsize=12, fontweight="bold")
 
-    for i in range(len(STRATEGIES)):
-        for j in range(len(MODELS)):
-            val = matrix[i, j]
-            if not np.isnan(val):
-                color = "white" if val < 0.5 else "black"
-                ax.text(
-                    j,
-                    i,
-                    f"{val:.3f}",
-                    ha="center",
-                    va="center",
-                    fontsize=11,
-                    color=color,
-                    fontweight="bold",
-                )
+    annotate(ax, matrix, analysis, metric)
 
     fig.colorbar(im, ax=ax, shrink=0.8)
     fig.tight_layout()
@@ -70,7 +132,9 @@ def plot_heatmap(matrix: np.ndarray, metric: str, output_path: Path) -> None:
     plt.close(fig)
 
 
-def plot_combined(results: dict, output_path: Path) -> None:
+def plot_combined(
+    results: dict, output_path: Path, analysis: dict[str, Any] | None = None
+) -> None:
     """Single figure with all 4 metrics as subplots."""
     fig, axes = plt.subplots(2, 2, figsize=(13, 9))
 
@@ -84,32 +148,30 @@ def plot_combined(results: dict, output_path: Path) -> None:
         ax.set_yticklabels(STRATEGIES, fontsize=9)
         ax.set_title(METRIC_LABELS[metric], fontsize=12, fontweight="bold", pad=10)
 
-        for i in range(len(STRATEGIES)):
-            for j in range(len(MODELS)):
-                val = matrix[i, j]
-                if not np.isnan(val):
-                    color = "white" if val < 0.5 else "black"
-                    ax.text(
-                        j,
-                        i,
-                        f"{val:.3f}",
-                        ha="center",
-                        va="center",
-                        fontsize=11,
-                        color=color,
-                        fontweight="bold",
-                    )
+        annotate(ax, matrix, analysis, metric)
 
     fig.suptitle(
         "RAGAS Evaluation: Chunking Strategy \u00d7 Embedding Model",
         fontsize=14,
         fontweight="bold",
     )
+    n_questions = max(
+        len(v) for data in results.values() for v in data["per_sample"].values()
+    )
+    note = (
+        f"{n_questions} EPA regulatory questions evaluated per variant."
+        " Sonnet 4.5 generates, Haiku 4.5 evaluates."
+    )
+    if analysis is not None:
+        level = int(analysis["level"] * 100)
+        note += (
+            f" Brackets: {level}% bootstrap CI. Solid outline: best;"
+            f" dashed: not significantly worse (Holm p \u2265 {DEFAULT_ALPHA})."
+        )
     fig.text(
         0.5,
         0.01,
-        "8 EPA regulatory questions evaluated per variant."
-        " Sonnet 4.5 generates, Haiku 4.5 evaluates.",
+        note,
         ha="center",
         fontsize=9,
         color="#555555",
@@ -123,14 +185,15 @@ def plot_combined(results: dict, output_path: Path) -> None:
 
 if __name__ == "__main__":
     results = load_results()
+    analysis = analyze(results)
     FIGURES_DIR.mkdir(exist_ok=True)
 
     for metric in METRICS:
         matrix = build_matrix(results, metric)
         path = FIGURES_DIR / f"{metric}.png"
-        plot_heatmap(matrix, metric, path)
+        plot_heatmap(matrix, metric, path, analysis)
         print(f"  {path}")
 
     combined_path = FIGURES_DIR / "evaluation_matrix.png"
-    plot_combined(results, combined_path)
+    plot_combined(results, combined_path, analysis)
     print(f"  {combined_path}")
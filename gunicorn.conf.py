@@ -0,0 +1,27 @@
+"""Production serving: ``gunicorn -c gunicorn.conf.py rag_pipeline.api:app``.
+
+The app module is imported once in the master and forked, so workers share
+the FastAPI and pydantic imports and the settings read from the environment,
+and an import error or bad setting stops the master before any worker
+starts. The import is light and opens no threads or connections, so the
+fork is cheap and safe. llama_index and the SDKs are imported on first use,
+which means each worker loads them itself while it warms every variant in
+the background after the fork; it reports ready on ``/ready`` when done.
+Query embeddings go through one SQLite cache file shared by all workers.
+Document ingestion is not shared: each worker has its own queue and
+threads, so ``RAG_INGEST_WORKERS`` and ``RAG_INGEST_QUEUE`` apply per worker.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+os.environ.setdefault("RAG_WARMUP", "1")
+os.environ.setdefault("RAG_CACHE_PATH", "/tmp/rag-pipeline/cache.sqlite")
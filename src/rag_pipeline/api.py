@@ -1,15 +1,90 @@
+import logging
 import os
+import threading
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 
 from rag_pipeline.chunkers import ChunkStrategy
+from rag_pipeline.coalesce import SingleFlight, key_fields_from_env, request_key
 from rag_pipeline.embed import EmbedModelName
-from rag_pipeline.query import get_query_engine, query
-from rag_pipeline.schemas import QueryRequest, QueryResponse, Source
+from rag_pipeline.env import load_env
+from rag_pipeline.ingestion import (
+    ALLOWED_EXTS,
+    MAX_UPLOAD_BYTES,
+    RETRY_AFTER_SECONDS,
+    IngestionService,
+    QueryPressure,
+    QueueFull,
+    data_dir,
+    default_service,
+)
+from rag_pipeline.profiling import MODES, PROFILE_DIR_ENV, Profile, ProfilerBusy
+from rag_pipeline.query import (
+    MIN_SCORE_ENV,
+    NO_CONTEXT_ANSWER,
+    get_query_engine,
+    query,
+    warmup,
+)
+from rag_pipeline.schemas import JobResponse, QueryRequest, QueryResponse, Source
+
+load_env()
 
 MOCK_MODE = os.environ.get("MOCK_MODE", "").lower() in ("1", "true", "yes")
+WARMUP = os.environ.get("RAG_WARMUP", "").lower() in ("1", "true", "yes")
+# Requests may ask for a profile with X-Profile only when this is set.
+PROFILE_DIR = os.environ.get(PROFILE_DIR_ENV)
+# Fields identifying identical /query requests, or None to run each alone.
+COALESCE_KEY = key_fields_from_env()
+# Queries whose best chunk scores below this are answered without the LLM.
+MIN_SCORE = float(os.environ[MIN_SCORE_ENV]) if os.environ.get(MIN_SCORE_ENV) else None
+
+log = logging.getLogger(__name__)
+
+ready = threading.Event()
+# In-flight /query requests; ingestion workers wait for them between batches.
+query_pressure = QueryPressure()
+query_flights = SingleFlight()
+
+_ingestion: IngestionService | None = None
+_ingestion_lock = threading.Lock()
+_submit_lock = threading.Lock()
+
+
+def get_ingestion() -> IngestionService:
+    global _ingestion
+    with _ingestion_lock:
+        if _ingestion is None:
+            _ingestion = default_service(query_pressure)
+    return _ingestion
+
+
+def _warm() -> None:
+    try:
+        warmup()
+    except Exception:
+        log.exception("Warmup failed; staying not ready")
+        return
+    ready.set()
+    log.info("Warmup complete")
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Warm in the background so /health answers while variants load.
+    if WARMUP and not MOCK_MODE:
+        threading.Thread(target=_warm, name="warmup", daemon=True).start()
+    else:
+        ready.set()
+    yield
 
-app = FastAPI(title="rag-pipeline")
+
+app = FastAPI(title="rag-pipeline", lifespan=lifespan)
 
 
 @app.get("/health")
@@ -17,6 +92,13 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def readiness() -> dict[str, str]:
+    if not ready.is_set():
+        raise HTTPException(status_code=503, detail="warming up")
+    return {"status": "ready"}
+
+
 @app.get("/strategies")
 def strategies() -> list[str]:
     return [s.value for s in ChunkStrategy]
@@ -30,13 +112,66 @@ def models() -> list[str]:
 MOCK_RESPONSE = QueryResponse(
     answer="[mock] The maximum contaminant level for bromate is 0.010 mg/L.",
     sources=[
-        Source(text="[mock] 40 CFR 141.64 — MCLs for disinfection byproducts.", score=0.95)
+        Source(
+            text="[mock] 40 CFR 141.64 — MCLs for disinfection byproducts.", score=0.95
+        )
     ],
 )
 
 
+@app.get("/stats")
+def stats() -> dict[str, dict[str, int] | str]:
+    """Request coalescing and adaptive retrieval counts for this worker."""
+    from rag_pipeline import postprocessors
+
+    return {
+        "coalescing": query_flights.stats(),
+        "retrieval": postprocessors.stats.summary(),
+    }
+
+
 @app.post("/query")
-def handle_query(req: QueryRequest) -> QueryResponse:
+async def handle_query(
+    req: QueryRequest,
+    response: Response,
+    x_profile: str | None = Header(default=None),
+) -> QueryResponse:
+    # Answering blocks, so it runs on the threadpool; a coalesced request
+    # awaits the leader's answer without taking a thread of its own.
+    if not (PROFILE_DIR and x_profile):
+        if COALESCE_KEY is None:
+            return await run_in_threadpool(_answer, req)
+        return await query_flights.ado(
+            request_key(req, COALESCE_KEY), lambda: run_in_threadpool(_answer, req)
+        )
+    return await run_in_threadpool(_profiled_answer, req, response, x_profile)
+
+
+def _profiled_answer(
+    req: QueryRequest, response: Response, x_profile: str
+) -> QueryResponse:
+    mode = "sample" if x_profile.lower() in ("1", "true", "yes") else x_profile
+    if mode not in MODES:
+        raise HTTPException(
+            status_code=400, detail=f"X-Profile must be 1 or one of {list(MODES)}"
+        )
+    profile_id = uuid.uuid4().hex[:12]
+    profile = Profile(mode, all_threads=False)
+    try:
+        profile.start()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    try:
+        result = _answer(req)
+    finally:
+        profile.stop()
+    profile.write(f"{PROFILE_DIR}/query-{profile_id}")
+    response.headers["Server-Timing"] = profile.server_timing()
+    response.headers["X-Profile-Id"] = profile_id
+    return result
+
+
+def _answer(req: QueryRequest) -> QueryResponse:
     if MOCK_MODE:
         return MOCK_RESPONSE
 
@@ -45,8 +180,17 @@ def handle_query(req: QueryRequest) -> QueryResponse:
         model = EmbedModelName(req.model)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e)) from e
-    engine = get_query_engine(strategy, model, similarity_top_k=req.top_k)
-    response = query(engine, req.question)
+    with query_pressure.query():
+        engine = get_query_engine(
+            strategy,
+            model,
+            similarity_top_k=req.top_k,
+            adaptive=req.adaptive,
+            min_score=MIN_SCORE,
+        )
+        response = query(engine, req.question)
+    if not response.source_nodes:
+        return QueryResponse(answer=NO_CONTEXT_ANSWER, sources=[])
     sources = [
         Source(
             text=node.get_content()[:500],
@@ -55,3 +199,98 @@ def handle_query(req: QueryRequest) -> QueryResponse:
         for node in response.source_nodes
     ]
     return QueryResponse(answer=str(response), sources=sources)
+
+
+def _too_busy() -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="ingestion queue is full",
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def _submit_upload(
+    service: IngestionService,
+    tmp: Path,
+    path: Path,
+    strategies: list[ChunkStrategy],
+    models: list[EmbedModelName],
+) -> dict:
+    with _submit_lock:
+        if service.full():
+            raise _too_busy()
+        os.replace(tmp, path)
+        try:
+            return service.submit(path, strategies, models)
+        except QueueFull:
+            raise _too_busy() from None
+
+
+@app.post("/documents", status_code=202)
+async def upload_document(
+    request: Request,
+    response: Response,
+    filename: str,
+    strategy: list[str] | None = Query(default=None),
+    model: list[str] | None = Query(default=None),
+) -> JobResponse:
+    """Save the request body as ``filename`` and queue it for ingestion.
+
+    Defaults to every strategy and model; repeat ``strategy`` or ``model``
+    to pick variants.
+    """
+    if MOCK_MODE:
+        raise HTTPException(status_code=503, detail="ingestion is off in mock mode")
+    name = Path(filename).name
+    if Path(name).suffix.lower() not in ALLOWED_EXTS:
+        raise HTTPException(
+            status_code=415, detail=f"filename must end in one of {ALLOWED_EXTS}"
+        )
+    try:
+        strategies = (
+            [ChunkStrategy(s) for s in strategy] if strategy else list(ChunkStrategy)
+        )
+        models = [EmbedModelName(m) for m in model] if model else list(EmbedModelName)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e)) from e
+
+    # File and SQLite I/O runs on the threadpool so an upload never stalls
+    # the event loop serving other requests.
+    service = await run_in_threadpool(get_ingestion)
+    # Refuse before reading the body, so a burst costs no upload bandwidth.
+    if service.full():
+        raise _too_busy()
+    if int(request.headers.get("content-length") or 0) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="upload too large")
+
+    path = data_dir() / name
+    tmp = path.with_name(f".{name}.{uuid.uuid4().hex}.tmp")
+    try:
+        await run_in_threadpool(path.parent.mkdir, parents=True, exist_ok=True)
+        size = 0
+        f = await run_in_threadpool(tmp.open, "wb")
+        try:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="upload too large")
+                await run_in_threadpool(f.write, chunk)
+        finally:
+            await run_in_threadpool(f.close)
+        if not size:
+            raise HTTPException(status_code=400, detail="empty upload")
+        job = await run_in_threadpool(
+            _submit_upload, service, tmp, path, strategies, models
+        )
+    finally:
+        await run_in_threadpool(tmp.unlink, missing_ok=True)
+    response.headers["Location"] = f"/jobs/{job['id']}"
+    return JobResponse(**job)
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str) -> JobResponse:
+    job = get_ingestion().jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="no such job")
+    return JobResponse(**job)
@@ -0,0 +1,110 @@
+"""Versioned chunk artifacts on disk.
+
+Each strategy's ``ChunkSet`` is written as an Arrow IPC file whose name is a
+key over the artifact format version, the chunker class and its params, and
+a hash of the raw corpus files. Loading memory-maps the file, so indexing
+pages chunk text in from disk, and a failed model pass can be re-run (here
+or on another machine with the same corpus) without chunking again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+import pyarrow as pa
+
+from rag_pipeline.chunkset import ChunkSet
+
+if TYPE_CHECKING:
+    from rag_pipeline.chunkers import Chunker, ChunkStrategy
+
+# Bump when the file layout or ChunkSet semantics change.
+ARTIFACT_VERSION = 1
+DEFAULT_ARTIFACTS_DIR = "artifacts"
+_SCHEMA_KEY = b"rag_pipeline"
+_INT_COLUMNS = ("parent", "doc", "start_char", "end_char", "meta")
+
+
+def corpus_hash(
+    data_dir: str | Path, required_exts: tuple[str, ...] = (".pdf",)
+) -> str:
+    """Hash of file names and contents, computed without parsing anything."""
+    data_dir = Path(data_dir)
+    digest = hashlib.sha256()
+    for path in sorted(data_dir.iterdir()):
+        if path.is_file() and path.suffix.lower() in required_exts:
+            with path.open("rb") as f:
+                file_digest = hashlib.file_digest(f, "sha256").hexdigest()
+            digest.update(f"{path.name}\0{file_digest}\n".encode())
+    return digest.hexdigest()
+
+
+def artifact_key(strategy: ChunkStrategy, chunker: Chunker, corpus: str) -> str:
+    spec = {
+        "version": ARTIFACT_VERSION,
+        "strategy": strategy.value,
+        "chunker": type(chunker).__name__,
+        "params": chunker.params,
+        "corpus": corpus,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def artifact_path(artifacts_dir: str | Path, strategy: ChunkStrategy, key: str) -> Path:
+    return Path(artifacts_dir) / f"{strategy.value}-{key}.arrow"
+
+
+def write_artifact(chunks: ChunkSet, path: str | Path, info: dict[str, Any]) -> None:
+    """Write atomically, so an interrupted run never leaves a partial file."""
+    path = Path(path)
+    text = pa.LargeStringArray.from_buffers(
+        len(chunks), pa.py_buffer(chunks.offsets), pa.py_buffer(chunks.data)
+    )
+    header = {
+        **info,
+        "version": ARTIFACT_VERSION,
+        "doc_ids": chunks.doc_ids,
+        "metadata": chunks.metadata,
+    }
+    table = pa.table(
+        {"text": text, **{name: getattr(chunks, name) for name in _INT_COLUMNS}},
+        metadata={_SCHEMA_KEY: json.dumps(header, default=str)},
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def read_artifact_info(path: str | Path) -> dict[str, Any]:
+    with pa.memory_map(str(path)) as source:
+        schema = pa.ipc.open_file(source).schema
+    return json.loads(schema.metadata[_SCHEMA_KEY])
+
+
+def read_artifact(path: str | Path) -> ChunkSet:
+    """Map an artifact back into a ChunkSet without copying the chunk text."""
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    header = json.loads(table.schema.metadata[_SCHEMA_KEY])
+    if header["version"] != ARTIFACT_VERSION:
+        raise ValueError(
+            f"{path} has artifact version {header['version']}, "
+            f"expected {ARTIFACT_VERSION}; re-chunk to rebuild it"
+        )
+    text = table.column("text").combine_chunks()
+    _, offsets, data = text.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int64)
+    return ChunkSet(
+        data=memoryview(data) if data is not None else b"",
+        offsets=offsets[text.offset : text.offset + len(text) + 1],
+        doc_ids=header["doc_ids"],
+        metadata=header["metadata"],
+        **{name: table.column(name).to_numpy() for name in _INT_COLUMNS},
+    )
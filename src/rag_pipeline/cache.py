@@ -0,0 +1,147 @@
+"""Key-value cache shared by every worker process on a host.
+
+Backed by one SQLite file in WAL mode with memory-mapped reads, so gunicorn
+workers see each other's entries without a separate Redis service. It
+implements llama_index's ``BaseKVStore`` and backs
+``QueryCachedEmbedding.query_cache``.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.storage.kvstore.types import DEFAULT_COLLECTION, BaseKVStore
+
+CACHE_PATH_ENV = "RAG_CACHE_PATH"
+MMAP_SIZE = 256 * 1024 * 1024
+QUERY_EMBEDDINGS_COLLECTION = "query_embeddings"
+
+
+class SharedCache(BaseKVStore):
+    def __init__(self, path: str | Path, namespace: str = ""):
+        self.path = Path(path)
+        self.namespace = namespace
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " collection TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (collection, key))"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after fork so workers never
+        # share a file handle with the master.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _collection(self, collection: str) -> str:
+        return f"{self.namespace}/{collection}" if self.namespace else collection
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO kv VALUES (?, ?, ?)",
+            (self._collection(collection), key, json.dumps(val)),
+        )
+
+    async def aput(
+        self, key: str, val: dict, collection: str = DEFAULT_COLLECTION
+    ) -> None:
+        self.put(key, val, collection)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> dict | None:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT value FROM kv WHERE collection = ? AND key = ?",
+                (self._collection(collection), key),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> dict | None:
+        return self.get(key, collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> dict[str, dict]:
+        rows = self._connect().execute(
+            "SELECT key, value FROM kv WHERE collection = ?",
+            (self._collection(collection),),
+        )
+        return {key: json.loads(value) for key, value in rows}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> dict[str, dict]:
+        return self.get_all(collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        cursor = self._connect().execute(
+            "DELETE FROM kv WHERE collection = ? AND key = ?",
+            (self._collection(collection), key),
+        )
+        return cursor.rowcount > 0
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection)
+
+
+def get_shared_cache(namespace: str = "") -> SharedCache | None:
+    """Return the cache at ``$RAG_CACHE_PATH``, or None when it is unset."""
+    path = os.environ.get(CACHE_PATH_ENV)
+    if not path:
+        return None
+    return SharedCache(path, namespace=namespace)
+
+
+class QueryCachedEmbedding(BaseEmbedding):
+    """An embedding model that caches query embeddings, and only those.
+
+    ``BaseEmbedding.embeddings_cache`` would also store every document
+    chunk, keyed by its text alone, so a chunk and a query with the same
+    text would share whichever vector was written first. Document
+    embeddings here always come from the model. The cache is namespaced
+    by model, see ``get_shared_cache``.
+    """
+
+    query_cache: Any = Field(
+        default=None,
+        exclude=True,
+        description="BaseKVStore for query embeddings, or None for no cache",
+    )
+
+    def get_query_embedding(self, query: str) -> Embedding:
+        if self.query_cache is None:
+            return super().get_query_embedding(query)
+        hit = self.query_cache.get(query, QUERY_EMBEDDINGS_COLLECTION)
+        if hit is not None:
+            return next(iter(hit.values()))
+        embedding = super().get_query_embedding(query)
+        self.query_cache.put(
+            query, {"embedding": embedding}, QUERY_EMBEDDINGS_COLLECTION
+        )
+        return embedding
+
+    async def aget_query_embedding(self, query: str) -> Embedding:
+        if self.query_cache is None:
+            return await super().aget_query_embedding(query)
+        hit = await self.query_cache.aget(query, QUERY_EMBEDDINGS_COLLECTION)
+        if hit is not None:
+            return next(iter(hit.values()))
+        embedding = await super().aget_query_embedding(query)
+        await self.query_cache.aput(
+            query, {"embedding": embedding}, QUERY_EMBEDDINGS_COLLECTION
+        )
+        return embedding
@@ -1,13 +1,13 @@
+from __future__ import annotations
+
 from enum import Enum
-from typing import Protocol
+from typing import TYPE_CHECKING, Protocol
+
+from rag_pipeline.embed import EmbedModelName, get_embed_model
 
-from llama_index.core.node_parser import (
-    HierarchicalNodeParser,
-    SemanticSplitterNodeParser,
-    SentenceSplitter,
-)
-from llama_index.core.schema import BaseNode, Document
-from llama_index.embeddings.voyageai import VoyageEmbedding
+if TYPE_CHECKING:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+    from llama_index.core.schema import BaseNode, Document
 
 
 class ChunkStrategy(str, Enum):
@@ -17,30 +17,139 @@ class ChunkStrategy(str, Enum):
 
 
 class Chunker(Protocol):
+    # Everything that changes the output, used to key persisted artifacts.
+    params: dict
+
     def chunk(self, documents: list[Document]) -> list[BaseNode]: ...
 
 
 class FixedSizeChunker:
     def __init__(self, chunk_size: int = 512, chunk_overlap: int = 50):
+        from llama_index.core.node_parser import SentenceSplitter
+
+        self.params = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
         self._parser = SentenceSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
         )
 
     def chunk(self, documents: list[Document]) -> list[BaseNode]:
-        return self._parser.get_nodes_from_documents(documents, show_progress=True)
+        return self._parser.get_nodes_from_documents(documents)
+
+
+class NativeFixedSizeChunker:
+    """Fixed-size token windows computed from tiktoken offset arrays.
+
+    Uses the same tokenizer, ``chunk_size`` and ``chunk_overlap`` as
+    ``FixedSizeChunker``, and like it reserves room for the metadata string
+    in each chunk. Windows are cut at token boundaries rather than snapped
+    to sentences. Large corpora are tokenized across a process pool.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 50,
+        processes: int | None = None,
+    ):
+        if chunk_overlap >= chunk_size:
+            raise ValueError(
+                f"chunk_overlap ({chunk_overlap}) must be smaller than "
+                f"chunk_size ({chunk_size})"
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.processes = processes
+        self.params = {"chunk_size": chunk_size, "chunk_overlap": chunk_overlap}
+
+    def _effective_chunk_size(self, document: Document) -> int:
+        from llama_index.core.schema import MetadataMode
+
+        from rag_pipeline.token_windows import get_encoding
+
+        enc = get_encoding()
+        metadata_len = max(
+            len(enc.encode_ordinary(document.get_metadata_str(mode)))
+            for mode in (MetadataMode.EMBED, MetadataMode.LLM)
+        )
+        size = self.chunk_size - metadata_len
+        if size <= self.chunk_overlap:
+            raise ValueError(
+                f"Metadata length ({metadata_len}) leaves no room in "
+                f"chunk_size ({self.chunk_size}); use a larger chunk_size."
+            )
+        return size
+
+    def chunk(self, documents: list[Document]) -> list[BaseNode]:
+        from llama_index.core.schema import NodeRelationship, TextNode
+
+        from rag_pipeline.token_windows import parallel_char_spans
+
+        by_size: dict[int, list[int]] = {}
+        for i, doc in enumerate(documents):
+            by_size.setdefault(self._effective_chunk_size(doc), []).append(i)
+
+        spans: list = [None] * len(documents)
+        for size, indices in by_size.items():
+            texts = [documents[i].text for i in indices]
+            for i, doc_spans in zip(
+                indices,
+                parallel_char_spans(texts, size, self.chunk_overlap, self.processes),
+            ):
+                spans[i] = doc_spans
+
+        nodes: list[BaseNode] = []
+        for doc, (starts, ends) in zip(documents, spans):
+            source = doc.as_related_node_info()
+            doc_nodes = []
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                raw = doc.text[start:end]
+                text = raw.strip()
+                if not text:
+                    continue
+                start += len(raw) - len(raw.lstrip())
+                doc_nodes.append(
+                    TextNode(
+                        text=text,
+                        start_char_idx=start,
+                        end_char_idx=start + len(text),
+                        metadata=dict(doc.metadata),
+                        excluded_embed_metadata_keys=doc.excluded_embed_metadata_keys,
+                        excluded_llm_metadata_keys=doc.excluded_llm_metadata_keys,
+                        metadata_separator=doc.metadata_separator,
+                        metadata_template=doc.metadata_template,
+                        text_template=doc.text_template,
+                        relationships={NodeRelationship.SOURCE: source},
+                    )
+                )
+            for prev, node in zip(doc_nodes, doc_nodes[1:]):
+                prev.relationships[NodeRelationship.NEXT] = node.as_related_node_info()
+                node.relationships[NodeRelationship.PREVIOUS] = (
+                    prev.as_related_node_info()
+                )
+            nodes.extend(doc_nodes)
+        return nodes
 
 
 class SemanticChunker:
     def __init__(
         self,
-        embed_model: VoyageEmbedding | None = None,
+        embed_model: BaseEmbedding | None = None,
         breakpoint_percentile: int = 95,
         buffer_size: int = 1,
     ):
-        if embed_model is None:
-            embed_model = VoyageEmbedding(model_name="voyage-3.5")
+        from llama_index.core.node_parser import SemanticSplitterNodeParser
 
+        if embed_model is None:
+            embed_model = get_embed_model(EmbedModelName.VOYAGE_3_5)
+
+        self.params = {
+            "embed_model": embed_model.model_name,
+            # The offline backend reuses Voyage model names.
+            "embed_backend": type(embed_model).__name__,
+            "breakpoint_percentile": breakpoint_percentile,
+            "buffer_size": buffer_size,
+        }
         self._parser = SemanticSplitterNodeParser(
             embed_model=embed_model,
             breakpoint_percentile_threshold=breakpoint_percentile,
@@ -48,29 +157,33 @@ class SemanticChunker:
         )
 
     def chunk(self, documents: list[Document]) -> list[BaseNode]:
-        return self._parser.get_nodes_from_documents(documents, show_progress=True)
+        return self._parser.get_nodes_from_documents(documents)
 
 
 class HierarchicalChunker:
     def __init__(self, chunk_sizes: list[int] | None = None):
+        from llama_index.core.node_parser import HierarchicalNodeParser
+
         if chunk_sizes is None:
             chunk_sizes = [2048, 512, 128]
 
+        self.params = {"chunk_sizes": list(chunk_sizes)}
         self._parser = HierarchicalNodeParser.from_defaults(
             chunk_sizes=chunk_sizes,
         )
 
     def chunk(self, documents: list[Document]) -> list[BaseNode]:
-        return self._parser.get_nodes_from_documents(documents, show_progress=True)
+        return self._parser.get_nodes_from_documents(documents)
 
 
 def get_chunker(
     strategy: ChunkStrategy,
-    embed_model: VoyageEmbedding | None = None,
+    embed_model: BaseEmbedding | None = None,
+    native: bool = False,
 ) -> Chunker:
     match strategy:
         case ChunkStrategy.FIXED:
-            return FixedSizeChunker()
+            return NativeFixedSizeChunker() if native else FixedSizeChunker()
         case ChunkStrategy.SEMANTIC:
             return SemanticChunker(embed_model=embed_model)
         case ChunkStrategy.HIERARCHICAL:
@@ -0,0 +1,254 @@
+"""Columnar storage for chunker output.
+
+A ``ChunkSet`` keeps every chunk's text in one UTF-8 buffer with offsets,
+parents as an index array, and each distinct metadata dict once. llama_index
+nodes are only built in batches at the point they are handed to an index,
+so a hierarchical run no longer holds hundreds of thousands of pydantic
+nodes for the whole of indexing.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import uuid
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from llama_index.core.schema import BaseNode, Document, TextNode
+
+    from rag_pipeline.chunkers import Chunker
+
+NODE_ID_NAMESPACE = uuid.UUID("6f1c1f5e-3c2a-4a8e-9d43-8f0a3b1f7c21")
+NO_PARENT = -1
+# Metadata added to nodes of hierarchical sets so stores can filter on them.
+LEVEL_KEY = "level"
+PARENT_ID_KEY = "parent_id"
+ROOT_ID_KEY = "root_id"
+HIERARCHY_KEYS = [LEVEL_KEY, PARENT_ID_KEY, ROOT_ID_KEY]
+# Source characters per chunker call: past token_windows.MIN_PARALLEL_CHARS,
+# so the native chunker tokenizes across its pool, yet small next to the
+# ChunkSet the nodes end up in.
+BATCH_CHARS = 4_000_000
+
+
+def document_batches(
+    documents: list[Document], max_chars: int = BATCH_CHARS
+) -> Iterator[list[Document]]:
+    """Consecutive runs of ``documents`` of about ``max_chars`` characters."""
+    batch: list[Document] = []
+    chars = 0
+    for document in documents:
+        if batch and chars + len(document.text) > max_chars:
+            yield batch
+            batch, chars = [], 0
+        batch.append(document)
+        chars += len(document.text)
+    if batch:
+        yield batch
+
+
+@dataclass
+class ChunkSet:
+    data: bytes | memoryview  # UTF-8 text of every chunk, back to back
+    offsets: np.ndarray  # int64 byte offsets, len n + 1
+    parent: np.ndarray  # int32, index of the parent chunk or NO_PARENT
+    doc: np.ndarray  # int32, index into doc_ids
+    start_char: np.ndarray  # int64, start in the source document or -1
+    end_char: np.ndarray  # int64
+    meta: np.ndarray  # int32, index into metadata
+    doc_ids: list[str]
+    metadata: list[dict[str, Any]]
+    _children: tuple[np.ndarray, np.ndarray] | None = field(default=None, repr=False)
+    _hierarchy: tuple[np.ndarray, np.ndarray] | None = field(default=None, repr=False)
+    _doc_positions: np.ndarray | None = field(default=None, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.offsets, self.parent, self.doc, self.meta)
+        positions = self.start_char.nbytes + self.end_char.nbytes
+        return len(self.data) + sum(a.nbytes for a in arrays) + positions
+
+    def chunk_text(self, i: int) -> str:
+        text = memoryview(self.data)[self.offsets[i] : self.offsets[i + 1]]
+        return str(text, "utf-8")
+
+    def doc_positions(self) -> np.ndarray:
+        """Position of every chunk among the chunks of its own document."""
+        if self._doc_positions is None:
+            order = np.argsort(self.doc, kind="stable")
+            sorted_doc = self.doc[order]
+            first = np.searchsorted(sorted_doc, sorted_doc)
+            positions = np.empty(len(self), dtype=np.int64)
+            positions[order] = np.arange(len(self)) - first
+            self._doc_positions = positions
+        return self._doc_positions
+
+    def node_id(self, i: int) -> str:
+        # Keyed on the document and the chunk's place within it, so ids are
+        # stable across runs and unaffected by the other documents in the set.
+        # The store does not deduplicate on them; build_index clears first.
+        doc_id = self.doc_ids[self.doc[i]]
+        position = self.doc_positions()[i]
+        return str(uuid.uuid5(NODE_ID_NAMESPACE, f"{doc_id}:{position}"))
+
+    def children(self, i: int) -> np.ndarray:
+        if self._children is None:
+            order = np.argsort(self.parent, kind="stable").astype(np.int32)
+            bounds = np.searchsorted(self.parent[order], np.arange(len(self) + 1))
+            self._children = (order, bounds)
+        order, bounds = self._children
+        return order[bounds[i] : bounds[i + 1]]
+
+    @functools.cached_property
+    def is_hierarchical(self) -> bool:
+        return bool((self.parent != NO_PARENT).any())
+
+    def hierarchy(self) -> tuple[np.ndarray, np.ndarray]:
+        """Level of every chunk (0 for chunks without a parent) and its root."""
+        if self._hierarchy is None:
+            depth = np.zeros(len(self), dtype=np.int32)
+            root = np.arange(len(self), dtype=np.int32)
+            while (mask := self.parent[root] != NO_PARENT).any():
+                depth[mask] += 1
+                root[mask] = self.parent[root[mask]]
+            self._hierarchy = (depth, root)
+        return self._hierarchy
+
+    def node(self, i: int) -> TextNode:
+        from llama_index.core.schema import NodeRelationship, RelatedNodeInfo, TextNode
+
+        entry = self.metadata[self.meta[i]]
+        relationships: dict[NodeRelationship, Any] = {
+            NodeRelationship.SOURCE: RelatedNodeInfo(node_id=self.doc_ids[self.doc[i]]),
+        }
+        if self.parent[i] != NO_PARENT:
+            relationships[NodeRelationship.PARENT] = RelatedNodeInfo(
+                node_id=self.node_id(self.parent[i])
+            )
+        children = self.children(i)
+        if len(children):
+            relationships[NodeRelationship.CHILD] = [
+                RelatedNodeInfo(node_id=self.node_id(c)) for c in children
+            ]
+        metadata = dict(entry["metadata"])
+        excluded_embed = list(entry["excluded_embed"])
+        excluded_llm = list(entry["excluded_llm"])
+        if self.is_hierarchical:
+            depth, root = self.hierarchy()
+            metadata[LEVEL_KEY] = int(depth[i])
+            metadata[ROOT_ID_KEY] = self.node_id(root[i])
+            if self.parent[i] != NO_PARENT:
+                metadata[PARENT_ID_KEY] = self.node_id(self.parent[i])
+            # Kept out of the embedded and prompted text.
+            excluded_embed += HIERARCHY_KEYS
+            excluded_llm += HIERARCHY_KEYS
+        start, end = int(self.start_char[i]), int(self.end_char[i])
+        return TextNode(
+            id_=self.node_id(i),
+            text=self.chunk_text(i),
+            metadata=metadata,
+            excluded_embed_metadata_keys=excluded_embed,
+            excluded_llm_metadata_keys=excluded_llm,
+            start_char_idx=start if start >= 0 else None,
+            end_char_idx=end if end >= 0 else None,
+            relationships=relationships,
+        )
+
+    def iter_nodes(self, batch_size: int = 512) -> Iterator[list[BaseNode]]:
+        for lo in range(0, len(self), batch_size):
+            yield [self.node(i) for i in range(lo, min(lo + batch_size, len(self)))]
+
+    @classmethod
+    def from_documents(
+        cls,
+        chunker: Chunker,
+        documents: list[Document],
+        show_progress: bool = False,
+    ) -> ChunkSet:
+        """Chunk in batches so only one batch's nodes are alive at a time."""
+        from tqdm import tqdm
+
+        builder = ChunkSetBuilder()
+        with tqdm(
+            total=len(documents), desc="Chunking", disable=not show_progress
+        ) as progress:
+            for batch in document_batches(documents, BATCH_CHARS):
+                builder.add_nodes(chunker.chunk(batch))
+                progress.update(len(batch))
+        return builder.build()
+
+    @classmethod
+    def from_nodes(cls, nodes: list[BaseNode]) -> ChunkSet:
+        builder = ChunkSetBuilder()
+        builder.add_nodes(nodes)
+        return builder.build()
+
+
+class ChunkSetBuilder:
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._lengths = array("q")
+        self._parent = array("i")
+        self._doc = array("i")
+        self._start = array("q")
+        self._end = array("q")
+        self._meta = array("i")
+        self._doc_index: dict[str, int] = {}
+        self._meta_index: dict[str, int] = {}
+        self._metadata: list[dict[str, Any]] = []
+
+    def _intern_doc(self, doc_id: str) -> int:
+        return self._doc_index.setdefault(doc_id, len(self._doc_index))
+
+    def _intern_meta(self, node: BaseNode) -> int:
+        entry = {
+            "metadata": node.metadata,
+            "excluded_embed": sorted(node.excluded_embed_metadata_keys),
+            "excluded_llm": sorted(node.excluded_llm_metadata_keys),
+        }
+        key = json.dumps(entry, sort_keys=True, default=str)
+        if key not in self._meta_index:
+            self._meta_index[key] = len(self._metadata)
+            self._metadata.append(entry)
+        return self._meta_index[key]
+
+    def add_nodes(self, nodes: list[BaseNode]) -> None:
+        """Append a batch of nodes; parents must be in the same batch."""
+        base = len(self._lengths)
+        local = {node.node_id: base + i for i, node in enumerate(nodes)}
+        for node in nodes:
+            text = node.get_content().encode()
+            parent = node.parent_node
+            self._parts.append(text)
+            self._lengths.append(len(text))
+            self._parent.append(local[parent.node_id] if parent else NO_PARENT)
+            self._doc.append(self._intern_doc(node.ref_doc_id or ""))
+            start = getattr(node, "start_char_idx", None)
+            end = getattr(node, "end_char_idx", None)
+            self._start.append(-1 if start is None else start)
+            self._end.append(-1 if end is None else end)
+            self._meta.append(self._intern_meta(node))
+
+    def build(self) -> ChunkSet:
+        offsets = np.zeros(len(self._lengths) + 1, dtype=np.int64)
+        np.cumsum(np.frombuffer(self._lengths, dtype=np.int64), out=offsets[1:])
+        return ChunkSet(
+            data=b"".join(self._parts),
+            offsets=offsets,
+            parent=np.array(self._parent, dtype=np.int32),
+            doc=np.array(self._doc, dtype=np.int32),
+            start_char=np.array(self._start, dtype=np.int64),
+            end_char=np.array(self._end, dtype=np.int64),
+            meta=np.array(self._meta, dtype=np.int32),
+            doc_ids=list(self._doc_index),
+            metadata=self._metadata,
+        )
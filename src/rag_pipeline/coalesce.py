@@ -0,0 +1,195 @@
+"""Single-flight coalescing of identical concurrent requests.
+
+When a question spikes, every concurrent ``/query`` with the same key
+waits for the one already running and gets its result, instead of each
+running retrieval and an Anthropic call of its own. Nothing is cached:
+once the running request finishes, the next one starts afresh.
+
+``RAG_COALESCE`` lists the request fields that make up the key, comma
+separated, or ``off``. ``question`` matches questions case-insensitively
+with whitespace and trailing punctuation ignored; ``raw_question``
+matches them exactly. Dropping a field from the key lets requests that
+differ only in it share an answer, e.g. leaving out ``top_k``.
+
+Coalescing is per process; each gunicorn worker has its own flights. In
+the API, requests waiting on another's answer await it on the event loop
+rather than holding a threadpool thread, so a burst of one question does
+not starve the pool that runs everything else.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import re
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+COALESCE_ENV = "RAG_COALESCE"
+KEY_FIELDS = ("question", "raw_question", "strategy", "model", "top_k", "adaptive")
+DEFAULT_KEY = ("question", "strategy", "model", "top_k", "adaptive")
+
+T = TypeVar("T")
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+def parse_key_fields(spec: str | None) -> tuple[str, ...] | None:
+    """Key fields from a ``RAG_COALESCE`` value; ``None`` means off."""
+    if spec is None or not spec.strip():
+        return DEFAULT_KEY
+    if spec.strip().lower() in ("off", "0", "false", "no"):
+        return None
+    fields = tuple(f.strip() for f in spec.split(",") if f.strip())
+    unknown = sorted(set(fields) - set(KEY_FIELDS))
+    if unknown:
+        raise ValueError(f"unknown {COALESCE_ENV} fields {unknown}; use {KEY_FIELDS}")
+    if not {"question", "raw_question"} & set(fields):
+        raise ValueError(f"{COALESCE_ENV} must include question or raw_question")
+    return fields
+
+
+def key_fields_from_env() -> tuple[str, ...] | None:
+    return parse_key_fields(os.environ.get(COALESCE_ENV))
+
+
+def normalize_question(question: str) -> str:
+    return _TRAILING_PUNCTUATION.sub("", " ".join(question.casefold().split()))
+
+
+def request_key(request: Any, fields: tuple[str, ...]) -> tuple:
+    values = []
+    for name in fields:
+        if name == "question":
+            values.append(normalize_question(request.question))
+        elif name == "raw_question":
+            values.append(request.question)
+        else:
+            values.append(getattr(request, name))
+    return tuple(values)
+
+
+class CoalescedError(RuntimeError):
+    """Stands in for a leader's error that could not be copied."""
+
+
+def copy_error(error: BaseException) -> BaseException:
+    """A new exception of the same type, args and attributes as ``error``.
+
+    Each waiting caller raises its own copy, so their frames never pile up
+    on the one ``__traceback__`` of the leader's exception.
+    """
+    try:
+        clone = type(error).__new__(type(error), *error.args)
+        clone.__dict__.update(vars(error))
+    except Exception:
+        return CoalescedError(f"coalesced call failed: {error!r}")
+    return clone
+
+
+def _new_future() -> Future:
+    future: Future = Future()
+    # Running, so a cancelled waiter cannot cancel the shared result.
+    future.set_running_or_notify_cancel()
+    return future
+
+
+@dataclass
+class _Flight:
+    future: Future = field(default_factory=_new_future)
+    followers: int = 0
+
+    def outcome(self) -> Any:
+        """The leader's result, or a copy of its error; blocks until done."""
+        error = self.future.exception()
+        if error is not None:
+            raise copy_error(error) from error
+        return self.future.result()
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares it with callers that wait.
+
+    ``do`` is for threads; ``ado`` is for coroutines on one or more event
+    loops, where waiting callers do not hold a thread. If an ``ado`` leader
+    is cancelled, its waiters start the call again rather than inherit the
+    cancellation.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[Any, _Flight] = {}
+        self._executions = 0
+        self._coalesced = 0
+        self._max_followers = 0
+
+    def _join(self, key: Any) -> tuple[_Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self._executions += 1
+                return flight, True
+            flight.followers += 1
+            self._coalesced += 1
+            self._max_followers = max(self._max_followers, flight.followers)
+            return flight, False
+
+    def _land(
+        self, key: Any, flight: _Flight, result: Any, error: BaseException | None
+    ) -> None:
+        # Out of the table first: a caller arriving now starts afresh.
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            flight.future.set_exception(error)
+        else:
+            flight.future.set_result(result)
+
+    def do(self, key: Any, fn: Callable[[], T]) -> T:
+        flight, leader = self._join(key)
+        if not leader:
+            return flight.outcome()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._land(key, flight, None, e)
+            raise
+        self._land(key, flight, result, None)
+        return result
+
+    async def ado(self, key: Any, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight, leader = self._join(key)
+            if leader:
+                break
+            try:
+                await asyncio.wrap_future(flight.future)
+            except BaseException:
+                if not flight.future.done():
+                    raise  # this caller was cancelled
+                # Otherwise the leader failed; re-raised as a copy below.
+            if not isinstance(flight.future.exception(), asyncio.CancelledError):
+                return flight.outcome()
+            # The leader's caller went away, not the call: try again.
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._land(key, flight, None, e)
+            raise
+        self._land(key, flight, result, None)
+        return result
+
+    def stats(self) -> dict[str, int]:
+        """Counts since start; ``requests`` is ``executions + coalesced``."""
+        with self._lock:
+            return {
+                "requests": self._executions + self._coalesced,
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._flights),
+                "max_followers": self._max_followers,
+            }
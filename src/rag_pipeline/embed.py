@@ -1,6 +1,13 @@
+from __future__ import annotations
+
+import os
 from enum import Enum
+from typing import TYPE_CHECKING
+
+from rag_pipeline.env import load_env
 
-from llama_index.embeddings.voyageai import VoyageEmbedding
+if TYPE_CHECKING:
+    from llama_index.core.base.embeddings.base import BaseEmbedding
 
 
 class EmbedModelName(str, Enum):
@@ -9,5 +16,28 @@ class EmbedModelName(str, Enum):
     VOYAGE_LAW_2 = "voyage-law-2"
 
 
-def get_embed_model(model: EmbedModelName) -> VoyageEmbedding:
-    return VoyageEmbedding(model_name=model.value)
+def get_embed_model(model: EmbedModelName) -> BaseEmbedding:
+    # Embedding backends pull in llama_index, so import them on first use.
+    from rag_pipeline.cache import get_shared_cache
+
+    load_env()
+    backend = os.environ.get("EMBED_BACKEND", "voyage")
+    # Backends share model names, so their cached vectors are kept apart.
+    cache = get_shared_cache(f"{backend}/{model.value}")
+    if os.environ.get("RAG_QUERY_VECTORS"):
+        from rag_pipeline.query_vectors import with_query_vectors
+
+        cache = with_query_vectors(model, cache)
+
+    if backend == "hash":
+        from rag_pipeline.offline import HashEmbedding
+
+        return HashEmbedding(model_name=model.value, query_cache=cache)
+
+    from rag_pipeline.voyage import ThrottledVoyageEmbedding
+
+    return ThrottledVoyageEmbedding(
+        model_name=model.value,
+        base_url=os.environ.get("VOYAGE_BASE_URL"),
+        query_cache=cache,
+    )
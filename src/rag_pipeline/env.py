@@ -0,0 +1,9 @@
+import functools
+
+
+@functools.cache
+def load_env() -> None:
+    """Load ``.env`` into the environment once, on first use rather than import."""
+    from dotenv import load_dotenv
+
+    load_dotenv()
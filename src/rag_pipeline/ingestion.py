@@ -0,0 +1,341 @@
+"""Background ingestion of single documents behind the API.
+
+``POST /documents`` saves the upload and enqueues a job. Jobs run on a
+small pool of threads owned by this module, not the threads serving
+``/query``, through four stages whose progress is kept per job:
+
+- parse: read the file into documents
+- chunk: one ``ChunkSet`` per strategy
+- embed: embed the chunks with each model, in small batches
+- insert: replace the document's rows in each variant's table, once all of
+  its chunks are embedded
+
+Parsing and chunking are CPU-bound, so they run in a child process and do
+not hold the API process's GIL. The queue is bounded, and a full queue is
+reported to the client as 429 instead of growing. Before every embedding
+batch a worker waits, up to ``QUERY_YIELD_SECONDS``, for in-flight queries
+to finish, so a burst of uploads slows ingestion rather than ``/query``.
+
+Job state lives in the shared SQLite cache when ``RAG_CACHE_PATH`` is set,
+so any gunicorn worker can answer ``GET /jobs/{id}`` for a job another one
+is running. Everything else is per process: under gunicorn each worker has
+its own queue, ingestion threads, child process and count of in-flight
+queries, so the server as a whole runs up to ``WEB_CONCURRENCY`` times
+``RAG_INGEST_WORKERS`` jobs and holds as many times ``RAG_INGEST_QUEUE``,
+and a worker only yields to the queries it is serving itself.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from rag_pipeline.chunkers import ChunkStrategy
+from rag_pipeline.embed import EmbedModelName
+
+if TYPE_CHECKING:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.core.schema import Document
+    from llama_index.core.storage.kvstore.types import BaseKVStore
+
+    from rag_pipeline.chunkset import ChunkSet
+
+DATA_DIR_ENV = "RAG_DATA_DIR"
+WORKERS_ENV = "RAG_INGEST_WORKERS"
+QUEUE_SIZE_ENV = "RAG_INGEST_QUEUE"
+PROCESSES_ENV = "RAG_INGEST_PROCESSES"
+
+ALLOWED_EXTS = (".pdf",)
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+DEFAULT_WORKERS = 1
+DEFAULT_QUEUE_SIZE = 8
+# Chunks embedded and inserted per batch; small so a worker checks for
+# query traffic often.
+EMBED_BATCH_SIZE = 64
+QUERY_YIELD_SECONDS = 2.0
+RETRY_AFTER_SECONDS = 30
+
+STAGES = ("parse", "chunk", "embed", "insert")
+JOBS_COLLECTION = "jobs"
+
+log = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class QueryPressure:
+    """Counts in-flight queries so ingestion can wait for quiet moments."""
+
+    def __init__(self) -> None:
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextlib.contextmanager
+    def query(self) -> Iterator[None]:
+        with self._idle:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._idle:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def wait_for_idle(self, timeout: float) -> bool:
+        """Block until no query is running or ``timeout`` passes."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._in_flight, timeout)
+
+
+class JobStore:
+    """Job records as JSON in a key-value store."""
+
+    def __init__(self, store: BaseKVStore):
+        self.store = store
+        self._lock = threading.Lock()
+
+    def create(self, **fields: Any) -> dict:
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "error": None,
+            "created": now,
+            "updated": now,
+            "stages": {stage: {"done": 0, "total": 0} for stage in STAGES},
+            **fields,
+        }
+        self.store.put(job["id"], job, JOBS_COLLECTION)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        return self.store.get(job_id, JOBS_COLLECTION)
+
+    def update(self, job_id: str, **fields: Any) -> dict:
+        with self._lock:
+            job = self.store.get(job_id, JOBS_COLLECTION)
+            job.update(fields, updated=time.time())
+            self.store.put(job_id, job, JOBS_COLLECTION)
+        return job
+
+    def progress(self, job_id: str, stage: str, done: int = 0, total: int = 0) -> dict:
+        """Add ``done`` and ``total`` to a stage's counters."""
+        with self._lock:
+            job = self.store.get(job_id, JOBS_COLLECTION)
+            job["stages"][stage]["done"] += done
+            job["stages"][stage]["total"] += total
+            job["updated"] = time.time()
+            self.store.put(job_id, job, JOBS_COLLECTION)
+        return job
+
+
+def load_file(path: str | Path) -> list[Document]:
+    from llama_index.core import SimpleDirectoryReader
+
+    reader = SimpleDirectoryReader(input_files=[str(path)], filename_as_id=True)
+    return reader.load_data()
+
+
+def chunk_documents(strategy: ChunkStrategy, documents: list[Document]) -> ChunkSet:
+    from rag_pipeline.chunkers import get_chunker
+    from rag_pipeline.chunkset import ChunkSet
+    from rag_pipeline.embed import get_embed_model
+
+    # Same chunkers as run.make_chunker, without importing the CLI.
+    embed_model = None
+    if strategy == ChunkStrategy.SEMANTIC:
+        embed_model = get_embed_model(EmbedModelName.VOYAGE_3_5)
+    chunker = get_chunker(strategy, embed_model=embed_model)
+    return ChunkSet.from_documents(chunker, documents)
+
+
+def variant_index(strategy: ChunkStrategy, model: EmbedModelName) -> VectorStoreIndex:
+    """The index queries use, so jobs share its vector store and pool."""
+    from rag_pipeline.query import _cached_index
+
+    return _cached_index(strategy, model)
+
+
+class IngestionService:
+    """Bounded queue of ingestion jobs and the threads that run them."""
+
+    def __init__(
+        self,
+        jobs: JobStore,
+        pressure: QueryPressure | None = None,
+        workers: int = DEFAULT_WORKERS,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        cpu_executor: Executor | None = None,
+        index_for: Callable[
+            [ChunkStrategy, EmbedModelName], VectorStoreIndex
+        ] = variant_index,
+    ):
+        self.jobs = jobs
+        self.pressure = pressure or QueryPressure()
+        self.workers = workers
+        self.cpu_executor = cpu_executor
+        self.index_for = index_for
+        self._queue: queue.Queue[tuple[str, Path, list, list] | None] = queue.Queue(
+            queue_size
+        )
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"ingest-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+        if self.cpu_executor is not None:
+            self.cpu_executor.shutdown()
+
+    def full(self) -> bool:
+        return self._queue.full()
+
+    def submit(
+        self,
+        path: Path,
+        strategies: list[ChunkStrategy],
+        models: list[EmbedModelName],
+    ) -> dict:
+        """Queue ``path`` for ingestion; raises ``QueueFull`` at capacity."""
+        if self.full():
+            raise QueueFull
+        job = self.jobs.create(
+            filename=path.name,
+            strategies=[s.value for s in strategies],
+            models=[m.value for m in models],
+        )
+        try:
+            self._queue.put_nowait((job["id"], path, strategies, models))
+        except queue.Full:
+            self.jobs.update(job["id"], status="rejected")
+            raise QueueFull from None
+        return job
+
+    def _work(self) -> None:
+        while (item := self._queue.get()) is not None:
+            job_id, path, strategies, models = item
+            try:
+                self.jobs.update(job_id, status="running")
+                self.run(job_id, path, strategies, models)
+                self.jobs.update(job_id, status="done")
+            except Exception as e:
+                log.exception("Ingestion job %s failed", job_id)
+                self.jobs.update(job_id, status="failed", error=str(e))
+
+    def _cpu(self, fn: Callable, *args: Any) -> Any:
+        if self.cpu_executor is None:
+            return fn(*args)
+        return self.cpu_executor.submit(fn, *args).result()
+
+    def run(
+        self,
+        job_id: str,
+        path: Path,
+        strategies: list[ChunkStrategy],
+        models: list[EmbedModelName],
+    ) -> None:
+        from llama_index.core.schema import MetadataMode
+
+        from rag_pipeline.embed import get_embed_model
+
+        self.jobs.progress(job_id, "parse", total=1)
+        self.jobs.progress(job_id, "chunk", total=len(strategies))
+        documents = self._cpu(load_file, path)
+        self.jobs.progress(job_id, "parse", done=1)
+        log.info("Job %s: %s parsed into %d documents", job_id, path, len(documents))
+
+        for strategy in strategies:
+            chunks = self._cpu(chunk_documents, strategy, documents)
+            self.jobs.progress(job_id, "chunk", done=1)
+            for stage in ("embed", "insert"):
+                self.jobs.progress(job_id, stage, total=len(chunks) * len(models))
+
+            for model in models:
+                embed_model = get_embed_model(model)
+                index = self.index_for(strategy, model)
+                embedded = []
+                for nodes in chunks.iter_nodes(EMBED_BATCH_SIZE):
+                    self.pressure.wait_for_idle(QUERY_YIELD_SECONDS)
+                    texts = [
+                        n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes
+                    ]
+                    for node, embedding in zip(
+                        nodes, embed_model.get_text_embedding_batch(texts)
+                    ):
+                        node.embedding = embedding
+                    embedded += nodes
+                    self.jobs.progress(job_id, "embed", done=len(nodes))
+                # Only once every chunk is embedded, so a failed job leaves
+                # an earlier upload's rows in place.
+                for document in documents:
+                    index.delete_ref_doc(document.doc_id)
+                index.insert_nodes(embedded)
+                self.jobs.progress(job_id, "insert", done=len(embedded))
+                log.info(
+                    "Job %s: %d chunks into %s_%s",
+                    job_id,
+                    len(chunks),
+                    strategy.value,
+                    model.value,
+                )
+
+
+def data_dir() -> Path:
+    return Path(os.environ.get(DATA_DIR_ENV, "data"))
+
+
+def default_job_store() -> JobStore:
+    from rag_pipeline.cache import get_shared_cache
+
+    store = get_shared_cache("ingest")
+    if store is None:
+        from llama_index.core.storage.kvstore import SimpleKVStore
+
+        store = SimpleKVStore()
+    return JobStore(store)
+
+
+def default_service(pressure: QueryPressure) -> IngestionService:
+    """A started service sized from the environment."""
+    executor = None
+    if os.environ.get(PROCESSES_ENV, "1") != "0":
+        # Spawn: the API process holds threads and connection pools.
+        executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+    service = IngestionService(
+        default_job_store(),
+        pressure,
+        workers=int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS)),
+        queue_size=int(os.environ.get(QUEUE_SIZE_ENV, DEFAULT_QUEUE_SIZE)),
+        cpu_executor=executor,
+    )
+    service.start()
+    return service
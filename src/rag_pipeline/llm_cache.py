@@ -0,0 +1,161 @@
+"""Disk-backed cache of Anthropic Messages API responses.
+
+Set ``RAG_LLM_CACHE`` to a SQLite path and every ``Anthropic`` LLM passed
+through ``with_llm_cache`` answers repeated requests from it. The cache
+wraps the SDK client's ``messages.create``, so the key covers exactly what
+is sent (model, messages, system prompt, temperature, max tokens and any
+other parameter) and the LLM object keeps its own class. RAGAS picks call
+arguments by LLM class name, so wrapping the LLM itself would change what
+it sends.
+
+Streaming requests are passed through uncached. Entries never expire:
+point ``RAG_LLM_CACHE`` at a new file, or delete it, to force fresh answers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from llama_index.core.llms import LLM
+    from llama_index.core.storage.kvstore.types import BaseKVStore
+
+LLM_CACHE_ENV = "RAG_LLM_CACHE"
+RESPONSES_COLLECTION = "responses"
+
+log = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """Hit and miss counts per model, shared by every cached client."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+
+    def record(self, model: str, hit: bool) -> None:
+        with self._lock:
+            self._counts[model][0 if hit else 1] += 1
+
+    def counts(self) -> dict[str, tuple[int, int]]:
+        """``{model: (hits, misses)}``."""
+        with self._lock:
+            return {model: (h, m) for model, (h, m) in self._counts.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+    def summary(self) -> str:
+        parts = []
+        for model, (hits, misses) in sorted(self.counts().items()):
+            total = hits + misses
+            parts.append(f"{model} {hits}/{total} hits ({hits / total:.0%})")
+        return ", ".join(parts) or "no requests"
+
+
+stats = CacheStats()
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    # SDK sentinels such as NOT_GIVEN.
+    return repr(value)
+
+
+def request_key(params: dict[str, Any]) -> str:
+    """``<model>:<sha256 of every request parameter>``."""
+    body = json.dumps(params, sort_keys=True, default=_jsonable)
+    return f"{params.get('model', '')}:{hashlib.sha256(body.encode()).hexdigest()}"
+
+
+def _message(entry: dict) -> Any:
+    from anthropic.types import Message
+
+    return Message.model_validate(entry)
+
+
+class _CachedMessages:
+    def __init__(self, messages: Any, cache: BaseKVStore):
+        self._messages = messages
+        self._cache = cache
+
+    def create(self, **params: Any) -> Any:
+        if params.get("stream"):
+            return self._messages.create(**params)
+        key = request_key(params)
+        entry = self._cache.get(key, RESPONSES_COLLECTION)
+        stats.record(str(params.get("model")), hit=entry is not None)
+        if entry is not None:
+            return _message(entry)
+        response = self._messages.create(**params)
+        self._cache.put(key, response.model_dump(mode="json"), RESPONSES_COLLECTION)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._messages, name)
+
+
+class _AsyncCachedMessages(_CachedMessages):
+    async def create(self, **params: Any) -> Any:
+        if params.get("stream"):
+            return await self._messages.create(**params)
+        key = request_key(params)
+        entry = await self._cache.aget(key, RESPONSES_COLLECTION)
+        stats.record(str(params.get("model")), hit=entry is not None)
+        if entry is not None:
+            return _message(entry)
+        response = await self._messages.create(**params)
+        await self._cache.aput(
+            key, response.model_dump(mode="json"), RESPONSES_COLLECTION
+        )
+        return response
+
+
+class CachedClient:
+    """Anthropic SDK client whose ``messages.create`` goes through a cache."""
+
+    def __init__(self, client: Any, cache: BaseKVStore, is_async: bool = False):
+        self._client = client
+        messages_cls = _AsyncCachedMessages if is_async else _CachedMessages
+        self.messages = messages_cls(client.messages, cache)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+def with_llm_cache(llm: LLM, cache: BaseKVStore | None = None) -> LLM:
+    """Route ``llm``'s Messages API calls through the response cache.
+
+    ``cache`` defaults to the SQLite file at ``$RAG_LLM_CACHE``; with neither
+    set, or for an LLM without an Anthropic client, ``llm`` is returned as
+    is.
+    """
+    if cache is None:
+        path = os.environ.get(LLM_CACHE_ENV)
+        if not path:
+            return llm
+        from rag_pipeline.cache import SharedCache
+
+        cache = SharedCache(path, namespace="llm")
+
+    import anthropic
+
+    client = getattr(llm, "_client", None)
+    aclient = getattr(llm, "_aclient", None)
+    if not (
+        type(client) is anthropic.Anthropic
+        and type(aclient) is anthropic.AsyncAnthropic
+    ):
+        log.warning("Not caching %s: no Anthropic API client", type(llm).__name__)
+        return llm
+    llm._client = CachedClient(client, cache)
+    llm._aclient = CachedClient(aclient, cache, is_async=True)
+    return llm
@@ -0,0 +1,133 @@
+"""Deterministic local stand-ins for Voyage and Anthropic.
+
+Select them with ``EMBED_BACKEND=hash`` and ``LLM_BACKEND=fake`` to run the
+pipeline, API and benchmarks without network calls or API keys.
+"""
+
+import hashlib
+import math
+import re
+import time
+from typing import Any
+
+from llama_index.core.base.llms.types import (
+    CompletionResponse,
+    CompletionResponseGen,
+    LLMMetadata,
+)
+from llama_index.core.llms import CustomLLM
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+from rag_pipeline.cache import QueryCachedEmbedding
+
+HASH_EMBED_DIM = 1024
+FAKE_ANSWER_TOKENS = 64
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if value >> 63 else -1.0
+
+
+class HashEmbedding(QueryCachedEmbedding):
+    """Feature-hashed bag of words and bigrams, L2-normalized.
+
+    Texts that share vocabulary land close together, so retrieval over a
+    real corpus still returns plausible neighbours, and a given text always
+    maps to the same vector in every process.
+    """
+
+    dim: int = HASH_EMBED_DIM
+
+    def __init__(self, model_name: str = "hash", dim: int = HASH_EMBED_DIM, **kwargs):
+        super().__init__(model_name=model_name, dim=dim, **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    def _embed(self, text: str) -> list[float]:
+        words = _WORD_RE.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = [0.0] * self.dim
+        for feature in features:
+            i, sign = _bucket(f"{self.model_name}:{feature}", self.dim)
+            vector[i] += sign
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        return self._embed(query)
+
+    async def _aget_query_embedding(self, query: str) -> list[float]:
+        return self._embed(query)
+
+    def _get_text_embedding(self, text: str) -> list[float]:
+        return self._embed(text)
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(t) for t in texts]
+
+
+class FakeLLM(CustomLLM):
+    """LLM that answers with words from its prompt at a fixed pace.
+
+    ``latency`` is the time to first token and ``tokens_per_second`` the
+    generation rate, so end-to-end timings have the same shape as a hosted
+    model without the spend.
+    """
+
+    model: str = "fake"
+    latency: float = 0.0
+    tokens_per_second: float = 0.0
+    answer_tokens: int = FAKE_ANSWER_TOKENS
+    context_window: int = 200_000
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeLLM"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.context_window,
+            num_output=self.answer_tokens,
+            model_name=self.model,
+        )
+
+    def _answer_tokens(self, prompt: str) -> list[str]:
+        words = prompt.split()
+        return ["[offline]"] + words[: self.answer_tokens - 1]
+
+    def _pace(self, n_tokens: int) -> None:
+        if self.tokens_per_second > 0:
+            time.sleep(n_tokens / self.tokens_per_second)
+
+    @llm_completion_callback()
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        tokens = self._answer_tokens(prompt)
+        time.sleep(self.latency)
+        self._pace(len(tokens))
+        return CompletionResponse(text=" ".join(tokens))
+
+    @llm_completion_callback()
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        tokens = self._answer_tokens(prompt)
+
+        def gen() -> CompletionResponseGen:
+            time.sleep(self.latency)
+            text = ""
+            for token in tokens:
+                self._pace(1)
+                delta = token if not text else f" {token}"
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+
+        return gen()
@@ -0,0 +1,267 @@
+"""Partitioned storage layout for the variant tables.
+
+By default every variant lives in its own table, ``data_<strategy>_<model>``,
+created by PGVectorStore. With ``RAG_STORAGE_LAYOUT=partitioned`` the same
+tables become list partitions of one parent, ``data_rag_chunks``, keyed by
+a ``variant`` column. PGVectorStore still reads and writes
+``data_<variant>`` directly, so retrieval, metadata filters and ingestion
+are unchanged, and a query on one variant only ever touches its partition.
+The parent is one table to index, vacuum and back up, a new model or
+strategy adds a partition rather than another free-standing table, and
+``search_variants`` and ``variant_counts`` cover any number of variants in
+one statement.
+
+Existing tables are moved in with ``ATTACH PARTITION``, which adds the
+``variant`` column without copying rows:
+
+    python -m rag_pipeline.partitions migrate --dry-run
+    python -m rag_pipeline.partitions migrate
+    python -m rag_pipeline.partitions counts
+    python -m rag_pipeline.partitions detach   # back to separate tables
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import logging
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import sqlalchemy
+from sqlalchemy import text
+
+from rag_pipeline.chunkers import ChunkStrategy
+from rag_pipeline.embed import EmbedModelName
+from rag_pipeline.store import (
+    EMBED_DIM,
+    INDEXED_METADATA_KEYS,
+    get_engine,
+    make_table_name,
+)
+
+PARTITIONED_TABLE = "data_rag_chunks"
+ID_SEQUENCE = f"{PARTITIONED_TABLE}_id_seq"
+
+MISSING = "missing"
+TABLE = "table"
+PARTITION = "partition"
+
+# Casts PGVectorStore uses for its metadata indexes, so an index on an
+# attached table and one created here have the same name and expression.
+_INDEX_CASTS = {"float": "FLOAT", "text": "VARCHAR"}
+
+Variant = tuple[ChunkStrategy, EmbedModelName]
+ALL_VARIANTS: list[Variant] = [(s, m) for s in ChunkStrategy for m in EmbedModelName]
+
+log = logging.getLogger(__name__)
+
+
+def data_table(strategy: ChunkStrategy, model: EmbedModelName) -> str:
+    return f"data_{make_table_name(strategy, model)}"
+
+
+def parent_ddl() -> list[str]:
+    return [
+        "CREATE EXTENSION IF NOT EXISTS vector",
+        f"CREATE SEQUENCE IF NOT EXISTS {ID_SEQUENCE}",
+        # Same columns as PGVectorStore's tables, plus the partition key.
+        f"CREATE TABLE IF NOT EXISTS {PARTITIONED_TABLE} ("
+        f"id BIGINT NOT NULL DEFAULT nextval('{ID_SEQUENCE}'), "
+        "text VARCHAR NOT NULL, "
+        "metadata_ JSON, "
+        "node_id VARCHAR, "
+        f"embedding VECTOR({EMBED_DIM}), "
+        "variant TEXT NOT NULL"
+        ") PARTITION BY LIST (variant)",
+        f"CREATE INDEX IF NOT EXISTS {PARTITIONED_TABLE}_ref_doc_id "
+        f"ON {PARTITIONED_TABLE} ((metadata_ ->> 'ref_doc_id'))",
+    ]
+
+
+def metadata_index_ddl(strategy: ChunkStrategy, model: EmbedModelName) -> list[str]:
+    name = make_table_name(strategy, model)
+    return [
+        f"CREATE INDEX IF NOT EXISTS {name}_idx_{key}_{pg_type} "
+        f"ON data_{name} (CAST(metadata_ ->> '{key}' AS {_INDEX_CASTS[pg_type]}))"
+        for key, pg_type in sorted(INDEXED_METADATA_KEYS.get(strategy, ()))
+    ]
+
+
+def create_partition_ddl(strategy: ChunkStrategy, model: EmbedModelName) -> list[str]:
+    name = make_table_name(strategy, model)
+    # The default lets PGVectorStore insert into the partition without
+    # knowing about the variant column.
+    return [
+        f"CREATE TABLE IF NOT EXISTS data_{name} PARTITION OF {PARTITIONED_TABLE} "
+        f"(id DEFAULT nextval('{ID_SEQUENCE}'), variant DEFAULT '{name}') "
+        f"FOR VALUES IN ('{name}')",
+        *metadata_index_ddl(strategy, model),
+    ]
+
+
+def attach_ddl(strategy: ChunkStrategy, model: EmbedModelName) -> list[str]:
+    name = make_table_name(strategy, model)
+    return [
+        # A constant default is a catalog change; no rows are rewritten.
+        f"ALTER TABLE data_{name} ADD COLUMN variant TEXT NOT NULL DEFAULT '{name}'",
+        f"ALTER TABLE {PARTITIONED_TABLE} "
+        f"ATTACH PARTITION data_{name} FOR VALUES IN ('{name}')",
+    ]
+
+
+def detach_ddl(strategy: ChunkStrategy, model: EmbedModelName) -> list[str]:
+    table = data_table(strategy, model)
+    return [
+        f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {table}",
+        f"ALTER TABLE {table} DROP COLUMN variant",
+    ]
+
+
+def table_state(conn: sqlalchemy.Connection, table: str) -> str:
+    row = conn.execute(
+        text("SELECT relispartition FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table},
+    ).first()
+    if row is None:
+        return MISSING
+    return PARTITION if row[0] else TABLE
+
+
+def _lock(conn: sqlalchemy.Connection) -> None:
+    # Serializes layout changes between processes, e.g. gunicorn workers
+    # creating the same partition on first use.
+    conn.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:name))"),
+        {"name": PARTITIONED_TABLE},
+    )
+
+
+def plan_migration(
+    conn: sqlalchemy.Connection, variants: Iterable[Variant] = ALL_VARIANTS
+) -> list[str]:
+    """Statements that bring ``variants`` into the partitioned table."""
+    statements = parent_ddl()
+    for strategy, model in variants:
+        state = table_state(conn, data_table(strategy, model))
+        if state == TABLE:
+            statements += attach_ddl(strategy, model)
+        elif state == MISSING:
+            statements += create_partition_ddl(strategy, model)
+    return statements
+
+
+def plan_detach(
+    conn: sqlalchemy.Connection, variants: Iterable[Variant] = ALL_VARIANTS
+) -> list[str]:
+    """Statements that turn partitions of ``variants`` back into tables."""
+    statements = []
+    for strategy, model in variants:
+        if table_state(conn, data_table(strategy, model)) == PARTITION:
+            statements += detach_ddl(strategy, model)
+    return statements
+
+
+def execute(conn: sqlalchemy.Connection, statements: list[str]) -> None:
+    for statement in statements:
+        log.info("%s", statement)
+        conn.execute(text(statement))
+
+
+@functools.cache
+def ensure_partition(strategy: ChunkStrategy, model: EmbedModelName) -> None:
+    """Create the variant's partition, and the parent, if they are missing."""
+    table = data_table(strategy, model)
+    with get_engine().begin() as conn:
+        _lock(conn)
+        state = table_state(conn, table)
+        if state == TABLE:
+            raise RuntimeError(
+                f"{table} is not partitioned; "
+                "run python -m rag_pipeline.partitions migrate"
+            )
+        if state == MISSING:
+            execute(conn, parent_ddl() + create_partition_ddl(strategy, model))
+
+
+def variant_counts(conn: sqlalchemy.Connection) -> dict[str, int]:
+    rows = conn.execute(
+        text(
+            f"SELECT variant, count(*) FROM {PARTITIONED_TABLE} "
+            "GROUP BY variant ORDER BY variant"
+        )
+    )
+    return {variant: count for variant, count in rows}
+
+
+def search_variants(
+    conn: sqlalchemy.Connection,
+    embeddings: dict[str, Sequence[float]],
+    top_k: int,
+) -> dict[str, list[dict[str, Any]]]:
+    """Top ``top_k`` rows per variant in one round trip.
+
+    ``embeddings`` maps a variant name (``make_table_name``) to a query
+    embedding from that variant's model. Scores are cosine similarities,
+    as PGVectorStore reports them.
+    """
+    parts = []
+    params: dict[str, Any] = {"k": top_k}
+    for i, (variant, embedding) in enumerate(embeddings.items()):
+        params[f"v{i}"] = variant
+        params[f"q{i}"] = "[" + ",".join(map(str, embedding)) + "]"
+        distance = f"embedding <=> CAST(:q{i} AS vector)"
+        parts.append(
+            f"(SELECT variant, node_id, text, metadata_, 1 - ({distance}) AS score "
+            f"FROM {PARTITIONED_TABLE} WHERE variant = :v{i} "
+            f"ORDER BY {distance} LIMIT :k)"
+        )
+    results: dict[str, list[dict[str, Any]]] = {variant: [] for variant in embeddings}
+    if not parts:
+        return results
+    for row in conn.execute(text(" UNION ALL ".join(parts)), params).mappings():
+        results[row["variant"]].append(dict(row))
+    return results
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(
+        description="Move variant tables into or out of the partitioned layout"
+    )
+    parser.add_argument("command", choices=["migrate", "detach", "counts"])
+    parser.add_argument(
+        "--strategy",
+        action="append",
+        choices=[s.value for s in ChunkStrategy],
+        help="Only this strategy (repeatable; default all)",
+    )
+    parser.add_argument(
+        "--model",
+        action="append",
+        choices=[m.value for m in EmbedModelName],
+        help="Only this model (repeatable; default all)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the statements and exit"
+    )
+    args = parser.parse_args()
+
+    strategies = [ChunkStrategy(s) for s in args.strategy or ChunkStrategy]
+    models = [EmbedModelName(m) for m in args.model or EmbedModelName]
+    variants = [(s, m) for s in strategies for m in models]
+
+    # One transaction: a failure leaves the layout as it was.
+    with get_engine().begin() as conn:
+        if args.command == "counts":
+            for variant, count in variant_counts(conn).items():
+                print(f"{variant}\t{count}")
+        else:
+            _lock(conn)
+            plan = plan_migration if args.command == "migrate" else plan_detach
+            statements = plan(conn, variants)
+            if args.dry_run:
+                print(";\n".join(statements) + ";")
+            else:
+                execute(conn, statements)
+                log.info("Done: %d statements", len(statements))
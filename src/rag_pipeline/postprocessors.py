@@ -0,0 +1,132 @@
+"""Score-driven node postprocessors: adaptive top-k and the answer skip.
+
+With ``adaptive``, a query still retrieves ``similarity_top_k`` chunks but
+only keeps those above the largest drop between neighbouring scores, so an
+exact lookup whose first hit stands out sends one chunk to the LLM while a
+broad question with evenly scored hits keeps them all. With ``min_score``,
+a query whose best chunk scores below it keeps nothing, and the query
+engine returns an empty response without calling the LLM.
+
+Every decision is counted in ``stats``.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import Counter
+from collections.abc import Sequence
+
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+# Smallest score drop treated as an elbow; with a flatter curve every
+# retrieved chunk is kept.
+DEFAULT_MIN_GAP = 0.05
+
+log = logging.getLogger(__name__)
+
+
+class RetrievalStats:
+    """How many chunks adaptive queries kept, and how many were skipped."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._kept: Counter[int] = Counter()
+        self._skipped = 0
+
+    def record_kept(self, k: int) -> None:
+        with self._lock:
+            self._kept[k] += 1
+
+    def record_skip(self) -> None:
+        with self._lock:
+            self._skipped += 1
+
+    def counts(self) -> tuple[dict[int, int], int]:
+        """``({chunks kept: queries}, skipped queries)``."""
+        with self._lock:
+            return dict(sorted(self._kept.items())), self._skipped
+
+    def reset(self) -> None:
+        with self._lock:
+            self._kept.clear()
+            self._skipped = 0
+
+    def summary(self) -> str:
+        kept, skipped = self.counts()
+        parts = [f"top-{k}: {n}" for k, n in kept.items()]
+        if skipped:
+            parts.append(f"skipped: {skipped}")
+        return ", ".join(parts) or "no queries"
+
+
+stats = RetrievalStats()
+
+
+def cut_point(
+    scores: Sequence[float], min_k: int = 1, min_gap: float = DEFAULT_MIN_GAP
+) -> int:
+    """How many of the descending ``scores`` to keep.
+
+    Cuts after the largest drop between neighbours at or beyond ``min_k``,
+    if that drop is at least ``min_gap``; otherwise keeps every score.
+    """
+    if len(scores) <= min_k:
+        return len(scores)
+    gaps = [scores[i] - scores[i + 1] for i in range(min_k - 1, len(scores) - 1)]
+    best = max(range(len(gaps)), key=gaps.__getitem__)
+    if gaps[best] < min_gap:
+        return len(scores)
+    return min_k + best
+
+
+class AdaptiveTopK(BaseNodePostprocessor):
+    """Keep the retrieved nodes above the elbow of their scores."""
+
+    min_k: int = 1
+    min_gap: float = DEFAULT_MIN_GAP
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "AdaptiveTopK"
+
+    def _postprocess_nodes(
+        self,
+        nodes: list[NodeWithScore],
+        query_bundle: QueryBundle | None = None,
+    ) -> list[NodeWithScore]:
+        if not nodes:
+            return nodes
+        nodes = sorted(nodes, key=lambda n: n.score or 0.0, reverse=True)
+        k = cut_point([n.score or 0.0 for n in nodes], self.min_k, self.min_gap)
+        stats.record_kept(k)
+        log.debug(
+            "Kept %d of %d chunks (scores %s)",
+            k,
+            len(nodes),
+            ", ".join(f"{n.score or 0.0:.3f}" for n in nodes),
+        )
+        return nodes[:k]
+
+
+class MinTopScore(BaseNodePostprocessor):
+    """Drop every node unless the best one scores at least ``min_score``."""
+
+    min_score: float
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MinTopScore"
+
+    def _postprocess_nodes(
+        self,
+        nodes: list[NodeWithScore],
+        query_bundle: QueryBundle | None = None,
+    ) -> list[NodeWithScore]:
+        top = max((n.score or 0.0 for n in nodes), default=0.0)
+        if top >= self.min_score:
+            return nodes
+        stats.record_skip()
+        log.debug("Skipping answer: top score %.3f < %.3f", top, self.min_score)
+        return []
@@ -0,0 +1,395 @@
+"""Opt-in profiling with per-stage wall-time spans.
+
+A ``Profile`` records two things while it is active:
+
+- Spans: wall time of named stages, from ``span("...")`` blocks in this
+  package and from every instrumented llama_index call (retrievers,
+  synthesizers, embedding and LLM calls).
+- Either stack samples taken every ``interval`` seconds from a background
+  thread (``mode="sample"``, the default) or a cProfile trace
+  (``mode="cprofile"``). On Python 3.12+ cProfile hooks ``sys.monitoring``,
+  so the trace covers every thread in the process, not just the one that
+  started it, and only one can run at a time.
+
+Sampled stacks are written in the folded format read by flamegraph.pl,
+inferno and speedscope, with the enclosing spans as the outermost frames,
+so time splits by stage first and by function under it. cProfile traces
+are written as ``.pstats``. Both come with a text summary of the spans and
+the hottest functions.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+PROFILE_DIR_ENV = "RAG_PROFILE_DIR"
+PROFILE_HEADER = "X-Profile"
+MODES = ("sample", "cprofile")
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 25
+
+log = logging.getLogger(__name__)
+
+_active: contextvars.ContextVar[Profile | None] = contextvars.ContextVar(
+    "rag_profile", default=None
+)
+_global: Profile | None = None
+# cProfile uses sys.monitoring on 3.12+, which allows one profiler at a time.
+_cprofile_lock = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """A cProfile trace is already running in this process."""
+
+
+_handler_lock = threading.Lock()
+_handler_installed = False
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: float
+    thread: int
+    depth: int
+    # Inside another span of the same name, e.g. a recursive call.
+    nested: bool = False
+
+    @property
+    def ms(self) -> float:
+        return (self.end - self.start) * 1000
+
+
+def _frame_label(frame: Any) -> str:
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+class Profile:
+    """Spans plus samples or a cProfile trace, collected between start and stop.
+
+    With ``all_threads`` spans opened on any thread are recorded, and the
+    starting thread, threads started after it and threads inside a span are
+    sampled; idle threads left over from earlier work are not. Otherwise
+    only the thread and context that started the profile are, which keeps
+    concurrent API requests apart. A cProfile trace ignores this and always
+    records the whole process; starting one while another runs raises
+    ``ProfilerBusy`` rather than waiting.
+    """
+
+    def __init__(
+        self,
+        mode: str = "sample",
+        interval: float = DEFAULT_INTERVAL,
+        all_threads: bool = True,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected {MODES}")
+        self.mode = mode
+        self.interval = interval
+        self.all_threads = all_threads
+        self.spans: list[Span] = []
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self.stats: pstats.Stats | None = None
+        self.start_time = 0.0
+        self.end_time = 0.0
+        # Open spans per thread as (name, stage), innermost last.
+        self._open: dict[int, list[tuple[str, bool]]] = defaultdict(list)
+        self._ids: dict[str, tuple[str, float, int, int, bool]] = {}
+        self._lock = threading.Lock()
+        self._thread = 0
+        self._preexisting: set[int] = set()
+        self._token: contextvars.Token | None = None
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+        self._cprofile: cProfile.Profile | None = None
+
+    def __enter__(self) -> Profile:
+        self.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        global _global
+        _install_llama_index_handler()
+        if self.mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+            raise ProfilerBusy("A cProfile trace is already running")
+        self._thread = threading.get_ident()
+        self._preexisting = set(sys._current_frames()) - {self._thread}
+        self._token = _active.set(self)
+        if self.all_threads:
+            _global = self
+        self.start_time = time.perf_counter()
+        if self.mode == "cprofile":
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        else:
+            self._sampler = threading.Thread(
+                target=self._sample, name="profile-sampler", daemon=True
+            )
+            self._sampler.start()
+
+    def stop(self) -> None:
+        global _global
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            _cprofile_lock.release()
+            self.stats = pstats.Stats(self._cprofile)
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+        self.end_time = time.perf_counter()
+        if _global is self:
+            _global = None
+        if self._token is not None:
+            _active.reset(self._token)
+
+    # Spans
+
+    def enter(self, name: str, key: str | None = None, stage: bool = True) -> str:
+        """Open a span; stage spans also prefix the sampled stacks under them."""
+        thread = threading.get_ident()
+        with self._lock:
+            stack = self._open[thread]
+            nested = any(open_name == name for open_name, _ in stack)
+            key = key or f"{name}-{len(self._ids)}-{time.perf_counter_ns()}"
+            self._ids[key] = (name, time.perf_counter(), thread, len(stack), nested)
+            stack.append((name, stage))
+        return key
+
+    def exit(self, key: str) -> None:
+        end = time.perf_counter()
+        with self._lock:
+            opened = self._ids.pop(key, None)
+            if opened is None:
+                return
+            name, start, thread, depth, nested = opened
+            stack = self._open[thread]
+            # Async spans on one thread can close out of order.
+            for i in range(len(stack) - 1, -1, -1):
+                if stack[i][0] == name:
+                    del stack[i]
+                    break
+            self.spans.append(Span(name, start, end, thread, depth, nested))
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        key = self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit(key)
+
+    # Sampling
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread, frame in sys._current_frames().items():
+                with self._lock:
+                    open_spans = list(self._open.get(thread, ()))
+                if thread == own or not (
+                    thread == self._thread
+                    or self.all_threads
+                    and (thread not in self._preexisting or open_spans)
+                ):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                spans = [f"[{name}]" for name, stage in open_spans if stage]
+                self.samples[(*spans, *reversed(stack))] += 1
+
+    # Output
+
+    @property
+    def wall_ms(self) -> float:
+        return (self.end_time - self.start_time) * 1000
+
+    def span_totals(self) -> list[tuple[str, int, float]]:
+        """``(name, count, total ms)`` per span name, slowest first.
+
+        Time inside a span of the same name is only counted once.
+        """
+        totals: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+        for span in self.spans:
+            totals[span.name][0] += 1
+            if not span.nested:
+                totals[span.name][1] += span.ms
+        return sorted(
+            ((name, int(n), ms) for name, (n, ms) in totals.items()),
+            key=lambda t: -t[2],
+        )
+
+    def folded(self) -> str:
+        """Stack samples as ``frame;frame;frame count`` lines."""
+        return "".join(
+            f"{';'.join(f.replace(';', ',') for f in stack)} {count}\n"
+            for stack, count in sorted(self.samples.items())
+        )
+
+    def top(self, n: int = DEFAULT_TOP) -> list[tuple[str, float, float]]:
+        """``(function, self %, total %)`` for the hottest functions."""
+        if self.stats is not None:
+            entries = self.stats.stats  # type: ignore[attr-defined]
+            total = sum(tt for _, _, tt, _, _ in entries.values()) or 1.0
+            rows = [
+                (f"{Path(file).name}:{line}({func})", tt / total, ct / total)
+                for (file, line, func), (_, _, tt, ct, _) in entries.items()
+            ]
+        else:
+            n_samples = sum(self.samples.values()) or 1
+            own: Counter[str] = Counter()
+            inclusive: Counter[str] = Counter()
+            for stack, count in self.samples.items():
+                frames = [f for f in stack if not f.startswith("[")]
+                if frames:
+                    own[frames[-1]] += count
+                for frame in set(frames):
+                    inclusive[frame] += count
+            rows = [
+                (func, own[func] / n_samples, inclusive[func] / n_samples)
+                for func in inclusive
+            ]
+        return sorted(rows, key=lambda r: (-r[1], -r[2]))[:n]
+
+    def summary(self, n: int = DEFAULT_TOP) -> str:
+        out = io.StringIO()
+        detail = (
+            f"{sum(self.samples.values())} samples every {self.interval * 1000:g} ms"
+            if self.stats is None
+            else "cProfile"
+        )
+        out.write(f"Wall time {self.wall_ms:.1f} ms ({detail})\n\n")
+        out.write(f"{'span':<56} {'calls':>6} {'total ms':>10}\n")
+        for name, count, ms in self.span_totals():
+            out.write(f"{name[:56]:<56} {count:6d} {ms:10.1f}\n")
+        out.write(f"\n{'function':<72} {'self':>6} {'total':>6}\n")
+        for func, own, inclusive in self.top(n):
+            out.write(f"{func[-72:]:<72} {own:6.1%} {inclusive:6.1%}\n")
+        return out.getvalue()
+
+    def server_timing(self, n: int = 10) -> str:
+        """Slowest spans as a ``Server-Timing`` header value."""
+        metrics = [f"total;dur={self.wall_ms:.1f}"]
+        for name, _, ms in self.span_totals()[:n]:
+            metrics.append(f"{re.sub(r'[^A-Za-z0-9_.-]', '_', name)};dur={ms:.1f}")
+        return ", ".join(metrics)
+
+    def write(self, prefix: str | Path) -> list[Path]:
+        """Write ``<prefix>.folded`` or ``.pstats``, ``.spans.json`` and ``.txt``."""
+        prefix = Path(prefix)
+        prefix.parent.mkdir(parents=True, exist_ok=True)
+        paths = []
+        if self.stats is not None:
+            path = prefix.with_name(f"{prefix.name}.pstats")
+            self.stats.dump_stats(path)
+        else:
+            path = prefix.with_name(f"{prefix.name}.folded")
+            path.write_text(self.folded())
+        paths.append(path)
+        path = prefix.with_name(f"{prefix.name}.spans.json")
+        spans = [
+            {
+                **asdict(s),
+                "start": s.start - self.start_time,
+                "end": s.end - self.start_time,
+            }
+            for s in sorted(self.spans, key=lambda s: s.start)
+        ]
+        path.write_text(json.dumps(spans, indent=1) + "\n")
+        paths.append(path)
+        path = prefix.with_name(f"{prefix.name}.txt")
+        path.write_text(self.summary())
+        paths.append(path)
+        return paths
+
+
+def current() -> Profile | None:
+    """The profile collecting for this context, if any."""
+    profile = _active.get()
+    if profile is None and _global is not None:
+        return _global
+    return profile
+
+
+@contextlib.contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a stage in the active profile; a no-op when none is active."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    with profile.span(name):
+        yield
+
+
+def default_output(name: str, directory: str | Path = "profiles") -> Path:
+    return Path(directory) / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+@contextlib.contextmanager
+def profiled(mode: str | None, output: str | Path) -> Iterator[Profile | None]:
+    """Profile the block when ``mode`` is set, then write and summarize it."""
+    if mode is None:
+        yield None
+        return
+    with Profile(mode) as profile:
+        yield profile
+    paths = profile.write(output)
+    print(f"\n{profile.summary()}", file=sys.stderr)
+    log.info("Profile written to %s", ", ".join(str(p) for p in paths))
+
+
+def _install_llama_index_handler() -> None:
+    """Forward llama_index instrumentation spans to the active profile."""
+    global _handler_installed
+    with _handler_lock:
+        if _handler_installed:
+            return
+        from llama_index.core.instrumentation import get_dispatcher
+        from llama_index.core.instrumentation.span_handlers import BaseSpanHandler
+
+        class ProfileSpanHandler(BaseSpanHandler[Any]):
+            def span_enter(self, id_: str, *args: Any, **kwargs: Any) -> None:
+                profile = current()
+                if profile is not None:
+                    profile.enter(id_.partition("-")[0], key=id_, stage=False)
+
+            def span_exit(self, id_: str, *args: Any, **kwargs: Any) -> None:
+                profile = current()
+                if profile is not None:
+                    profile.exit(id_)
+
+            span_drop = span_exit
+
+            def new_span(self, *args: Any, **kwargs: Any) -> None:
+                return None
+
+            def prepare_to_exit_span(self, *args: Any, **kwargs: Any) -> None:
+                return None
+
+            def prepare_to_drop_span(self, *args: Any, **kwargs: Any) -> None:
+                return None
+
+        get_dispatcher().add_span_handler(ProfileSpanHandler())
+        _handler_installed = True
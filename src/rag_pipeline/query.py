@@ -1,15 +1,82 @@
-import argparse
+from __future__ import annotations
 
-from llama_index.core.base.base_query_engine import BaseQueryEngine
-from llama_index.core.base.response.schema import RESPONSE_TYPE
-from llama_index.llms.anthropic import Anthropic
+import argparse
+import functools
+import logging
+import os
+from typing import TYPE_CHECKING
 
 from rag_pipeline.chunkers import ChunkStrategy
 from rag_pipeline.embed import EmbedModelName
-from rag_pipeline.store import load_index
+from rag_pipeline.env import load_env
+from rag_pipeline.profiling import MODES, default_output, profiled, span
+
+if TYPE_CHECKING:
+    from llama_index.core import VectorStoreIndex
+    from llama_index.core.base.base_query_engine import BaseQueryEngine
+    from llama_index.core.base.embeddings.base import BaseEmbedding
+    from llama_index.core.base.response.schema import RESPONSE_TYPE
+    from llama_index.core.llms import LLM
+    from llama_index.core.postprocessor.types import BaseNodePostprocessor
 
 DEFAULT_MODEL = "claude-sonnet-4-5-20250929"
 DEFAULT_TOP_K = 5
+# Best chunk score below which a query is answered without the LLM.
+MIN_SCORE_ENV = "RAG_MIN_SCORE"
+NO_CONTEXT_ANSWER = "No relevant context was found for this question."
+WARMUP_QUERY = "What is the maximum contaminant level for bromate?"
+
+log = logging.getLogger(__name__)
+
+
+def get_llm(llm_model: str = DEFAULT_MODEL) -> LLM:
+    load_env()
+    if os.environ.get("LLM_BACKEND", "anthropic") == "fake":
+        from rag_pipeline.offline import FakeLLM
+
+        return FakeLLM(
+            model=llm_model,
+            latency=float(os.environ.get("FAKE_LLM_LATENCY", "0")),
+            tokens_per_second=float(os.environ.get("FAKE_LLM_TOKENS_PER_SEC", "0")),
+        )
+    from llama_index.llms.anthropic import Anthropic
+
+    from rag_pipeline.llm_cache import with_llm_cache
+
+    return with_llm_cache(Anthropic(model=llm_model))
+
+
+@functools.cache
+def _cached_llm(llm_model: str) -> LLM:
+    return get_llm(llm_model)
+
+
+@functools.cache
+def _cached_index(strategy: ChunkStrategy, model: EmbedModelName) -> VectorStoreIndex:
+    from rag_pipeline.store import load_index
+
+    return load_index(strategy, model)
+
+
+@functools.cache
+def _cached_embed_model(model: EmbedModelName) -> BaseEmbedding:
+    from rag_pipeline.embed import get_embed_model
+
+    return get_embed_model(model)
+
+
+def node_postprocessors(
+    adaptive: bool = False, min_score: float | None = None
+) -> list[BaseNodePostprocessor]:
+    """Answer skip below ``min_score``, then adaptive top-k if requested."""
+    from rag_pipeline.postprocessors import AdaptiveTopK, MinTopScore
+
+    postprocessors: list[BaseNodePostprocessor] = []
+    if min_score is not None:
+        postprocessors.append(MinTopScore(min_score=min_score))
+    if adaptive:
+        postprocessors.append(AdaptiveTopK())
+    return postprocessors
 
 
 def get_query_engine(
@@ -17,14 +84,65 @@ def get_query_engine(
     model: EmbedModelName,
     llm_model: str = DEFAULT_MODEL,
     similarity_top_k: int = DEFAULT_TOP_K,
+    coarse_to_fine: bool = False,
+    adaptive: bool = False,
+    min_score: float | None = None,
 ) -> BaseQueryEngine:
-    llm = Anthropic(model=llm_model)
-    index = load_index(strategy, model)
-    return index.as_query_engine(llm=llm, similarity_top_k=similarity_top_k)
+    """Query engine for a variant.
 
+    ``similarity_top_k`` chunks are retrieved; ``adaptive`` keeps the ones
+    above the largest score drop, and with ``min_score`` a query whose best
+    chunk scores lower gets an empty response without an LLM call.
+    """
+    with span("load_llm"):
+        llm = _cached_llm(llm_model)
+    with span("load_index"):
+        index = _cached_index(strategy, model)
+    postprocessors = node_postprocessors(adaptive, min_score)
+    if not coarse_to_fine:
+        return index.as_query_engine(
+            llm=llm,
+            similarity_top_k=similarity_top_k,
+            node_postprocessors=postprocessors,
+        )
+    if strategy != ChunkStrategy.HIERARCHICAL:
+        raise ValueError("coarse-to-fine retrieval needs the hierarchical strategy")
+    from llama_index.core.query_engine import RetrieverQueryEngine
 
-def query(engine: BaseQueryEngine, question: str) -> RESPONSE_TYPE:
-    return engine.query(question)
+    from rag_pipeline.retrievers import CoarseToFineRetriever
+
+    retriever = CoarseToFineRetriever(
+        index, _cached_embed_model(model), similarity_top_k=similarity_top_k
+    )
+    return RetrieverQueryEngine.from_args(
+        retriever, llm=llm, node_postprocessors=postprocessors
+    )
+
+
+def warmup(llm_model: str = DEFAULT_MODEL) -> None:
+    """Load every variant and run one retrieval so the first request is warm.
+
+    This opens each variant's database pool and embedding client, and with a
+    shared cache configured the warmup query is embedded once per model
+    across all workers.
+    """
+    _cached_llm(llm_model)
+    for strategy in ChunkStrategy:
+        for model in EmbedModelName:
+            index = _cached_index(strategy, model)
+            index.as_retriever(similarity_top_k=1).retrieve(WARMUP_QUERY)
+            log.info("Warmed %s_%s", strategy.value, model.value)
+
+
+def query(
+    engine: BaseQueryEngine, question: str, embedding: list[float] | None = None
+) -> RESPONSE_TYPE:
+    """Answer ``question``, reusing ``embedding`` as its query vector if given."""
+    if embedding is None:
+        return engine.query(question)
+    from llama_index.core.schema import QueryBundle
+
+    return engine.query(QueryBundle(question, embedding=embedding))
 
 
 if __name__ == "__main__":
@@ -44,23 +162,60 @@ if __name__ == "__main__":
     )
     parser.add_argument("--llm", default=DEFAULT_MODEL)
     parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument(
+        "--coarse-to-fine",
+        action="store_true",
+        help="Search root chunks first, then their descendants (hierarchical only)",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Keep only the top-k chunks above the largest drop in scores",
+    )
+    parser.add_argument(
+        "--min-score",
+        type=float,
+        help="Answer without the LLM when the best chunk scores below this",
+    )
     parser.add_argument(
         "--show-contexts",
         action="store_true",
         help="Print retrieved chunks with similarity scores",
     )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sample",
+        choices=MODES,
+        help="Profile setup and the query with stack sampling (default) or cProfile",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="Path prefix for profile files (default: profiles/query-<time>)",
+    )
     args = parser.parse_args()
 
     strategy = ChunkStrategy(args.strategy)
     embed_model = EmbedModelName(args.model)
 
-    engine = get_query_engine(
-        strategy, embed_model, llm_model=args.llm, similarity_top_k=args.top_k
-    )
-    response = query(engine, args.question)
+    with profiled(args.profile, args.profile_output or default_output("query")):
+        engine = get_query_engine(
+            strategy,
+            embed_model,
+            llm_model=args.llm,
+            similarity_top_k=args.top_k,
+            coarse_to_fine=args.coarse_to_fine,
+            adaptive=args.adaptive,
+            min_score=args.min_score,
+        )
+        response = query(engine, args.question)
 
     print(f"\n[{strategy.value} | {embed_model.value} | {args.llm}]\n")
-    print(response)
+    print(response if response.source_nodes else NO_CONTEXT_ANSWER)
+    if args.adaptive or args.min_score is not None:
+        from rag_pipeline.postprocessors import stats
+
+        print(f"\nRetrieval: {stats.summary()}")
 
     if args.show_contexts:
         print(f"\n--- Retrieved Contexts ({len(response.source_nodes)}) ---")
@@ -0,0 +1,204 @@
+"""Precomputed query embeddings for known question sets.
+
+Embeds every question in one or more JSONL files with each
+``EmbedModelName`` and saves them to a single ``.npz``. Point
+``RAG_QUERY_VECTORS`` at that file and ``get_embed_model`` answers those
+questions from it instead of calling Voyage, so eval passes, warm API
+traffic and retrieval benchmarks reuse the exact same vectors every run.
+
+    python -m rag_pipeline.query_vectors questions.jsonl -o query_vectors.npz
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from llama_index.core.storage.kvstore.types import DEFAULT_COLLECTION, BaseKVStore
+
+from rag_pipeline.cache import QUERY_EMBEDDINGS_COLLECTION
+from rag_pipeline.embed import EmbedModelName, get_embed_model
+
+QUERY_VECTORS_ENV = "RAG_QUERY_VECTORS"
+
+log = logging.getLogger(__name__)
+
+
+def embed_backend() -> str:
+    return os.environ.get("EMBED_BACKEND", "voyage")
+
+
+@dataclass
+class QueryVectors:
+    questions: list[str]
+    vectors: dict[str, np.ndarray]  # model name -> float32 (n_questions, dim)
+    backend: str
+    _rows: dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rows = {q: i for i, q in enumerate(self.questions)}
+
+    def get(self, model: str, question: str) -> np.ndarray | None:
+        row = self._rows.get(question.strip())
+        if row is None or model not in self.vectors:
+            return None
+        return self.vectors[model][row]
+
+    def save(self, path: str | Path) -> None:
+        np.savez(
+            path,
+            questions=np.array(self.questions),
+            backend=np.array(self.backend),
+            **self.vectors,
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> QueryVectors:
+        with np.load(path) as data:
+            return cls(
+                questions=data["questions"].tolist(),
+                vectors={
+                    k: data[k] for k in data.files if k not in ("questions", "backend")
+                },
+                backend=str(data["backend"]),
+            )
+
+
+@functools.cache
+def load_query_vectors(path: str) -> QueryVectors:
+    return QueryVectors.load(path)
+
+
+class PrecomputedQueryStore(BaseKVStore):
+    """Answers query-embedding lookups from ``QueryVectors`` first.
+
+    The vectors were embedded as queries, so lookups in any other
+    collection never see them. Everything else, including misses and
+    writes, goes to ``fallback``
+    (normally the shared SQLite cache), so it can stand in for it as an
+    embedding model's ``query_cache``.
+    """
+
+    def __init__(
+        self,
+        query_vectors: QueryVectors,
+        model: str,
+        fallback: BaseKVStore | None = None,
+    ):
+        self.query_vectors = query_vectors
+        self.model = model
+        self.fallback = fallback
+
+    def put(self, key: str, val: dict, collection: str = DEFAULT_COLLECTION) -> None:
+        if self.fallback is not None:
+            self.fallback.put(key, val, collection)
+
+    async def aput(
+        self, key: str, val: dict, collection: str = DEFAULT_COLLECTION
+    ) -> None:
+        self.put(key, val, collection)
+
+    def get(self, key: str, collection: str = DEFAULT_COLLECTION) -> dict | None:
+        if collection == QUERY_EMBEDDINGS_COLLECTION:
+            vector = self.query_vectors.get(self.model, key)
+            if vector is not None:
+                return {"precomputed": vector.tolist()}
+        if self.fallback is None:
+            return None
+        return self.fallback.get(key, collection)
+
+    async def aget(self, key: str, collection: str = DEFAULT_COLLECTION) -> dict | None:
+        return self.get(key, collection)
+
+    def get_all(self, collection: str = DEFAULT_COLLECTION) -> dict[str, dict]:
+        return self.fallback.get_all(collection) if self.fallback else {}
+
+    async def aget_all(self, collection: str = DEFAULT_COLLECTION) -> dict[str, dict]:
+        return self.get_all(collection)
+
+    def delete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.fallback.delete(key, collection) if self.fallback else False
+
+    async def adelete(self, key: str, collection: str = DEFAULT_COLLECTION) -> bool:
+        return self.delete(key, collection)
+
+
+def with_query_vectors(
+    model: EmbedModelName, cache: BaseKVStore | None
+) -> BaseKVStore | None:
+    """Layer ``$RAG_QUERY_VECTORS`` over ``cache`` when it matches the backend."""
+    path = os.environ.get(QUERY_VECTORS_ENV)
+    if not path:
+        return cache
+    query_vectors = load_query_vectors(path)
+    if query_vectors.backend != embed_backend():
+        log.warning(
+            "Ignoring %s: computed with EMBED_BACKEND=%s, running with %s",
+            path,
+            query_vectors.backend,
+            embed_backend(),
+        )
+        return cache
+    return PrecomputedQueryStore(query_vectors, model.value, fallback=cache)
+
+
+def load_questions(paths: list[str | Path]) -> list[str]:
+    """Unique questions from JSONL lines with a ``question`` or ``user_input``."""
+    questions: dict[str, None] = {}
+    for path in paths:
+        for line in Path(path).read_text().splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            question = row.get("question") or row.get("user_input")
+            if question:
+                questions[question.strip()] = None
+    return list(questions)
+
+
+def embed_questions(model: EmbedModelName, questions: list[str]) -> np.ndarray:
+    from llama_index.embeddings.voyageai import VoyageEmbedding
+
+    embed_model = get_embed_model(model)
+    # Skip the cache layer so a stale entry is never written back out.
+    embed_model.query_cache = None
+    if isinstance(embed_model, VoyageEmbedding):
+        # Batched requests rather than one per question.
+        vectors = embed_model._embed(questions, input_type="query")
+    else:
+        vectors = [embed_model.get_query_embedding(q) for q in questions]
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def precompute(
+    questions: list[str], models: list[EmbedModelName] | None = None
+) -> QueryVectors:
+    models = models or list(EmbedModelName)
+    return QueryVectors(
+        questions=questions,
+        vectors={m.value: embed_questions(m, questions) for m in models},
+        backend=embed_backend(),
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    parser = argparse.ArgumentParser(
+        description="Embed known questions with every model ahead of time"
+    )
+    parser.add_argument("files", nargs="+", help="JSONL question files")
+    parser.add_argument("-o", "--output", default="query_vectors.npz")
+    args = parser.parse_args()
+
+    questions = load_questions(args.files)
+    log.info(
+        "Embedding %d questions with %d models", len(questions), len(EmbedModelName)
+    )
+    precompute(questions).save(args.output)
+    log.info("Wrote %s", args.output)
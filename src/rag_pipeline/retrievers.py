@@ -0,0 +1,125 @@
+"""Coarse-to-fine retrieval over hierarchical chunk levels.
+
+The first stage searches only level-0 chunks (2048 tokens by default), a
+small fraction of the hierarchical table. The second searches the smaller
+chunks whose ``root_id`` is one of the top roots, which covers both the 512-
+and 128-token descendants in one query. With the metadata indexes ``store``
+creates for hierarchical tables, the cost grows with the number of roots
+and their descendants rather than with every leaf in the corpus. The query
+is embedded once and reused by both stages.
+
+A table indexed before chunks carried ``level`` and ``root_id`` has no
+roots to search, and is reported as such rather than answered with nothing.
+"""
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.vector_stores import (
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+)
+
+from rag_pipeline.chunkset import LEVEL_KEY, ROOT_ID_KEY
+from rag_pipeline.query import DEFAULT_TOP_K
+
+DEFAULT_PARENT_TOP_K = 3
+REINDEX_HINT = "python -m rag_pipeline.run --strategy hierarchical --rechunk"
+
+
+class MissingHierarchyError(RuntimeError):
+    pass
+
+
+def _search(
+    index: VectorStoreIndex,
+    query_bundle: QueryBundle,
+    top_k: int,
+    filters: list[MetadataFilter],
+) -> list[NodeWithScore]:
+    retriever = index.as_retriever(
+        similarity_top_k=top_k, filters=MetadataFilters(filters=filters)
+    )
+    return retriever.retrieve(query_bundle)
+
+
+def _below_roots() -> MetadataFilter:
+    return MetadataFilter(key=LEVEL_KEY, value=0, operator=FilterOperator.GT)
+
+
+class CoarseToFineRetriever(BaseRetriever):
+    def __init__(
+        self,
+        index: VectorStoreIndex,
+        embed_model: BaseEmbedding,
+        similarity_top_k: int = DEFAULT_TOP_K,
+        parent_top_k: int = DEFAULT_PARENT_TOP_K,
+        callback_manager: CallbackManager | None = None,
+    ):
+        self._index = index
+        self._embed_model = embed_model
+        self._similarity_top_k = similarity_top_k
+        self._parent_top_k = parent_top_k
+        super().__init__(callback_manager=callback_manager)
+
+    def _embed(self, query_bundle: QueryBundle) -> QueryBundle:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_agg_embedding_from_queries(
+                query_bundle.embedding_strs
+            )
+        return query_bundle
+
+    def retrieve_roots(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        return _search(
+            self._index,
+            self._embed(query_bundle),
+            self._parent_top_k,
+            [MetadataFilter(key=LEVEL_KEY, value=0)],
+        )
+
+    def _check_hierarchy(self, query_bundle: QueryBundle) -> None:
+        """Raise if the index has chunks but none carry a ``level``."""
+        for hit in _search(self._index, query_bundle, 1, []):
+            if LEVEL_KEY not in hit.node.metadata:
+                raise MissingHierarchyError(
+                    f"chunks have no {LEVEL_KEY!r} or {ROOT_ID_KEY!r} metadata; "
+                    f"re-index the hierarchical variants with {REINDEX_HINT}"
+                )
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        roots = self.retrieve_roots(query_bundle)
+        if not roots:
+            self._check_hierarchy(query_bundle)
+            return []
+        root_ids = [root.node.node_id for root in roots]
+        return _search(
+            self._index,
+            query_bundle,
+            self._similarity_top_k,
+            [
+                MetadataFilter(
+                    key=ROOT_ID_KEY, value=root_ids, operator=FilterOperator.IN
+                ),
+                _below_roots(),
+            ],
+        )
+
+
+def flat_retrieve(
+    index: VectorStoreIndex,
+    query_bundle: QueryBundle,
+    similarity_top_k: int = DEFAULT_TOP_K,
+) -> list[NodeWithScore]:
+    """Search every non-root chunk, the baseline coarse-to-fine is measured against."""
+    return _search(index, query_bundle, similarity_top_k, [_below_roots()])
+
+
+def recall(retrieved: list[NodeWithScore], reference: list[NodeWithScore]) -> float:
+    """Fraction of the reference results that were also retrieved."""
+    if not reference:
+        return 1.0
+    retrieved_ids = {n.node.node_id for n in retrieved}
+    return sum(n.node.node_id in retrieved_ids for n in reference) / len(reference)
@@ -1,9 +1,20 @@
+import argparse
 import logging
-import sys
+from pathlib import Path
 
-from rag_pipeline.chunkers import ChunkStrategy, get_chunker
+from rag_pipeline.artifacts import (
+    DEFAULT_ARTIFACTS_DIR,
+    artifact_key,
+    artifact_path,
+    corpus_hash,
+    read_artifact,
+    write_artifact,
+)
+from rag_pipeline.chunkers import Chunker, ChunkStrategy, get_chunker
+from rag_pipeline.chunkset import ChunkSet
 from rag_pipeline.embed import EmbedModelName, get_embed_model
 from rag_pipeline.ingest import load_documents
+from rag_pipeline.profiling import MODES, default_output, profiled, span
 from rag_pipeline.store import build_index, make_table_name
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -13,28 +24,125 @@ STRATEGIES = list(ChunkStrategy)
 MODELS = list(EmbedModelName)
 
 
-def run_pipeline(data_dir: str = "data") -> None:
-    log.info("Loading documents from %s", data_dir)
-    documents = load_documents(data_dir)
-    log.info("Loaded %d documents", len(documents))
+def make_chunker(strategy: ChunkStrategy, native_fixed: bool = False) -> Chunker:
+    embed_model = None
+    if strategy == ChunkStrategy.SEMANTIC:
+        embed_model = get_embed_model(EmbedModelName.VOYAGE_3_5)
+    return get_chunker(strategy, embed_model=embed_model, native=native_fixed)
 
-    for strategy in STRATEGIES:
-        log.info("Chunking with strategy=%s", strategy.value)
-        embed_model = None
-        if strategy == ChunkStrategy.SEMANTIC:
-            embed_model = get_embed_model(EmbedModelName.VOYAGE_3_5)
-        chunker = get_chunker(strategy, embed_model=embed_model)
-        nodes = chunker.chunk(documents)
-        log.info("  Produced %d nodes", len(nodes))
 
-        for model in MODELS:
+def run_pipeline(
+    data_dir: str = "data",
+    native_fixed: bool = False,
+    artifacts_dir: str | Path = DEFAULT_ARTIFACTS_DIR,
+    strategies: list[ChunkStrategy] = STRATEGIES,
+    models: list[EmbedModelName] = MODELS,
+    rechunk: bool = False,
+    chunk_only: bool = False,
+) -> None:
+    with span("corpus_hash"):
+        corpus = corpus_hash(data_dir)
+    documents = None
+
+    for strategy in strategies:
+        chunker = make_chunker(strategy, native_fixed)
+        key = artifact_key(strategy, chunker, corpus)
+        path = artifact_path(artifacts_dir, strategy, key)
+        if path.exists() and not rechunk:
+            log.info("Reusing %s chunks from %s", strategy.value, path)
+        else:
+            if documents is None:
+                log.info("Loading documents from %s", data_dir)
+                with span("load_documents"):
+                    documents = load_documents(data_dir)
+                log.info("Loaded %d documents", len(documents))
+            log.info("Chunking with strategy=%s", strategy.value)
+            with span(f"chunk:{strategy.value}"):
+                chunks = ChunkSet.from_documents(chunker, documents, show_progress=True)
+            info = {
+                "strategy": strategy.value,
+                "chunker": type(chunker).__name__,
+                "params": chunker.params,
+                "corpus": corpus,
+            }
+            with span("write_artifact"):
+                write_artifact(chunks, path, info)
+            log.info(
+                "  Wrote %d chunks (%.1f MB) to %s",
+                len(chunks),
+                chunks.nbytes / 1e6,
+                path,
+            )
+        if chunk_only:
+            continue
+
+        chunks = read_artifact(path)
+        for model in models:
             table = make_table_name(strategy, model)
             log.info("  Indexing into %s with %s", table, model.value)
-            build_index(nodes, strategy, model)
+            with span(f"index:{table}"):
+                build_index(chunks, strategy, model)
             log.info("  Done: %s", table)
 
-    log.info("All 9 variants indexed")
+    if not chunk_only:
+        log.info("%d variants indexed", len(strategies) * len(models))
 
 
 if __name__ == "__main__":
-    run_pipeline(sys.argv[1] if len(sys.argv) > 1 else "data")
+    parser = argparse.ArgumentParser(description="Chunk, embed and index all variants")
+    parser.add_argument("data_dir", nargs="?", default="data")
+    parser.add_argument(
+        "--native-fixed",
+        action="store_true",
+        help="Use the vectorized token-window chunker for the fixed strategy",
+    )
+    parser.add_argument(
+        "--artifacts-dir",
+        default=DEFAULT_ARTIFACTS_DIR,
+        help="Where chunk artifacts are written and reused from",
+    )
+    parser.add_argument(
+        "--strategy",
+        action="append",
+        choices=[s.value for s in ChunkStrategy],
+        help="Only this strategy (repeatable; default all)",
+    )
+    parser.add_argument(
+        "--model",
+        action="append",
+        choices=[m.value for m in EmbedModelName],
+        help="Only index with this model (repeatable; default all)",
+    )
+    parser.add_argument(
+        "--rechunk",
+        action="store_true",
+        help="Chunk again even when a matching artifact exists",
+    )
+    parser.add_argument(
+        "--chunk-only",
+        action="store_true",
+        help="Write chunk artifacts without embedding or indexing",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sample",
+        choices=MODES,
+        help="Profile the run with stack sampling (default) or cProfile",
+    )
+    parser.add_argument(
+        "--profile-output",
+        help="Path prefix for profile files (default: profiles/run-<time>)",
+    )
+    args = parser.parse_args()
+
+    with profiled(args.profile, args.profile_output or default_output("run")):
+        run_pipeline(
+            args.data_dir,
+            native_fixed=args.native_fixed,
+            artifacts_dir=args.artifacts_dir,
+            strategies=[ChunkStrategy(s) for s in args.strategy or []] or STRATEGIES,
+            models=[EmbedModelName(m) for m in args.model or []] or MODELS,
+            rechunk=args.rechunk,
+            chunk_only=args.chunk_only,
+        )
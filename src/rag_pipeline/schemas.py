@@ -6,6 +6,8 @@ class QueryRequest(BaseModel):
     strategy: str = "fixed"
     model: str = "voyage-3-large"
     top_k: int = 5
+    # Keep only the top_k chunks above the largest drop in scores.
+    adaptive: bool = False
 
 
 class Source(BaseModel):
@@ -16,3 +18,20 @@ class Source(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     sources: list[Source]
+
+
+class StageProgress(BaseModel):
+    done: int
+    total: int
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    filename: str
+    strategies: list[str]
+    models: list[str]
+    stages: dict[str, StageProgress]
+    error: str | None = None
+    created: float
+    updated: float
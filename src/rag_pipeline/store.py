@@ -1,17 +1,36 @@
+import functools
 import os
 import re
+from enum import StrEnum
 
-from dotenv import load_dotenv
+import sqlalchemy
 from llama_index.core import StorageContext, VectorStoreIndex
 from llama_index.core.schema import BaseNode
 from llama_index.vector_stores.postgres import PGVectorStore
 
 from rag_pipeline.chunkers import ChunkStrategy
+from rag_pipeline.chunkset import LEVEL_KEY, ROOT_ID_KEY, ChunkSet
 from rag_pipeline.embed import EmbedModelName, get_embed_model
-
-load_dotenv()
+from rag_pipeline.env import load_env
 
 EMBED_DIM = 1024
+# Expression indexes created with the table, so coarse-to-fine retrieval
+# can select roots and their descendants without scanning every row.
+INDEXED_METADATA_KEYS = {
+    ChunkStrategy.HIERARCHICAL: {(LEVEL_KEY, "float"), (ROOT_ID_KEY, "text")},
+}
+# Nodes materialized from a ChunkSet at a time while indexing.
+INSERT_BATCH_SIZE = 512
+STORAGE_LAYOUT_ENV = "RAG_STORAGE_LAYOUT"
+
+
+class StorageLayout(StrEnum):
+    TABLES = "tables"
+    PARTITIONED = "partitioned"
+
+
+def storage_layout() -> StorageLayout:
+    return StorageLayout(os.environ.get(STORAGE_LAYOUT_ENV, StorageLayout.TABLES))
 
 
 def make_table_name(strategy: ChunkStrategy, model: EmbedModelName) -> str:
@@ -19,7 +38,26 @@ def make_table_name(strategy: ChunkStrategy, model: EmbedModelName) -> str:
     return re.sub(r"[^a-z0-9]", "_", raw.lower())
 
 
+@functools.cache
+def get_engine() -> sqlalchemy.Engine:
+    load_env()
+    url = sqlalchemy.URL.create(
+        "postgresql+psycopg2",
+        username=os.environ["POSTGRES_USER"],
+        password=os.environ["POSTGRES_PASSWORD"],
+        host=os.environ.get("POSTGRES_HOST", "localhost"),
+        port=int(os.environ.get("POSTGRES_PORT", "5432")),
+        database=os.environ["POSTGRES_DB"],
+    )
+    return sqlalchemy.create_engine(url)
+
+
 def get_vector_store(strategy: ChunkStrategy, model: EmbedModelName) -> PGVectorStore:
+    load_env()
+    if storage_layout() == StorageLayout.PARTITIONED:
+        from rag_pipeline.partitions import ensure_partition
+
+        ensure_partition(strategy, model)
     return PGVectorStore.from_params(
         database=os.environ["POSTGRES_DB"],
         host=os.environ.get("POSTGRES_HOST", "localhost"),
@@ -28,23 +66,38 @@ def get_vector_store(strategy: ChunkStrategy, model: EmbedModelName) -> PGVector
         user=os.environ["POSTGRES_USER"],
         table_name=make_table_name(strategy, model),
         embed_dim=EMBED_DIM,
+        indexed_metadata_keys=INDEXED_METADATA_KEYS.get(strategy),
     )
 
 
 def build_index(
-    nodes: list[BaseNode],
+    nodes: list[BaseNode] | ChunkSet,
     strategy: ChunkStrategy,
     model: EmbedModelName,
 ) -> VectorStoreIndex:
+    """Index ``nodes`` as the variant's entire contents.
+
+    Rows from an earlier, possibly partial, build are removed first:
+    PGVectorStore only ever inserts, so re-indexing would otherwise add a
+    second copy of every chunk.
+    """
     vector_store = get_vector_store(strategy, model)
+    vector_store.clear()
     storage_context = StorageContext.from_defaults(vector_store=vector_store)
     embed_model = get_embed_model(model)
-    return VectorStoreIndex(
-        nodes=nodes,
-        storage_context=storage_context,
-        embed_model=embed_model,
-        show_progress=True,
+    if not isinstance(nodes, ChunkSet):
+        return VectorStoreIndex(
+            nodes=nodes,
+            storage_context=storage_context,
+            embed_model=embed_model,
+            show_progress=True,
+        )
+    index = VectorStoreIndex(
+        nodes=[], storage_context=storage_context, embed_model=embed_model
     )
+    for batch in nodes.iter_nodes(INSERT_BATCH_SIZE):
+        index.insert_nodes(batch)
+    return index
 
 
 def load_index(strategy: ChunkStrategy, model: EmbedModelName) -> VectorStoreIndex:
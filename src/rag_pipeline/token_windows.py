@@ -0,0 +1,125 @@
+"""Vectorized token-window boundaries for fixed-size chunking.
+
+Texts are batch-encoded with tiktoken, then every token id is mapped through
+lookup tables to the number of characters it contributes. A cumulative sum
+gives each token's character offset, so window boundaries for a whole
+document come from array indexing instead of a per-token Python loop.
+"""
+
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import tiktoken
+
+ENCODING = "cl100k_base"
+# Below this much text a process pool costs more than it saves.
+MIN_PARALLEL_CHARS = 2_000_000
+
+
+@functools.cache
+def get_encoding() -> tiktoken.Encoding:
+    # Reuse the cl100k_base file llama_index ships, as SentenceSplitter does.
+    import llama_index.core
+
+    cache_dir = os.path.join(
+        os.path.dirname(llama_index.core.__file__), "_static", "tiktoken_cache"
+    )
+    if "TIKTOKEN_CACHE_DIR" in os.environ:
+        return tiktoken.get_encoding(ENCODING)
+    os.environ["TIKTOKEN_CACHE_DIR"] = cache_dir
+    try:
+        return tiktoken.get_encoding(ENCODING)
+    finally:
+        del os.environ["TIKTOKEN_CACHE_DIR"]
+
+
+@functools.cache
+def _char_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Per token id: characters contributed, and whether it starts mid-character."""
+    enc = get_encoding()
+    n_chars = np.zeros(enc.n_vocab, dtype=np.int64)
+    starts_mid = np.zeros(enc.n_vocab, dtype=np.int64)
+    for token in range(enc.n_vocab):
+        try:
+            raw = enc.decode_single_token_bytes(token)
+        except KeyError:
+            continue
+        n_chars[token] = sum(1 for b in raw if not 0x80 <= b < 0xC0)
+        starts_mid[token] = bool(raw) and 0x80 <= raw[0] < 0xC0
+    return n_chars, starts_mid
+
+
+def token_char_offsets(tokens: np.ndarray) -> np.ndarray:
+    """Character offset of each token's start, plus the total length at the end."""
+    n_chars, starts_mid = _char_tables()
+    counts = n_chars[tokens]
+    offsets = np.empty(len(tokens) + 1, dtype=np.int64)
+    offsets[0] = 0
+    np.cumsum(counts, out=offsets[1:])
+    # A token that begins inside a multi-byte character belongs to that character.
+    offsets[:-1] = np.maximum(offsets[:-1] - starts_mid[tokens], 0)
+    return offsets
+
+
+def window_spans(
+    n_tokens: int, chunk_size: int, chunk_overlap: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Token index ranges [start, end) of overlapping fixed-size windows."""
+    if n_tokens == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    stride = chunk_size - chunk_overlap
+    last_start = max(n_tokens - chunk_overlap, 1)
+    starts = np.arange(0, last_start, stride, dtype=np.int64)
+    ends = np.minimum(starts + chunk_size, n_tokens)
+    return starts, ends
+
+
+def char_spans(
+    texts: list[str], chunk_size: int, chunk_overlap: int
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Character [start, end) of every window in every text."""
+    enc = get_encoding()
+    spans = []
+    for tokens in enc.encode_ordinary_batch(texts):
+        tokens = np.asarray(tokens, dtype=np.int64)
+        offsets = token_char_offsets(tokens)
+        starts, ends = window_spans(len(tokens), chunk_size, chunk_overlap)
+        spans.append((offsets[starts], offsets[ends]))
+    return spans
+
+
+def _char_spans_job(
+    args: tuple[list[str], int, int],
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    return char_spans(*args)
+
+
+def parallel_char_spans(
+    texts: list[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    processes: int | None = None,
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """``char_spans`` across a process pool once the corpus is large enough."""
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or sum(map(len, texts)) < MIN_PARALLEL_CHARS:
+        return char_spans(texts, chunk_size, chunk_overlap)
+    n_groups = min(processes * 4, len(texts))
+    groups = [texts[i::n_groups] for i in range(n_groups)]
+    # tiktoken runs its own threads, so fork is unsafe here; spawn instead.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        results = list(
+            pool.map(
+                _char_spans_job,
+                [(g, chunk_size, chunk_overlap) for g in groups],
+            )
+        )
+    # Undo the round-robin grouping so spans line up with the input order.
+    spans = [None] * len(texts)
+    for g, group_spans in enumerate(results):
+        spans[g::n_groups] = group_spans
+    return spans
@@ -0,0 +1,233 @@
+"""Voyage AI client with token-aware batching, throttling and retry."""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import voyageai
+import voyageai.error
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.rate_limiter import TokenBucketRateLimiter
+from llama_index.embeddings.voyageai import VoyageEmbedding
+from llama_index.embeddings.voyageai.base import VOYAGE_TOTAL_TOKEN_LIMITS
+
+from rag_pipeline.cache import QueryCachedEmbedding
+from rag_pipeline.embed import EmbedModelName
+
+log = logging.getLogger(__name__)
+
+
+# Tier-1 limits from https://docs.voyageai.com/docs/rate-limits as
+# (requests per minute, tokens per minute).
+RATE_LIMITS: dict[str, tuple[int, int]] = {
+    EmbedModelName.VOYAGE_3_LARGE.value: (2000, 3_000_000),
+    EmbedModelName.VOYAGE_3_5.value: (2000, 8_000_000),
+    EmbedModelName.VOYAGE_LAW_2.value: (2000, 3_000_000),
+}
+DEFAULT_RATE_LIMIT = (2000, 3_000_000)
+
+CHARS_PER_TOKEN = 4
+# Fraction of the per-request token limit a batch is packed to. The
+# character estimate runs low for code, tables and non-English text.
+BATCH_HEADROOM = 0.8
+MAX_BATCH_TEXTS = 1000
+MIN_BATCH_TOKENS = 1000
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 32.0
+
+RETRYABLE_ERRORS = (
+    voyageai.error.RateLimitError,
+    voyageai.error.Timeout,
+    voyageai.error.ServiceUnavailableError,
+    voyageai.error.APIConnectionError,
+)
+
+_limiters: dict[str, TokenBucketRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str) -> TokenBucketRateLimiter:
+    """Return the process-wide limiter for a model, shared by every client."""
+    with _limiters_lock:
+        if model_name not in _limiters:
+            rpm, tpm = RATE_LIMITS.get(model_name, DEFAULT_RATE_LIMIT)
+            _limiters[model_name] = TokenBucketRateLimiter(
+                requests_per_minute=rpm,
+                tokens_per_minute=tpm,
+            )
+        return _limiters[model_name]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def is_token_limit_error(error: Exception) -> bool:
+    """Whether Voyage rejected a request for having too many tokens."""
+    return (
+        isinstance(error, voyageai.error.InvalidRequestError)
+        and "tokens" in str(error).lower()
+    )
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2^n)]."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+class ThrottledVoyageEmbedding(QueryCachedEmbedding, VoyageEmbedding):
+    """VoyageEmbedding with token-sized batches, concurrency, throttling and retry.
+
+    Texts are packed into batches by estimated token count instead of calling
+    the tokenizer endpoint per text. Up to ``max_concurrency`` batches are in
+    flight at once, each one first drawing from the model's shared token
+    bucket. On a 429 the batch token budget is halved and grows back on
+    success, so sustained throughput settles just under the provider limit.
+    A batch rejected for going over the per-request token limit, which the
+    estimate can undercount, is split in two and each half retried.
+    """
+
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    max_retries: int = DEFAULT_MAX_RETRIES
+
+    _limiter: TokenBucketRateLimiter = PrivateAttr()
+    _max_batch_tokens: int = PrivateAttr()
+    _batch_tokens: int = PrivateAttr()
+    _budget_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(
+        self,
+        model_name: str,
+        voyage_api_key: str | None = None,
+        base_url: str | None = None,
+        timeout: float | None = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        **kwargs: Any,
+    ):
+        super().__init__(model_name=model_name, voyage_api_key=voyage_api_key, **kwargs)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._client = voyageai.Client(
+            api_key=voyage_api_key, base_url=base_url, timeout=timeout
+        )
+        self._limiter = get_rate_limiter(model_name)
+        _, tpm = RATE_LIMITS.get(model_name, DEFAULT_RATE_LIMIT)
+        self._max_batch_tokens = int(
+            min(VOYAGE_TOTAL_TOKEN_LIMITS.get(model_name, 120_000), tpm)
+            * BATCH_HEADROOM
+        )
+        self._batch_tokens = self._max_batch_tokens
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ThrottledVoyageEmbedding"
+
+    def _token_batches(self, texts: list[str]) -> list[tuple[list[str], int]]:
+        budget = self._batch_tokens
+        batches: list[tuple[list[str], int]] = []
+        batch: list[str] = []
+        batch_tokens = 0
+        for text in texts:
+            n_tokens = estimate_tokens(text)
+            if batch and (
+                batch_tokens + n_tokens > budget or len(batch) >= MAX_BATCH_TEXTS
+            ):
+                batches.append((batch, batch_tokens))
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += n_tokens
+        if batch:
+            batches.append((batch, batch_tokens))
+        return batches
+
+    def _shrink_budget(self) -> None:
+        with self._budget_lock:
+            self._batch_tokens = max(MIN_BATCH_TOKENS, self._batch_tokens // 2)
+
+    def _grow_budget(self) -> None:
+        with self._budget_lock:
+            self._batch_tokens = min(
+                self._max_batch_tokens, int(self._batch_tokens * 1.25) + 1
+            )
+
+    def _embed_batch(
+        self, batch: list[str], n_tokens: int, input_type: str | None
+    ) -> list[list[float]]:
+        attempt = 0
+        while True:
+            self._limiter.acquire(min(n_tokens, self._max_batch_tokens))
+            try:
+                result = self._client.embed(
+                    batch,
+                    model=self.model_name,
+                    input_type=input_type,
+                    truncation=self.truncation,
+                    output_dtype=self.output_dtype,
+                    output_dimension=self.output_dimension,
+                )
+            except voyageai.error.InvalidRequestError as e:
+                if len(batch) < 2 or not is_token_limit_error(e):
+                    raise
+                log.warning(
+                    "%s batch of %d texts over the token limit, splitting it",
+                    self.model_name,
+                    len(batch),
+                )
+                self._shrink_budget()
+                return self._embed_split(batch, input_type)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                if isinstance(e, voyageai.error.RateLimitError):
+                    self._shrink_budget()
+                delay = backoff_delay(attempt)
+                attempt += 1
+                log.warning(
+                    "%s embedding failed (%s), retry %d/%d in %.1fs",
+                    self.model_name,
+                    type(e).__name__,
+                    attempt,
+                    self.max_retries,
+                    delay,
+                )
+                time.sleep(delay)
+                continue
+            self._grow_budget()
+            return result.embeddings
+
+    def _embed_split(
+        self, batch: list[str], input_type: str | None
+    ) -> list[list[float]]:
+        mid = len(batch) // 2
+        return [
+            embedding
+            for half in (batch[:mid], batch[mid:])
+            for embedding in self._embed_batch(
+                half, sum(map(estimate_tokens, half)), input_type
+            )
+        ]
+
+    def _embed(self, texts: list[str], input_type: str) -> list[list[float]]:
+        batches = self._token_batches(texts)
+        if len(batches) == 1 or self.max_concurrency <= 1:
+            results = [self._embed_batch(b, n, input_type) for b, n in batches]
+        else:
+            workers = min(self.max_concurrency, len(batches))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(
+                    pool.map(
+                        lambda bn: self._embed_batch(bn[0], bn[1], input_type),
+                        batches,
+                    )
+                )
+        return [e for batch_embeddings in results for e in batch_embeddings]
+
+    async def _aembed(self, texts: list[str], input_type: str) -> list[list[float]]:
+        return await asyncio.to_thread(self._embed, texts, input_type)
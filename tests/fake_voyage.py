@@ -0,0 +1,113 @@
+"""In-process stand-in for the Voyage embeddings endpoint.
+
+Point a client at ``server.base_url`` (or set ``VOYAGE_BASE_URL``) to embed
+offline. Vectors are derived from a hash of the text, so the same input
+always gets the same embedding.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DIM = 8
+
+
+def fake_vector(text: str, dim: int = DIM) -> list[float]:
+    digest = hashlib.sha256(text.encode()).digest()
+    return [b / 255 for b in digest[:dim]]
+
+
+class FakeVoyageServer:
+    def __init__(
+        self,
+        fail_first: int = 0,
+        fail_status: int = 429,
+        delay: float = 0,
+        max_batch_tokens: int | None = None,
+    ):
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.delay = delay
+        self.max_batch_tokens = max_batch_tokens
+        self.requests: list[dict] = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def __enter__(self) -> "FakeVoyageServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: object) -> None:
+                pass
+
+            def _reply(self, status: int, body: dict) -> None:
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+                with fake._lock:
+                    fake.requests.append(body)
+                    should_fail = len(fake.requests) <= fake.fail_first
+                    fake._in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake._in_flight)
+                try:
+                    time.sleep(fake.delay)
+                    if should_fail:
+                        self._reply(fake.fail_status, {"detail": "rate limited"})
+                        return
+                    texts = body["input"]
+                    n_tokens = sum(len(t) // 4 for t in texts)
+                    if fake.max_batch_tokens and n_tokens > fake.max_batch_tokens:
+                        detail = (
+                            "The max allowed tokens per submitted batch is "
+                            f"{fake.max_batch_tokens}. Your batch has {n_tokens} "
+                            "tokens after truncation. Please lower the number "
+                            "of tokens in the batch."
+                        )
+                        self._reply(400, {"detail": detail})
+                        return
+                    self._reply(
+                        200,
+                        {
+                            "object": "list",
+                            "data": [
+                                {
+                                    "object": "embedding",
+                                    "embedding": fake_vector(t),
+                                    "index": i,
+                                }
+                                for i, t in enumerate(texts)
+                            ],
+                            "model": body["model"],
+                            "usage": {"total_tokens": n_tokens},
+                        },
+                    )
+                finally:
+                    with fake._lock:
+                        fake._in_flight -= 1
+
+        return Handler
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from eval.analysis import (
+    METRICS,
+    VARIANTS,
+    analyze,
+    bootstrap_ci,
+    holm,
+    paired_test,
+    score_array,
+)
+
+
+def make_results(scores: dict[str, list[float | None]]) -> dict:
+    return {
+        variant: {"per_sample": {metric: values for metric in METRICS}}
+        for variant, values in scores.items()
+    }
+
+
+class TestScoreArray:
+    def test_shape_and_missing(self):
+        results = make_results({VARIANTS[0]: [0.5, None, 1.0]})
+        scores = score_array(results)
+        assert scores.shape == (len(VARIANTS), len(METRICS), 3)
+        np.testing.assert_array_equal(scores[0, 0], [0.5, np.nan, 1.0])
+        assert np.isnan(scores[1]).all()
+
+
+class TestBootstrapCI:
+    def test_constant_scores_collapse(self):
+        scores = np.full((2, 1, 10), 0.7)
+        point, low, high = bootstrap_ci(scores, resamples=200)
+        np.testing.assert_allclose([point, low, high], 0.7)
+
+    def test_interval_contains_mean(self):
+        rng = np.random.default_rng(1)
+        scores = rng.uniform(size=(3, 2, 40))
+        point, low, high = bootstrap_ci(scores, resamples=500)
+        assert (low <= point).all() and (point <= high).all()
+        assert (low < high).all()
+
+    def test_matches_resampling_loop(self):
+        rng = np.random.default_rng(2)
+        scores = rng.uniform(size=(1, 1, 12))
+        scores[0, 0, 3] = np.nan
+        _, low, high = bootstrap_ci(scores, resamples=300, seed=5)
+
+        n = scores.shape[-1]
+        counts = np.random.default_rng(5).multinomial(n, np.full(n, 1 / n), size=300)
+        means = [np.nanmean(np.repeat(scores[0, 0], c)) for c in counts]
+        expected = np.nanquantile(means, [0.025, 0.975])
+        np.testing.assert_allclose([low[0, 0], high[0, 0]], expected)
+
+
+class TestPairedTest:
+    def test_clear_difference(self):
+        rng = np.random.default_rng(3)
+        base = rng.uniform(0.3, 0.6, size=30)
+        scores = np.stack([base + 0.3, base])[:, None, :]
+        diff, p = paired_test(scores, resamples=999)
+        assert diff[0, 1, 0] == pytest.approx(0.3)
+        assert diff[1, 0, 0] == pytest.approx(-0.3)
+        assert p[0, 1, 0] < 0.01
+
+    def test_identical_variants(self):
+        scores = np.tile(np.linspace(0, 1, 20), (2, 1, 1))
+        _, p = paired_test(scores, resamples=200)
+        assert p[0, 1, 0] == 1
+
+    def test_only_shared_questions_count(self):
+        scores = np.array([[[1.0, 0.0, np.nan]], [[0.0, np.nan, 5.0]]])
+        diff, _ = paired_test(scores, resamples=10)
+        assert diff[0, 1, 0] == 1
+
+
+class TestHolm:
+    def test_adjusts_upper_triangle(self):
+        raw = np.array([0.01, 0.04, 0.03])
+        p = np.ones((3, 3, 1))
+        p[0, 1, 0], p[0, 2, 0], p[1, 2, 0] = raw
+        adjusted = holm(p)
+        # Sorted 0.01, 0.03, 0.04 -> 0.03, 0.06, max(0.06, 0.04) = 0.06.
+        assert adjusted[0, 1, 0] == pytest.approx(0.03)
+        assert adjusted[1, 2, 0] == pytest.approx(0.06)
+        assert adjusted[0, 2, 0] == pytest.approx(0.06)
+        np.testing.assert_array_equal(adjusted[..., 0], adjusted[..., 0].T)
+
+
+class TestAnalyze:
+    def test_report_fields(self):
+        results = make_results({v: [0.5, 0.6, 0.7] for v in VARIANTS})
+        analysis = analyze(results, resamples=100)
+        assert analysis["n_questions"] == 3
+        shape = (len(VARIANTS), len(METRICS))
+        assert analysis["mean"].shape == shape
+        assert analysis["p_holm"].shape == (len(VARIANTS), *shape)
+        assert (analysis["p_holm"] >= analysis["p"]).all()
@@ -1,8 +1,18 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
+import pytest
 from fastapi.testclient import TestClient
+from llama_index.core.storage.kvstore import SimpleKVStore
 
 from rag_pipeline.api import app
+from rag_pipeline.coalesce import SingleFlight
+from rag_pipeline.ingestion import IngestionService, JobStore
+from rag_pipeline.postprocessors import RetrievalStats
+from rag_pipeline.profiling import Profile
+from rag_pipeline.schemas import QueryResponse
 
 client = TestClient(app)
 
@@ -14,6 +24,38 @@ class TestHealth:
         assert response.json() == {"status": "ok"}
 
 
+class TestReady:
+    def test_ready_after_startup_without_warmup(self):
+        with TestClient(app) as c:
+            response = c.get("/ready")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready"}
+
+    @patch("rag_pipeline.api.WARMUP", True)
+    def test_not_ready_until_warmup_finishes(self):
+        release = threading.Event()
+        with patch("rag_pipeline.api.ready", threading.Event()):
+            with patch("rag_pipeline.api.warmup", side_effect=release.wait):
+                with TestClient(app) as c:
+                    assert c.get("/ready").status_code == 503
+                    assert c.get("/health").status_code == 200
+                    release.set()
+                    for _ in range(100):
+                        if c.get("/ready").status_code == 200:
+                            break
+                        time.sleep(0.01)
+                    assert c.get("/ready").status_code == 200
+
+    @patch("rag_pipeline.api.WARMUP", True)
+    def test_failed_warmup_stays_not_ready(self):
+        with patch("rag_pipeline.api.ready", threading.Event()) as ready:
+            with patch("rag_pipeline.api.warmup", side_effect=RuntimeError("db down")):
+                with TestClient(app) as c:
+                    time.sleep(0.05)
+                    assert not ready.is_set()
+                    assert c.get("/ready").status_code == 503
+
+
 class TestStrategies:
     def test_returns_all_strategies(self):
         response = client.get("/strategies")
@@ -113,6 +155,22 @@ class TestQuery:
         assert call_args[0][1] == EmbedModelName.VOYAGE_3_5
         assert call_args[1]["similarity_top_k"] == 3
 
+    @patch("rag_pipeline.api.get_query_engine")
+    @patch("rag_pipeline.api.query")
+    def test_adaptive_and_min_score(self, mock_query, mock_get_engine):
+        mock_query.return_value.source_nodes = []
+        with patch("rag_pipeline.api.MIN_SCORE", 0.3):
+            response = client.post(
+                "/query", json={"question": "unrelated", "adaptive": True}
+            )
+        assert response.json() == {
+            "answer": "No relevant context was found for this question.",
+            "sources": [],
+        }
+        kwargs = mock_get_engine.call_args[1]
+        assert kwargs["adaptive"] is True
+        assert kwargs["min_score"] == 0.3
+
     def test_missing_question_returns_422(self):
         response = client.post("/query", json={})
         assert response.status_code == 422
@@ -140,3 +198,158 @@ class TestMockMode:
         with patch("rag_pipeline.api.get_query_engine") as mock_engine:
             client.post("/query", json={"question": "anything"})
             mock_engine.assert_not_called()
+
+
+class TestQueryProfiling:
+    @patch("rag_pipeline.api.MOCK_MODE", True)
+    def test_profile_header_writes_profile(self, tmp_path):
+        with patch("rag_pipeline.api.PROFILE_DIR", str(tmp_path)):
+            response = client.post(
+                "/query", json={"question": "q"}, headers={"X-Profile": "1"}
+            )
+        assert response.status_code == 200
+        assert response.headers["Server-Timing"].startswith("total;dur=")
+        profile_id = response.headers["X-Profile-Id"]
+        assert (tmp_path / f"query-{profile_id}.folded").exists()
+        assert (tmp_path / f"query-{profile_id}.txt").exists()
+
+    @patch("rag_pipeline.api.MOCK_MODE", True)
+    def test_header_ignored_unless_enabled(self):
+        with patch("rag_pipeline.api.PROFILE_DIR", None):
+            response = client.post(
+                "/query", json={"question": "q"}, headers={"X-Profile": "1"}
+            )
+        assert response.status_code == 200
+        assert "X-Profile-Id" not in response.headers
+
+    @patch("rag_pipeline.api.MOCK_MODE", True)
+    def test_unknown_mode(self, tmp_path):
+        with patch("rag_pipeline.api.PROFILE_DIR", str(tmp_path)):
+            response = client.post(
+                "/query", json={"question": "q"}, headers={"X-Profile": "perf"}
+            )
+        assert response.status_code == 400
+
+    @patch("rag_pipeline.api.MOCK_MODE", True)
+    def test_cprofile_busy(self, tmp_path):
+        with (
+            patch("rag_pipeline.api.PROFILE_DIR", str(tmp_path)),
+            Profile("cprofile"),
+        ):
+            response = client.post(
+                "/query", json={"question": "q"}, headers={"X-Profile": "cprofile"}
+            )
+        assert response.status_code == 409
+        assert not list(tmp_path.iterdir())
+
+
+class TestCoalescing:
+    def test_identical_requests_share_an_answer(self):
+        release = threading.Event()
+        calls = []
+
+        def answer(req):
+            calls.append(req)
+            release.wait()
+            return QueryResponse(answer="shared", sources=[])
+
+        flights = SingleFlight()
+        questions = ["What is the MCL?", "what is the  MCL", "What is the MCL?"]
+        with (
+            patch("rag_pipeline.api._answer", side_effect=answer),
+            patch("rag_pipeline.api.query_flights", flights),
+            ThreadPoolExecutor(3) as pool,
+        ):
+            futures = [
+                pool.submit(client.post, "/query", json={"question": q})
+                for q in questions
+            ]
+            while flights.stats()["requests"] < 3:
+                time.sleep(0.001)
+            release.set()
+            responses = [f.result() for f in futures]
+            stats = client.get("/stats").json()["coalescing"]
+        assert [r.json()["answer"] for r in responses] == ["shared"] * 3
+        assert len(calls) == 1
+        assert stats["executions"] == 1
+        assert stats["coalesced"] == 2
+
+    def test_can_be_turned_off(self):
+        with (
+            patch("rag_pipeline.api.COALESCE_KEY", None),
+            patch("rag_pipeline.api.query_flights", SingleFlight()) as flights,
+            patch("rag_pipeline.api.MOCK_MODE", True),
+        ):
+            assert client.post("/query", json={"question": "q"}).status_code == 200
+        assert flights.stats()["requests"] == 0
+
+
+class TestStats:
+    def test_reports_retrieval_decisions(self):
+        retrieval = RetrievalStats()
+        retrieval.record_kept(2)
+        retrieval.record_skip()
+        with patch("rag_pipeline.postprocessors.stats", retrieval):
+            response = client.get("/stats")
+        assert response.status_code == 200
+        assert response.json()["retrieval"] == "top-2: 1, skipped: 1"
+        assert "coalescing" in response.json()
+
+
+@pytest.fixture
+def ingestion(tmp_path, monkeypatch):
+    """An ingestion service with no workers, so jobs stay queued."""
+    monkeypatch.setenv("RAG_DATA_DIR", str(tmp_path))
+    service = IngestionService(JobStore(SimpleKVStore()), queue_size=1)
+    with patch("rag_pipeline.api.get_ingestion", return_value=service):
+        yield service
+
+
+class TestDocuments:
+    def test_upload_queues_job(self, ingestion, tmp_path):
+        response = client.post(
+            "/documents",
+            params={"filename": "../rule.pdf", "strategy": "fixed"},
+            content=b"%PDF-1.4 body",
+        )
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+        assert job["filename"] == "rule.pdf"
+        assert job["strategies"] == ["fixed"]
+        assert len(job["models"]) == 3
+        assert response.headers["Location"] == f"/jobs/{job['id']}"
+        assert (tmp_path / "rule.pdf").read_bytes() == b"%PDF-1.4 body"
+        assert [p.name for p in tmp_path.iterdir()] == ["rule.pdf"]
+
+        status = client.get(f"/jobs/{job['id']}")
+        assert status.status_code == 200
+        assert status.json()["stages"]["parse"] == {"done": 0, "total": 0}
+
+    def test_full_queue_returns_429(self, ingestion):
+        upload = {"params": {"filename": "a.pdf"}, "content": b"pdf"}
+        assert client.post("/documents", **upload).status_code == 202
+        response = client.post("/documents", **upload)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"]
+
+    def test_rejects_bad_uploads(self, ingestion):
+        def post(content=b"pdf", **params):
+            return client.post("/documents", params=params, content=content)
+
+        assert post(filename="notes.txt").status_code == 415
+        assert post(filename="a.pdf", strategy="nope").status_code == 422
+        assert post(filename="a.pdf", content=b"").status_code == 400
+        with patch("rag_pipeline.api.MAX_UPLOAD_BYTES", 2):
+            assert post(filename="a.pdf").status_code == 413
+        assert ingestion.jobs.store.get_all("jobs") == {}
+
+    def test_unknown_job(self, ingestion):
+        assert client.get("/jobs/nope").status_code == 404
+
+    @patch("rag_pipeline.api.MOCK_MODE", True)
+    def test_mock_mode(self, ingestion):
+        response = client.post(
+            "/documents", params={"filename": "a.pdf"}, content=b"pdf"
+        )
+        assert response.status_code == 503
@@ -0,0 +1,163 @@
+import pyarrow as pa
+import pytest
+
+from rag_pipeline import run
+from rag_pipeline.artifacts import (
+    artifact_key,
+    artifact_path,
+    corpus_hash,
+    read_artifact,
+    read_artifact_info,
+    write_artifact,
+)
+from rag_pipeline.chunkers import (
+    ChunkStrategy,
+    HierarchicalChunker,
+    NativeFixedSizeChunker,
+    SemanticChunker,
+)
+from rag_pipeline.chunkset import ChunkSet
+from rag_pipeline.embed import EmbedModelName
+from rag_pipeline.offline import HashEmbedding
+from rag_pipeline.voyage import ThrottledVoyageEmbedding
+from tests.test_chunkset import DOCS
+
+
+@pytest.fixture
+def chunks():
+    return ChunkSet.from_documents(HierarchicalChunker(chunk_sizes=[128, 32]), DOCS)
+
+
+@pytest.fixture
+def corpus_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "a.pdf").write_bytes(b"%PDF-1.4 first")
+    (data / "b.pdf").write_bytes(b"%PDF-1.4 second")
+    (data / "notes.txt").write_text("ignored")
+    return data
+
+
+class TestArtifactFiles:
+    def test_round_trip(self, chunks, tmp_path):
+        path = tmp_path / "chunks.arrow"
+        write_artifact(chunks, path, {"strategy": "hierarchical"})
+        loaded = read_artifact(path)
+        assert len(loaded) == len(chunks)
+        assert loaded.parent.tolist() == chunks.parent.tolist()
+        assert loaded.metadata == chunks.metadata
+        for i in range(len(chunks)):
+            assert loaded.node_id(i) == chunks.node_id(i)
+            assert loaded.node(i).text == chunks.node(i).text
+
+    def test_round_trips_multibyte_text(self, tmp_path):
+        nodes = NativeFixedSizeChunker(chunk_size=32, chunk_overlap=4).chunk(
+            [DOCS[0].model_copy(update={"text": "Ozone (O₃) at 10°C — 水処理 " * 20})]
+        )
+        chunks = ChunkSet.from_nodes(nodes)
+        write_artifact(chunks, tmp_path / "c.arrow", {})
+        loaded = read_artifact(tmp_path / "c.arrow")
+        assert [loaded.chunk_text(i) for i in range(len(loaded))] == [
+            n.text for n in nodes
+        ]
+
+    def test_info_is_stored(self, chunks, tmp_path):
+        path = tmp_path / "chunks.arrow"
+        write_artifact(chunks, path, {"corpus": "abc"})
+        info = read_artifact_info(path)
+        assert info["corpus"] == "abc"
+        assert info["version"] == 1
+
+    def test_rejects_other_versions(self, chunks, tmp_path, monkeypatch):
+        path = tmp_path / "chunks.arrow"
+        write_artifact(chunks, path, {})
+        monkeypatch.setattr("rag_pipeline.artifacts.ARTIFACT_VERSION", 2)
+        with pytest.raises(ValueError, match="artifact version 1"):
+            read_artifact(path)
+
+    def test_leaves_no_temp_file(self, chunks, tmp_path):
+        write_artifact(chunks, tmp_path / "out" / "chunks.arrow", {})
+        assert [p.name for p in (tmp_path / "out").iterdir()] == ["chunks.arrow"]
+
+    def test_is_arrow_ipc(self, chunks, tmp_path):
+        path = tmp_path / "chunks.arrow"
+        write_artifact(chunks, path, {})
+        table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        assert table.num_rows == len(chunks)
+
+
+class TestArtifactKey:
+    def test_corpus_hash_ignores_other_files(self, corpus_dir):
+        before = corpus_hash(corpus_dir)
+        (corpus_dir / "more.txt").write_text("still ignored")
+        assert corpus_hash(corpus_dir) == before
+
+    def test_corpus_hash_tracks_contents(self, corpus_dir):
+        before = corpus_hash(corpus_dir)
+        (corpus_dir / "a.pdf").write_bytes(b"%PDF-1.4 changed")
+        assert corpus_hash(corpus_dir) != before
+
+    def test_key_tracks_chunker_params(self):
+        strategy = ChunkStrategy.FIXED
+        small = NativeFixedSizeChunker(chunk_size=128, chunk_overlap=10)
+        large = NativeFixedSizeChunker(chunk_size=512, chunk_overlap=10)
+        assert artifact_key(strategy, small, "c") != artifact_key(strategy, large, "c")
+
+    def test_key_tracks_semantic_embed_backend(self, monkeypatch):
+        monkeypatch.setenv("VOYAGE_API_KEY", "test-key")
+        strategy = ChunkStrategy.SEMANTIC
+        hashed = SemanticChunker(embed_model=HashEmbedding(model_name="voyage-3.5"))
+        voyage = SemanticChunker(embed_model=ThrottledVoyageEmbedding("voyage-3.5"))
+        assert hashed.params["embed_model"] == voyage.params["embed_model"]
+        assert artifact_key(strategy, hashed, "c") != artifact_key(
+            strategy, voyage, "c"
+        )
+
+    def test_key_ignores_process_count(self):
+        strategy = ChunkStrategy.FIXED
+        one = NativeFixedSizeChunker(processes=1)
+        four = NativeFixedSizeChunker(processes=4)
+        assert artifact_key(strategy, one, "c") == artifact_key(strategy, four, "c")
+
+
+class TestRunPipelineArtifacts:
+    @pytest.fixture
+    def pipeline(self, corpus_dir, monkeypatch):
+        loads, indexed = [], []
+        monkeypatch.setattr(
+            run, "load_documents", lambda data_dir: loads.append(data_dir) or DOCS
+        )
+        monkeypatch.setattr(
+            run,
+            "build_index",
+            lambda chunks, strategy, model: indexed.append((strategy, model)),
+        )
+        return loads, indexed
+
+    def test_reuses_artifacts(self, corpus_dir, tmp_path, pipeline):
+        loads, indexed = pipeline
+        options = dict(
+            artifacts_dir=tmp_path / "artifacts",
+            native_fixed=True,
+            strategies=[ChunkStrategy.FIXED],
+        )
+        run.run_pipeline(corpus_dir, **options)
+        run.run_pipeline(corpus_dir, models=[EmbedModelName.VOYAGE_LAW_2], **options)
+        assert len(loads) == 1
+        assert indexed[-1] == (ChunkStrategy.FIXED, EmbedModelName.VOYAGE_LAW_2)
+        assert len(indexed) == len(EmbedModelName) + 1
+
+    def test_chunk_only_writes_artifact(self, corpus_dir, tmp_path, pipeline):
+        _, indexed = pipeline
+        artifacts = tmp_path / "artifacts"
+        run.run_pipeline(
+            corpus_dir,
+            native_fixed=True,
+            artifacts_dir=artifacts,
+            strategies=[ChunkStrategy.FIXED],
+            chunk_only=True,
+        )
+        chunker = run.make_chunker(ChunkStrategy.FIXED, native_fixed=True)
+        key = artifact_key(ChunkStrategy.FIXED, chunker, corpus_hash(corpus_dir))
+        assert artifact_path(artifacts, ChunkStrategy.FIXED, key).exists()
+        assert indexed == []
@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+import os
+from unittest.mock import patch
+
+from rag_pipeline.cache import (
+    QUERY_EMBEDDINGS_COLLECTION,
+    SharedCache,
+    get_shared_cache,
+)
+from rag_pipeline.offline import HashEmbedding
+
+
+def _write_from_child(path: str) -> None:
+    SharedCache(path).put("from-child", {"pid": os.getpid()})
+
+
+class TestSharedCache:
+    def test_round_trip(self, tmp_path):
+        cache = SharedCache(tmp_path / "cache.sqlite")
+        cache.put("k", {"v": [1.0, 2.0]})
+        assert cache.get("k") == {"v": [1.0, 2.0]}
+        assert cache.get("missing") is None
+
+    def test_namespaces_are_isolated(self, tmp_path):
+        a = SharedCache(tmp_path / "cache.sqlite", namespace="voyage-3.5")
+        b = SharedCache(tmp_path / "cache.sqlite", namespace="voyage-law-2")
+        a.put("q", {"v": 1})
+        assert b.get("q") is None
+        assert a.get_all() == {"q": {"v": 1}}
+
+    def test_delete(self, tmp_path):
+        cache = SharedCache(tmp_path / "cache.sqlite")
+        cache.put("k", {"v": 1})
+        assert cache.delete("k")
+        assert not cache.delete("k")
+
+    def test_visible_across_processes(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        cache = SharedCache(path)
+        child = multiprocessing.get_context("spawn").Process(
+            target=_write_from_child, args=(path,)
+        )
+        child.start()
+        child.join()
+        assert cache.get("from-child")["pid"] == child.pid
+
+    def test_get_shared_cache_requires_path(self, tmp_path):
+        with patch.dict(os.environ, {}, clear=True):
+            assert get_shared_cache() is None
+        with patch.dict(os.environ, {"RAG_CACHE_PATH": str(tmp_path / "c.sqlite")}):
+            assert isinstance(get_shared_cache(), SharedCache)
+
+
+class TestQueryCachedEmbedding:
+    def test_query_embeddings_are_cached(self, tmp_path):
+        cache = SharedCache(tmp_path / "cache.sqlite", namespace="hash")
+        expected = HashEmbedding(query_cache=cache).get_query_embedding("bromate")
+        with patch.object(HashEmbedding, "_get_query_embedding") as embed:
+            cached = HashEmbedding(query_cache=cache).get_query_embedding("bromate")
+            embed.assert_not_called()
+        assert cached == expected
+
+    def test_async_query_embeddings_are_cached(self, tmp_path):
+        cache = SharedCache(tmp_path / "cache.sqlite", namespace="hash")
+        asyncio.run(HashEmbedding(query_cache=cache).aget_query_embedding("bromate"))
+        with patch.object(HashEmbedding, "_aget_query_embedding") as embed:
+            asyncio.run(
+                HashEmbedding(query_cache=cache).aget_query_embedding("bromate")
+            )
+            embed.assert_not_called()
+
+    def test_document_embeddings_are_not_cached(self, tmp_path):
+        cache = SharedCache(tmp_path / "cache.sqlite", namespace="hash")
+        embed_model = HashEmbedding(query_cache=cache)
+        embed_model.get_text_embedding_batch(["bromate", "chlorite"])
+        embed_model.get_text_embedding("bromate")
+        assert cache.get_all(QUERY_EMBEDDINGS_COLLECTION) == {}
+        assert cache.get_all("embeddings") == {}
+
+    def test_document_lookup_ignores_cached_query(self, tmp_path):
+        cache = SharedCache(tmp_path / "cache.sqlite", namespace="hash")
+        cache.put("bromate", {"embedding": [1.0]}, QUERY_EMBEDDINGS_COLLECTION)
+        embed_model = HashEmbedding(query_cache=cache)
+        assert embed_model.get_query_embedding("bromate") == [1.0]
+        assert len(embed_model.get_text_embedding_batch(["bromate"])[0]) > 1
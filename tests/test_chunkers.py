@@ -1,11 +1,21 @@
-from llama_index.core.schema import Document
+import numpy as np
+import pytest
+from llama_index.core.schema import Document, NodeRelationship
 
 from rag_pipeline.chunkers import (
     ChunkStrategy,
     FixedSizeChunker,
     HierarchicalChunker,
+    NativeFixedSizeChunker,
     get_chunker,
 )
+from rag_pipeline.token_windows import (
+    char_spans,
+    get_encoding,
+    parallel_char_spans,
+    token_char_offsets,
+    window_spans,
+)
 
 SAMPLE_DOCS = [
     Document(
@@ -55,6 +65,79 @@ class TestFixedSizeChunker:
         assert len(small_nodes) >= len(large_nodes)
 
 
+class TestNativeFixedSizeChunker:
+    def test_produces_nodes(self):
+        chunker = NativeFixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        nodes = chunker.chunk(SAMPLE_DOCS)
+        assert len(nodes) > 1
+
+    def test_char_indices_match_text(self):
+        chunker = NativeFixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        doc = SAMPLE_DOCS[0]
+        for node in chunker.chunk(SAMPLE_DOCS):
+            assert doc.text[node.start_char_idx : node.end_char_idx] == node.text
+
+    def test_windows_fit_chunk_size(self):
+        chunker = NativeFixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        enc = get_encoding()
+        for node in chunker.chunk(SAMPLE_DOCS):
+            assert len(enc.encode_ordinary(node.text)) <= 64
+
+    def test_consecutive_chunks_overlap(self):
+        chunker = NativeFixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        nodes = chunker.chunk(SAMPLE_DOCS)
+        for prev, node in zip(nodes, nodes[1:]):
+            assert node.start_char_idx < prev.end_char_idx
+
+    def test_node_compatible_with_sentence_splitter(self):
+        native = NativeFixedSizeChunker(chunk_size=128, chunk_overlap=20)
+        node = native.chunk(SAMPLE_DOCS)[1]
+        assert node.metadata == SAMPLE_DOCS[0].metadata
+        assert node.ref_doc_id == SAMPLE_DOCS[0].doc_id
+        assert NodeRelationship.PREVIOUS in node.relationships
+
+    def test_similar_node_count_to_fixed(self):
+        native = NativeFixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        fixed = FixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        n_native = len(native.chunk(SAMPLE_DOCS))
+        n_fixed = len(fixed.chunk(SAMPLE_DOCS))
+        assert abs(n_native - n_fixed) <= 1
+
+    def test_rejects_overlap_not_smaller_than_size(self):
+        with pytest.raises(ValueError):
+            NativeFixedSizeChunker(chunk_size=50, chunk_overlap=50)
+
+
+class TestTokenWindows:
+    def test_window_spans_cover_all_tokens(self):
+        starts, ends = window_spans(100, chunk_size=30, chunk_overlap=5)
+        assert starts.tolist() == [0, 25, 50, 75]
+        assert ends.tolist() == [30, 55, 80, 100]
+
+    def test_short_text_is_one_window(self):
+        starts, ends = window_spans(3, chunk_size=30, chunk_overlap=5)
+        assert starts.tolist() == [0]
+        assert ends.tolist() == [3]
+
+    def test_offsets_match_tiktoken_for_multibyte_text(self):
+        enc = get_encoding()
+        text = "Ozone (O₃) at 10°C — CT ≈ 1.43 mg·min/L 水処理"
+        tokens = enc.encode_ordinary(text)
+        _, expected = enc.decode_with_offsets(tokens)
+        offsets = token_char_offsets(np.asarray(tokens))
+        assert offsets[:-1].tolist() == expected
+        assert offsets[-1] == len(text)
+
+    def test_parallel_matches_serial(self, monkeypatch):
+        monkeypatch.setattr("rag_pipeline.token_windows.MIN_PARALLEL_CHARS", 0)
+        texts = [doc.text * (i + 1) for i, doc in enumerate(SAMPLE_DOCS * 5)]
+        serial = char_spans(texts, 64, 10)
+        parallel = parallel_char_spans(texts, 64, 10, processes=2)
+        for (s1, e1), (s2, e2) in zip(serial, parallel):
+            assert s1.tolist() == s2.tolist()
+            assert e1.tolist() == e2.tolist()
+
+
 class TestHierarchicalChunker:
     def test_produces_nodes(self):
         chunker = HierarchicalChunker(chunk_sizes=[512, 128])
@@ -74,6 +157,10 @@ class TestGetChunker:
         chunker = get_chunker(ChunkStrategy.FIXED)
         assert isinstance(chunker, FixedSizeChunker)
 
+    def test_returns_native_fixed(self):
+        chunker = get_chunker(ChunkStrategy.FIXED, native=True)
+        assert isinstance(chunker, NativeFixedSizeChunker)
+
     def test_returns_hierarchical(self):
         chunker = get_chunker(ChunkStrategy.HIERARCHICAL)
         assert isinstance(chunker, HierarchicalChunker)
@@ -0,0 +1,156 @@
+import numpy as np
+from llama_index.core.schema import Document, MetadataMode
+from llama_index.core.vector_stores import SimpleVectorStore
+
+from rag_pipeline.chunkers import (
+    ChunkStrategy,
+    FixedSizeChunker,
+    HierarchicalChunker,
+    NativeFixedSizeChunker,
+)
+from rag_pipeline.chunkset import (
+    LEVEL_KEY,
+    NO_PARENT,
+    PARENT_ID_KEY,
+    ROOT_ID_KEY,
+    ChunkSet,
+    document_batches,
+)
+from rag_pipeline.embed import EmbedModelName
+from rag_pipeline.store import build_index
+from tests.test_chunkers import SAMPLE_DOCS
+
+DOCS = SAMPLE_DOCS + [
+    Document(text=SAMPLE_DOCS[0].text[::-1], metadata={"source": "reversed.pdf"})
+]
+
+
+def hierarchical_nodes():
+    return HierarchicalChunker(chunk_sizes=[128, 32]).chunk(DOCS)
+
+
+class TestChunkSet:
+    def test_round_trips_text_and_metadata(self):
+        nodes = FixedSizeChunker(chunk_size=64, chunk_overlap=10).chunk(DOCS)
+        chunks = ChunkSet.from_nodes(nodes)
+        assert len(chunks) == len(nodes)
+        for i, node in enumerate(nodes):
+            rebuilt = chunks.node(i)
+            assert rebuilt.text == node.text
+            assert rebuilt.metadata == node.metadata
+            assert rebuilt.ref_doc_id == node.ref_doc_id
+            assert rebuilt.start_char_idx == node.start_char_idx
+
+    def test_interns_metadata(self):
+        nodes = FixedSizeChunker(chunk_size=64, chunk_overlap=10).chunk(DOCS)
+        chunks = ChunkSet.from_nodes(nodes)
+        assert len(chunks.metadata) == len(DOCS)
+        assert len(chunks.doc_ids) == len(DOCS)
+
+    def test_preserves_hierarchy(self):
+        nodes = hierarchical_nodes()
+        chunks = ChunkSet.from_nodes(nodes)
+        index_of = {node.node_id: i for i, node in enumerate(nodes)}
+        for i, node in enumerate(nodes):
+            parent = node.parent_node
+            expected = index_of[parent.node_id] if parent else NO_PARENT
+            assert chunks.parent[i] == expected
+            assert len(chunks.children(i)) == len(node.child_nodes or [])
+
+    def test_materialized_relationships_point_at_materialized_ids(self):
+        chunks = ChunkSet.from_nodes(hierarchical_nodes())
+        ids = {chunks.node_id(i) for i in range(len(chunks))}
+        for i in range(len(chunks)):
+            node = chunks.node(i)
+            if node.parent_node:
+                assert node.parent_node.node_id in ids
+            for child in chunks.children(i):
+                assert chunks.node(child).parent_node.node_id == node.node_id
+
+    def test_node_ids_depend_only_on_own_document(self):
+        chunker = FixedSizeChunker(chunk_size=64)
+        chunks = ChunkSet.from_documents(chunker, DOCS)
+        rest = ChunkSet.from_documents(chunker, DOCS[1:])
+        ids = [chunks.node_id(i) for i in range(len(chunks))]
+        assert len(set(ids)) == len(ids)
+        later = [i for i in range(len(chunks)) if chunks.doc[i] != 0]
+        assert [ids[i] for i in later] == [rest.node_id(i) for i in range(len(rest))]
+
+    def test_hierarchy(self):
+        chunks = ChunkSet.from_nodes(hierarchical_nodes())
+        depth, root = chunks.hierarchy()
+        assert set(depth.tolist()) == {0, 1}
+        assert (root[depth == 0] == np.flatnonzero(depth == 0)).all()
+        assert (root[depth == 1] == chunks.parent[depth == 1]).all()
+
+    def test_hierarchy_metadata_is_not_embedded(self):
+        chunks = ChunkSet.from_nodes(hierarchical_nodes())
+        depth, root = chunks.hierarchy()
+        leaf = int(np.flatnonzero(depth == 1)[0])
+        node = chunks.node(leaf)
+        assert node.metadata[LEVEL_KEY] == 1
+        assert node.metadata[ROOT_ID_KEY] == chunks.node_id(root[leaf])
+        assert node.metadata[PARENT_ID_KEY] == node.parent_node.node_id
+        assert ROOT_ID_KEY not in node.get_metadata_str(MetadataMode.EMBED)
+        assert ROOT_ID_KEY not in node.get_metadata_str(MetadataMode.LLM)
+
+    def test_flat_sets_get_no_hierarchy_metadata(self):
+        nodes = FixedSizeChunker(chunk_size=64, chunk_overlap=10).chunk(DOCS)
+        assert LEVEL_KEY not in ChunkSet.from_nodes(nodes).node(0).metadata
+
+    def test_node_ids_are_deterministic(self):
+        nodes = FixedSizeChunker(chunk_size=64, chunk_overlap=10).chunk(DOCS)
+        first = ChunkSet.from_nodes(nodes)
+        second = ChunkSet.from_nodes(nodes)
+        assert [first.node_id(i) for i in range(len(first))] == [
+            second.node_id(i) for i in range(len(second))
+        ]
+        assert len({first.node_id(i) for i in range(len(first))}) == len(first)
+
+    def test_from_documents_matches_whole_corpus_chunking(self):
+        chunker = NativeFixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        per_doc = ChunkSet.from_documents(chunker, DOCS)
+        whole = ChunkSet.from_nodes(chunker.chunk(DOCS))
+        assert per_doc.data == whole.data
+        assert per_doc.offsets.tolist() == whole.offsets.tolist()
+
+    def test_from_documents_chunks_in_batches(self, monkeypatch):
+        chunker = NativeFixedSizeChunker(chunk_size=64, chunk_overlap=10)
+        calls = []
+        chunk = chunker.chunk
+        monkeypatch.setattr(
+            chunker, "chunk", lambda docs: calls.append(len(docs)) or chunk(docs)
+        )
+        whole = ChunkSet.from_documents(chunker, DOCS)
+        assert calls == [len(DOCS)]
+        monkeypatch.setattr("rag_pipeline.chunkset.BATCH_CHARS", 1)
+        calls.clear()
+        one_each = ChunkSet.from_documents(chunker, DOCS)
+        assert calls == [1] * len(DOCS)
+        assert [whole.node_id(i) for i in range(len(whole))] == [
+            one_each.node_id(i) for i in range(len(one_each))
+        ]
+
+    def test_document_batches(self):
+        docs = [Document(text="x" * n) for n in (3, 3, 5, 1)]
+        sizes = [[len(d.text) for d in b] for b in document_batches(docs, 6)]
+        assert sizes == [[3, 3], [5, 1]]
+
+    def test_iter_nodes_batches(self):
+        chunks = ChunkSet.from_nodes(hierarchical_nodes())
+        batches = list(chunks.iter_nodes(batch_size=5))
+        assert sum(len(b) for b in batches) == len(chunks)
+        assert all(len(b) <= 5 for b in batches)
+
+
+class TestBuildIndexFromChunkSet:
+    def test_inserts_every_chunk(self, monkeypatch):
+        monkeypatch.setenv("EMBED_BACKEND", "hash")
+        store = SimpleVectorStore()
+        monkeypatch.setattr(
+            "rag_pipeline.store.get_vector_store", lambda strategy, model: store
+        )
+        monkeypatch.setattr("rag_pipeline.store.INSERT_BATCH_SIZE", 4)
+        chunks = ChunkSet.from_nodes(hierarchical_nodes())
+        build_index(chunks, ChunkStrategy.HIERARCHICAL, EmbedModelName.VOYAGE_3_5)
+        assert len(store.data.embedding_dict) == len(chunks)
@@ -0,0 +1,199 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from rag_pipeline.coalesce import (
+    DEFAULT_KEY,
+    SingleFlight,
+    copy_error,
+    normalize_question,
+    parse_key_fields,
+    request_key,
+)
+from rag_pipeline.schemas import QueryRequest
+
+
+def run_together(flight, calls, n):
+    """Call ``flight.do`` from ``n`` threads while the leader is blocked."""
+    release = threading.Event()
+
+    def slow():
+        release.wait()
+        return object()
+
+    with ThreadPoolExecutor(n) as pool:
+        futures = [pool.submit(flight.do, key, fn or slow) for key, fn in calls]
+        while flight.stats()["requests"] < len(calls):
+            time.sleep(0.001)
+        release.set()
+        return [f.result() for f in futures]
+
+
+class TestKey:
+    def test_default_fields(self):
+        assert parse_key_fields(None) == DEFAULT_KEY
+        assert parse_key_fields("") == DEFAULT_KEY
+        assert parse_key_fields("off") is None
+        assert parse_key_fields("question, strategy") == ("question", "strategy")
+
+    def test_rejects_bad_fields(self):
+        with pytest.raises(ValueError, match="unknown"):
+            parse_key_fields("question,llm")
+        with pytest.raises(ValueError, match="question"):
+            parse_key_fields("strategy,model")
+
+    def test_normalizes_question(self):
+        assert normalize_question("  What is the  MCL\nfor Bromate?? ") == (
+            "what is the mcl for bromate"
+        )
+        a = QueryRequest(question="What is the MCL?")
+        b = QueryRequest(question="what is the mcl")
+        assert request_key(a, DEFAULT_KEY) == request_key(b, DEFAULT_KEY)
+        assert request_key(a, ("raw_question",)) != request_key(b, ("raw_question",))
+        c = QueryRequest(question="what is the mcl", top_k=3)
+        assert request_key(a, DEFAULT_KEY) != request_key(c, DEFAULT_KEY)
+        assert request_key(a, ("question",)) == request_key(c, ("question",))
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        results = run_together(flight, [("k", None)] * 5, 5)
+        assert all(r is results[0] for r in results)
+        assert flight.stats() == {
+            "requests": 5,
+            "executions": 1,
+            "coalesced": 4,
+            "in_flight": 0,
+            "max_followers": 4,
+        }
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+        a, b = run_together(flight, [("a", None), ("b", None)], 2)
+        assert a is not b
+        assert flight.stats()["executions"] == 2
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        assert flight.do("k", lambda: 1) == 1
+        assert flight.do("k", lambda: 2) == 2
+        assert flight.stats()["coalesced"] == 0
+
+    def test_errors_reach_every_caller(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def fail():
+            started.set()
+            release.wait()
+            raise RuntimeError("db down")
+
+        with ThreadPoolExecutor(3) as pool:
+            leader = pool.submit(flight.do, "k", fail)
+            started.wait()
+            followers = [pool.submit(flight.do, "k", fail) for _ in range(2)]
+            while flight.stats()["coalesced"] < 2:
+                time.sleep(0.001)
+            release.set()
+            errors = []
+            for future in [leader, *followers]:
+                with pytest.raises(RuntimeError, match="db down") as info:
+                    future.result()
+                errors.append(info.value)
+        assert flight.do("k", lambda: "ok") == "ok"
+        # Each follower raises its own copy, chained to the leader's error.
+        assert len({id(e) for e in errors}) == 3
+        assert all(e.__cause__ is errors[0] for e in errors[1:])
+
+    def test_error_copies_keep_attributes(self):
+        error = HTTPException(status_code=422, detail="bad model")
+        clone = copy_error(error)
+        assert clone is not error
+        assert type(clone) is HTTPException
+        assert (clone.status_code, clone.detail) == (422, "bad model")
+
+
+class TestAsyncSingleFlight:
+    def test_waiters_share_one_execution(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def answer():
+            calls.append(threading.get_ident())
+            await asyncio.sleep(0.05)
+            return object()
+
+        async def main():
+            return await asyncio.gather(*(flight.ado("k", answer) for _ in range(5)))
+
+        results = asyncio.run(main())
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert flight.stats()["coalesced"] == 4
+        assert flight.stats()["in_flight"] == 0
+
+    def test_waiters_on_other_loops(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        async def leader():
+            started.set()
+            await asyncio.to_thread(release.wait)
+            return "shared"
+
+        async def follower():
+            return await flight.ado("k", leader)
+
+        with ThreadPoolExecutor(3) as pool:
+            first = pool.submit(asyncio.run, flight.ado("k", leader))
+            started.wait()
+            rest = [pool.submit(asyncio.run, follower()) for _ in range(2)]
+            while flight.stats()["coalesced"] < 2:
+                time.sleep(0.001)
+            release.set()
+            assert [f.result() for f in [first, *rest]] == ["shared"] * 3
+
+    def test_waiters_retry_after_the_leader_is_cancelled(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def answer():
+            calls.append(len(calls))
+            await asyncio.sleep(0.05 if len(calls) == 1 else 0.01)
+            return len(calls)
+
+        async def main():
+            leader = asyncio.create_task(flight.ado("k", answer))
+            await asyncio.sleep(0)
+            waiters = [asyncio.create_task(flight.ado("k", answer)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await asyncio.gather(*waiters)
+
+        assert asyncio.run(main()) == [2, 2, 2]
+        assert flight.stats()["executions"] == 2
+        assert flight.stats()["in_flight"] == 0
+
+    def test_errors_are_copied_per_waiter(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("db down")
+
+        async def main():
+            return await asyncio.gather(
+                *(flight.ado("k", fail) for _ in range(3)), return_exceptions=True
+            )
+
+        errors = asyncio.run(main())
+        assert all(isinstance(e, RuntimeError) for e in errors)
+        assert len({id(e) for e in errors}) == 3
+        assert all(e.__cause__ is errors[0] for e in errors[1:])
@@ -1,9 +1,21 @@
 import os
 from unittest.mock import patch
 
+import pytest
+import voyageai.error
 from llama_index.embeddings.voyageai import VoyageEmbedding
+from llama_index.embeddings.voyageai.base import VOYAGE_TOTAL_TOKEN_LIMITS
 
+from rag_pipeline.cache import QUERY_EMBEDDINGS_COLLECTION
 from rag_pipeline.embed import EmbedModelName, get_embed_model
+from rag_pipeline.voyage import (
+    BACKOFF_CAP,
+    BATCH_HEADROOM,
+    ThrottledVoyageEmbedding,
+    backoff_delay,
+    get_rate_limiter,
+)
+from tests.fake_voyage import FakeVoyageServer, fake_vector
 
 
 class TestEmbedModelName:
@@ -27,3 +39,124 @@ class TestGetEmbedModel:
         for model in EmbedModelName:
             embed = get_embed_model(model)
             assert embed.model_name == model.value
+
+
+@patch.dict(os.environ, {"VOYAGE_API_KEY": "test-key"})
+@patch("rag_pipeline.voyage.BACKOFF_BASE", 0.0)
+class TestThrottledVoyageEmbedding:
+    def test_get_embed_model_is_throttled(self):
+        embed = get_embed_model(EmbedModelName.VOYAGE_3_5)
+        assert isinstance(embed, ThrottledVoyageEmbedding)
+
+    def test_embeds_through_fake_server(self):
+        with FakeVoyageServer() as server:
+            embed = ThrottledVoyageEmbedding("voyage-3.5", base_url=server.base_url)
+            vectors = embed.get_text_embedding_batch(["alpha", "beta"])
+        assert vectors == [fake_vector("alpha"), fake_vector("beta")]
+
+    def test_uses_base_url_from_env(self):
+        with FakeVoyageServer() as server:
+            with patch.dict(os.environ, {"VOYAGE_BASE_URL": server.base_url}):
+                embed = get_embed_model(EmbedModelName.VOYAGE_3_LARGE)
+            assert embed.get_query_embedding("q") == fake_vector("q")
+            assert server.requests[0]["input_type"] == "query"
+
+    def test_batches_by_token_count(self):
+        texts = [f"{i:04d}" + "x" * 396 for i in range(10)]  # ~100 tokens each
+        with FakeVoyageServer() as server:
+            embed = ThrottledVoyageEmbedding("voyage-3.5", base_url=server.base_url)
+            embed._batch_tokens = 250
+            vectors = embed.get_text_embedding_batch(texts)
+        assert [len(r["input"]) for r in server.requests] == [2, 2, 2, 2, 2]
+        assert vectors == [fake_vector(t) for t in texts]
+
+    def test_runs_batches_concurrently_in_order(self):
+        texts = [f"text {i} " + "x" * 400 for i in range(8)]
+        with FakeVoyageServer(delay=0.05) as server:
+            embed = ThrottledVoyageEmbedding(
+                "voyage-3.5", base_url=server.base_url, max_concurrency=4
+            )
+            embed._batch_tokens = 100
+            vectors = embed.get_text_embedding_batch(texts)
+        assert server.max_in_flight > 1
+        assert vectors == [fake_vector(t) for t in texts]
+
+    def test_retries_rate_limit_and_shrinks_budget(self):
+        with FakeVoyageServer(fail_first=2) as server:
+            embed = ThrottledVoyageEmbedding("voyage-3.5", base_url=server.base_url)
+            before = embed._batch_tokens
+            vectors = embed.get_text_embedding_batch(["alpha"])
+        assert len(server.requests) == 3
+        assert vectors == [fake_vector("alpha")]
+        assert embed._batch_tokens < before
+
+    def test_packs_batches_with_headroom(self):
+        embed = ThrottledVoyageEmbedding("voyage-3.5")
+        limit = VOYAGE_TOTAL_TOKEN_LIMITS["voyage-3.5"]
+        assert embed._max_batch_tokens == int(limit * BATCH_HEADROOM)
+
+    def test_splits_batch_over_token_limit(self):
+        # Four ~100-token texts against a 250-token limit the estimate missed.
+        texts = [f"{i:04d}" + "x" * 396 for i in range(4)]
+        with FakeVoyageServer(max_batch_tokens=250) as server:
+            embed = ThrottledVoyageEmbedding("voyage-3.5", base_url=server.base_url)
+            vectors = embed.get_text_embedding_batch(texts)
+        assert [len(r["input"]) for r in server.requests] == [4, 2, 2]
+        assert vectors == [fake_vector(t) for t in texts]
+
+    def test_single_text_over_token_limit_fails(self):
+        with FakeVoyageServer(max_batch_tokens=10) as server:
+            embed = ThrottledVoyageEmbedding("voyage-3.5", base_url=server.base_url)
+            with pytest.raises(voyageai.error.InvalidRequestError):
+                embed.get_text_embedding_batch(["x" * 400])
+        assert len(server.requests) == 1
+
+    def test_other_invalid_requests_are_not_split(self):
+        with FakeVoyageServer(fail_first=1, fail_status=400) as server:
+            embed = ThrottledVoyageEmbedding("voyage-3.5", base_url=server.base_url)
+            with pytest.raises(voyageai.error.InvalidRequestError):
+                embed.get_text_embedding_batch(["alpha", "beta"])
+        assert len(server.requests) == 1
+
+    def test_gives_up_after_max_retries(self):
+        with FakeVoyageServer(fail_first=10) as server:
+            embed = ThrottledVoyageEmbedding(
+                "voyage-3.5", base_url=server.base_url, max_retries=2
+            )
+            with pytest.raises(voyageai.error.RateLimitError):
+                embed.get_text_embedding_batch(["alpha"])
+        assert len(server.requests) == 3
+
+
+class TestRateLimiter:
+    def test_shared_per_model(self):
+        assert get_rate_limiter("voyage-3.5") is get_rate_limiter("voyage-3.5")
+        assert get_rate_limiter("voyage-3.5") is not get_rate_limiter("voyage-law-2")
+
+
+class TestBackoffDelay:
+    def test_bounded_by_cap(self):
+        for attempt in range(20):
+            assert 0 <= backoff_delay(attempt) <= BACKOFF_CAP
+
+
+class TestSharedQueryCache:
+    def test_backends_do_not_share_vectors(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("RAG_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+        monkeypatch.setenv("VOYAGE_API_KEY", "test-key")
+        monkeypatch.delenv("RAG_QUERY_VECTORS", raising=False)
+        monkeypatch.setenv("EMBED_BACKEND", "hash")
+        get_embed_model(EmbedModelName.VOYAGE_3_5).get_query_embedding("bromate")
+        monkeypatch.setenv("EMBED_BACKEND", "voyage")
+        voyage = get_embed_model(EmbedModelName.VOYAGE_3_5)
+        assert voyage.query_cache.get("bromate", QUERY_EMBEDDINGS_COLLECTION) is None
+
+
+class TestOfflineBackend:
+    @patch.dict(os.environ, {"EMBED_BACKEND": "hash"})
+    def test_hash_backend(self):
+        from rag_pipeline.offline import HashEmbedding
+
+        embed = get_embed_model(EmbedModelName.VOYAGE_3_5)
+        assert isinstance(embed, HashEmbedding)
+        assert embed.model_name == "voyage-3.5"
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+from bench.importtime import (
+    LAZY_PACKAGES,
+    cumulative_ms,
+    lazy_violations,
+    parse_importtime,
+)
+
+SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:      2000 |       5000 |     llama_index.core.schema
+import time:       300 |       8300 | rag_pipeline.api
+"""
+
+
+def _modules_after(code: str) -> set[str]:
+    script = f"{code}\nimport sys\nprint('\\n'.join(sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return {m.split(".")[0] for m in result.stdout.split()}
+
+
+class TestLazyImports:
+    def test_api_import_skips_heavy_packages(self):
+        loaded = _modules_after("import rag_pipeline.api")
+        assert not loaded & set(LAZY_PACKAGES)
+
+    def test_metadata_routes_skip_heavy_packages(self):
+        loaded = _modules_after(
+            "from fastapi.testclient import TestClient\n"
+            "from rag_pipeline.api import app\n"
+            "c = TestClient(app)\n"
+            "for path in ('/health', '/strategies', '/models'):\n"
+            "    assert c.get(path).status_code == 200"
+        )
+        assert "llama_index" not in loaded
+
+    def test_query_cli_import_skips_heavy_packages(self):
+        loaded = _modules_after("import rag_pipeline.query")
+        assert not loaded & set(LAZY_PACKAGES)
+
+
+class TestParseImporttime:
+    def test_parses_records(self):
+        records = parse_importtime(SAMPLE)
+        assert [r.module for r in records] == [
+            "_io",
+            "llama_index.core.schema",
+            "rag_pipeline.api",
+        ]
+        assert records[1].depth == 2
+        assert cumulative_ms(records, "rag_pipeline.api") == 8.3
+
+    def test_reports_lazy_violations(self):
+        assert lazy_violations(parse_importtime(SAMPLE)) == ["llama_index"]
@@ -0,0 +1,176 @@
+import threading
+import time
+
+import pytest
+from llama_index.core import VectorStoreIndex
+from llama_index.core.storage.kvstore import SimpleKVStore
+
+from rag_pipeline.cache import SharedCache
+from rag_pipeline.chunkers import ChunkStrategy
+from rag_pipeline.embed import EmbedModelName
+from rag_pipeline.ingestion import (
+    IngestionService,
+    JobStore,
+    QueryPressure,
+    QueueFull,
+    variant_index,
+)
+from rag_pipeline.offline import HashEmbedding
+
+TEXT = "Bromate forms when ozone meets bromide in source water. " * 200
+MODELS = [EmbedModelName.VOYAGE_3_LARGE, EmbedModelName.VOYAGE_3_5]
+
+
+def wait_for(jobs: JobStore, job_id: str) -> dict:
+    for _ in range(500):
+        job = jobs.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job stuck in {job['status']}")
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv("EMBED_BACKEND", "hash")
+    monkeypatch.delenv("RAG_CACHE_PATH", raising=False)
+    indexes = {}
+
+    def index_for(strategy, model):
+        key = (strategy, model)
+        if key not in indexes:
+            indexes[key] = VectorStoreIndex(nodes=[], embed_model=HashEmbedding())
+        return indexes[key]
+
+    service = IngestionService(JobStore(SimpleKVStore()), index_for=index_for)
+    service.indexes = indexes
+    yield service
+    service.stop()
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "rule.txt"
+    path.write_text(TEXT)
+    return path
+
+
+class TestQueryPressure:
+    def test_idle_returns_at_once(self):
+        assert QueryPressure().wait_for_idle(0)
+
+    def test_waits_for_queries_to_finish(self):
+        pressure = QueryPressure()
+        started, release = threading.Event(), threading.Event()
+
+        def query():
+            with pressure.query():
+                started.set()
+                release.wait()
+
+        thread = threading.Thread(target=query)
+        thread.start()
+        started.wait()
+        assert pressure.in_flight == 1
+        assert not pressure.wait_for_idle(0.01)
+        threading.Timer(0.05, release.set).start()
+        assert pressure.wait_for_idle(5)
+        thread.join()
+
+
+class TestJobStore:
+    def test_progress_accumulates(self):
+        jobs = JobStore(SimpleKVStore())
+        job = jobs.create(filename="a.pdf")
+        assert job["status"] == "queued"
+        jobs.progress(job["id"], "embed", total=10)
+        jobs.progress(job["id"], "embed", done=4)
+        assert jobs.get(job["id"])["stages"]["embed"] == {"done": 4, "total": 10}
+        assert jobs.get("missing") is None
+
+    def test_shared_between_stores(self, tmp_path):
+        job = JobStore(SharedCache(tmp_path / "c.sqlite", "ingest")).create()
+        other = JobStore(SharedCache(tmp_path / "c.sqlite", "ingest"))
+        assert other.get(job["id"])["id"] == job["id"]
+
+
+class TestIngestionService:
+    def test_runs_every_stage(self, service, document):
+        service.start()
+        job = service.submit(document, [ChunkStrategy.FIXED], MODELS)
+        job = wait_for(service.jobs, job["id"])
+        assert job["status"] == "done", job["error"]
+        stages = job["stages"]
+        assert stages["parse"] == {"done": 1, "total": 1}
+        assert stages["chunk"] == {"done": 1, "total": 1}
+        chunks = stages["embed"]["total"] // len(MODELS)
+        assert chunks > 1
+        expected = {"done": chunks * len(MODELS), "total": chunks * len(MODELS)}
+        assert stages["embed"] == stages["insert"] == expected
+        for model in MODELS:
+            index = service.indexes[(ChunkStrategy.FIXED, model)]
+            assert len(index.docstore.docs) == chunks
+
+    def test_reingesting_replaces_rows(self, service, document):
+        service.start()
+        for _ in range(2):
+            job = service.submit(document, [ChunkStrategy.FIXED], MODELS[:1])
+            assert wait_for(service.jobs, job["id"])["status"] == "done"
+        inserted = service.jobs.get(job["id"])["stages"]["insert"]["done"]
+        index = service.indexes[(ChunkStrategy.FIXED, MODELS[0])]
+        assert len(index.index_struct.nodes_dict) == inserted
+
+    def test_failed_reingest_keeps_rows(self, service, document, monkeypatch):
+        service.start()
+        job = service.submit(document, [ChunkStrategy.FIXED], MODELS[:1])
+        assert wait_for(service.jobs, job["id"])["status"] == "done"
+        index = service.indexes[(ChunkStrategy.FIXED, MODELS[0])]
+        rows = len(index.index_struct.nodes_dict)
+        assert rows
+
+        def timeout(self, texts):
+            raise TimeoutError("embedding timed out")
+
+        monkeypatch.setattr(HashEmbedding, "_get_text_embeddings", timeout)
+        job = service.submit(document, [ChunkStrategy.FIXED], MODELS[:1])
+        assert wait_for(service.jobs, job["id"])["status"] == "failed"
+        assert len(index.index_struct.nodes_dict) == rows
+
+    def test_bounded_queue(self, service, document):
+        service._queue.maxsize = 1
+        service.submit(document, [ChunkStrategy.FIXED], MODELS)
+        assert service.full()
+        with pytest.raises(QueueFull):
+            service.submit(document, [ChunkStrategy.FIXED], MODELS)
+
+    def test_failure_is_recorded(self, service, tmp_path):
+        service.start()
+        job = service.submit(tmp_path / "missing.pdf", [ChunkStrategy.FIXED], MODELS)
+        job = wait_for(service.jobs, job["id"])
+        assert job["status"] == "failed"
+        assert job["error"]
+
+    def test_yields_to_queries(self, service, document):
+        service.start()
+        with service.pressure.query():
+            job = service.submit(document, [ChunkStrategy.FIXED], MODELS[:1])
+            time.sleep(0.3)
+            job = service.jobs.get(job["id"])
+            assert job["status"] == "running"
+            assert job["stages"]["embed"]["done"] == 0
+        assert wait_for(service.jobs, job["id"])["status"] == "done"
+
+    def test_jobs_reuse_the_query_index(self, monkeypatch):
+        from rag_pipeline.query import _cached_index
+
+        loads = []
+        monkeypatch.setattr(
+            "rag_pipeline.store.load_index", lambda *key: loads.append(key) or object()
+        )
+        _cached_index.cache_clear()
+        try:
+            key = (ChunkStrategy.FIXED, MODELS[0])
+            assert variant_index(*key) is variant_index(*key) is _cached_index(*key)
+        finally:
+            _cached_index.cache_clear()
+        assert loads == [key]
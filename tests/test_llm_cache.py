@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from anthropic.types import Message
+from llama_index.core.llms import ChatMessage
+from llama_index.llms.anthropic import Anthropic
+
+from rag_pipeline.cache import SharedCache
+from rag_pipeline.llm_cache import CachedClient, request_key, stats, with_llm_cache
+from rag_pipeline.query import get_llm
+
+MODEL = "claude-haiku-4-5-20251001"
+
+
+class FakeMessages:
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **params):
+        self.calls.append(params)
+        return Message.model_validate(
+            {
+                "id": f"msg_{len(self.calls)}",
+                "type": "message",
+                "role": "assistant",
+                "model": params["model"],
+                "content": [{"type": "text", "text": f"answer {len(self.calls)}"}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": {"input_tokens": 1, "output_tokens": 2},
+            }
+        )
+
+
+class AsyncFakeMessages(FakeMessages):
+    async def create(self, **params):
+        return super().create(**params)
+
+
+@pytest.fixture
+def cached_llm(tmp_path, monkeypatch):
+    """An Anthropic LLM whose SDK clients answer locally, behind the cache."""
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    stats.reset()
+    llm = Anthropic(model=MODEL)
+    messages, async_messages = FakeMessages(), AsyncFakeMessages()
+    monkeypatch.setattr(llm._client, "messages", messages)
+    monkeypatch.setattr(llm._aclient, "messages", async_messages)
+    with_llm_cache(llm, SharedCache(tmp_path / "llm.sqlite", namespace="llm"))
+    return llm, messages.calls, async_messages.calls
+
+
+class TestRequestKey:
+    def test_covers_model_and_params(self):
+        params = {"model": MODEL, "messages": [{"role": "user", "content": "hi"}]}
+        key = request_key(params)
+        assert key.startswith(f"{MODEL}:")
+        assert request_key(dict(reversed(params.items()))) == key
+        assert request_key({**params, "temperature": 0.5}) != key
+        assert request_key({**params, "model": "claude-sonnet-4-5"}) != key
+
+
+class TestWithLLMCache:
+    def test_repeated_prompt_is_served_from_cache(self, cached_llm):
+        llm, sync_calls, _ = cached_llm
+        assert llm.complete("hi").text == "answer 1"
+        assert llm.complete("hi").text == "answer 1"
+        assert len(sync_calls) == 1
+        assert stats.counts() == {MODEL: (1, 1)}
+
+    def test_params_are_part_of_the_key(self, cached_llm):
+        llm, sync_calls, _ = cached_llm
+        llm.complete("hi")
+        assert llm.complete("hi", temperature=0.9).text == "answer 2"
+        assert len(sync_calls) == 2
+
+    def test_async_and_chat_share_entries(self, cached_llm):
+        llm, sync_calls, async_calls = cached_llm
+        llm.complete("hi")
+        assert asyncio.run(llm.acomplete("hi")).text == "answer 1"
+        chat = llm.chat([ChatMessage(role="user", content="hi")])
+        assert chat.message.content == "answer 1"
+        assert len(sync_calls) + len(async_calls) == 1
+        assert stats.counts() == {MODEL: (2, 1)}
+
+    def test_persists_across_clients(self, cached_llm, tmp_path, monkeypatch):
+        cached_llm[0].complete("hi")
+        other = Anthropic(model=MODEL)
+        messages = FakeMessages()
+        monkeypatch.setattr(other._client, "messages", messages)
+        with_llm_cache(other, SharedCache(tmp_path / "llm.sqlite", namespace="llm"))
+        assert other.complete("hi").text == "answer 1"
+        assert messages.calls == []
+
+    def test_keeps_llm_class(self, cached_llm):
+        llm, _, _ = cached_llm
+        # RAGAS chooses call arguments from the LLM's class name.
+        assert type(llm) is Anthropic
+        assert isinstance(llm._client, CachedClient)
+
+
+class TestGetLLM:
+    def test_opt_in(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+        monkeypatch.delenv("LLM_BACKEND", raising=False)
+        monkeypatch.delenv("RAG_LLM_CACHE", raising=False)
+        assert not isinstance(get_llm()._client, CachedClient)
+        monkeypatch.setenv("RAG_LLM_CACHE", str(tmp_path / "llm.sqlite"))
+        assert isinstance(get_llm()._client, CachedClient)
+
+    def test_fake_backend_is_left_alone(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("LLM_BACKEND", "fake")
+        monkeypatch.setenv("RAG_LLM_CACHE", str(tmp_path / "llm.sqlite"))
+        assert not hasattr(get_llm(), "_client")
@@ -0,0 +1,121 @@
+import json
+from unittest.mock import patch
+
+from bench.loadtest import (
+    ALL,
+    Sample,
+    compare,
+    generate_requests,
+    load_requests,
+    make_sender,
+    percentile,
+    run_closed_loop,
+    run_open_loop,
+    summarize,
+)
+
+
+class TestLoadRequests:
+    def test_reads_query_payloads_and_eval_entries(self, tmp_path):
+        path = tmp_path / "queries.jsonl"
+        rows = [
+            {"question": "q1", "strategy": "semantic", "extra": 1},
+            {"user_input": "q2", "reference": "r"},
+            {"title": "not a query"},
+        ]
+        path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n")
+        assert load_requests(path) == [
+            {"question": "q1", "strategy": "semantic"},
+            {"question": "q2"},
+        ]
+
+    def test_generated_traffic_is_seeded(self):
+        assert generate_requests(20, seed=1) == generate_requests(20, seed=1)
+
+
+class TestPercentile:
+    def test_interpolates(self):
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        assert percentile(values, 50) == 3.0
+        assert percentile(values, 100) == 5.0
+        assert percentile(values, 95) == 4.8
+
+
+class TestSummarize:
+    def test_groups_by_variant(self):
+        samples = [
+            Sample("fixed_voyage-3.5", 0.1, True),
+            Sample("fixed_voyage-3.5", 0.3, False),
+            Sample("semantic_voyage-3.5", 0.2, True),
+        ]
+        report = summarize(samples, elapsed=1.0)
+        assert set(report) == {"fixed_voyage-3.5", "semantic_voyage-3.5", ALL}
+        assert report["fixed_voyage-3.5"]["error_rate"] == 0.5
+        assert report["fixed_voyage-3.5"]["p50_ms"] == 100.0
+        assert report[ALL]["requests"] == 3
+        assert report[ALL]["throughput"] == 2.0
+
+
+class TestCompare:
+    BASE = {
+        ALL: {
+            "requests": 100,
+            "error_rate": 0.0,
+            "throughput": 50.0,
+            "p50_ms": 10.0,
+            "p95_ms": 20.0,
+            "p99_ms": 30.0,
+        }
+    }
+
+    def test_no_regression_within_tolerance(self):
+        current = {ALL: {**self.BASE[ALL], "p95_ms": 23.0, "throughput": 45.0}}
+        assert compare(current, self.BASE) == []
+
+    def test_flags_latency_errors_and_throughput(self):
+        current = {
+            ALL: {
+                **self.BASE[ALL],
+                "p99_ms": 60.0,
+                "error_rate": 0.05,
+                "throughput": 20.0,
+            }
+        }
+        regressions = compare(current, self.BASE)
+        assert len(regressions) == 3
+
+    def test_flags_group_with_no_successes(self):
+        samples = [Sample("hierarchical/voyage-3.5", 0.01, False)] * 4
+        current = summarize(samples, elapsed=1.0)
+        regressions = compare(current, self.BASE)
+        assert any("p50_ms" in r for r in regressions)
+        assert any("error_rate" in r for r in regressions)
+
+    def test_flags_nan_percentiles_alone(self):
+        nan = float("nan")
+        current = {ALL: {**self.BASE[ALL], "p50_ms": nan, "p95_ms": nan, "p99_ms": nan}}
+        assert len(compare(current, self.BASE)) == 3
+
+    def test_nan_in_both_is_not_a_regression(self):
+        nan = float("nan")
+        base = {ALL: {**self.BASE[ALL], "p50_ms": nan}}
+        current = {ALL: {**self.BASE[ALL], "p50_ms": nan}}
+        assert compare(current, base) == []
+
+
+@patch("rag_pipeline.api.MOCK_MODE", True)
+class TestInProcessRun:
+    def test_closed_loop(self):
+        send = make_sender(None)
+        samples, elapsed = run_closed_loop(
+            send, generate_requests(5), concurrency=2, total=10
+        )
+        assert len(samples) == 10
+        assert all(s.ok for s in samples)
+        assert elapsed > 0
+
+    def test_open_loop(self):
+        send = make_sender(None)
+        samples, _ = run_open_loop(send, generate_requests(5), rps=100, duration=0.1)
+        assert len(samples) == 10
+        assert all(s.ok for s in samples)
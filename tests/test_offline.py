@@ -0,0 +1,70 @@
+import time
+
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import TextNode
+
+from rag_pipeline.offline import HASH_EMBED_DIM, FakeLLM, HashEmbedding
+
+
+class TestHashEmbedding:
+    def test_dimension_matches_store(self):
+        from rag_pipeline.store import EMBED_DIM
+
+        assert HASH_EMBED_DIM == EMBED_DIM
+        assert len(HashEmbedding().get_text_embedding("bromate")) == EMBED_DIM
+
+    def test_deterministic(self):
+        a = HashEmbedding().get_text_embedding("ozone disinfection")
+        b = HashEmbedding().get_text_embedding("ozone disinfection")
+        assert a == b
+
+    def test_normalized(self):
+        vector = HashEmbedding().get_text_embedding("ozone disinfection CT values")
+        assert abs(sum(v * v for v in vector) - 1.0) < 1e-9
+
+    def test_models_have_distinct_spaces(self):
+        a = HashEmbedding(model_name="voyage-3.5").get_text_embedding("ozone")
+        b = HashEmbedding(model_name="voyage-law-2").get_text_embedding("ozone")
+        assert a != b
+
+    def test_shared_words_score_higher(self):
+        embed = HashEmbedding()
+        query = embed.get_query_embedding("bromate maximum contaminant level")
+        related = embed.get_text_embedding("The maximum contaminant level for bromate")
+        unrelated = embed.get_text_embedding("Sequencing batch reactors treat sewage")
+        assert embed.similarity(query, related) > embed.similarity(query, unrelated)
+
+
+class TestFakeLLM:
+    def test_complete_is_deterministic(self):
+        llm = FakeLLM()
+        assert llm.complete("a b c").text == llm.complete("a b c").text
+        assert llm.complete("a b c").text.startswith("[offline]")
+
+    def test_respects_answer_tokens(self):
+        llm = FakeLLM(answer_tokens=4)
+        assert len(llm.complete("one two three four five six").text.split()) == 4
+
+    def test_latency_and_token_rate(self):
+        llm = FakeLLM(latency=0.05, tokens_per_second=100, answer_tokens=5)
+        start = time.perf_counter()
+        llm.complete("one two three four five")
+        assert time.perf_counter() - start >= 0.1
+
+    def test_stream_matches_complete(self):
+        llm = FakeLLM(answer_tokens=6)
+        chunks = list(llm.stream_complete("one two three four five"))
+        assert chunks[-1].text == llm.complete("one two three four five").text
+
+
+class TestOfflineQueryEngine:
+    def test_answers_from_in_memory_index(self):
+        nodes = [
+            TextNode(text="The MCL for bromate is 0.010 mg/L."),
+            TextNode(text="SBRs treat wastewater in fill and draw cycles."),
+        ]
+        index = VectorStoreIndex(nodes=nodes, embed_model=HashEmbedding())
+        engine = index.as_query_engine(llm=FakeLLM(), similarity_top_k=1)
+        response = engine.query("What is the MCL for bromate?")
+        assert str(response).startswith("[offline]")
+        assert "bromate" in response.source_nodes[0].get_content()
@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+import pytest
+from llama_index.vector_stores.postgres.base import get_data_model
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.schema import CreateIndex
+
+from rag_pipeline.chunkers import ChunkStrategy
+from rag_pipeline.embed import EmbedModelName
+from rag_pipeline.partitions import (
+    PARTITIONED_TABLE,
+    create_partition_ddl,
+    metadata_index_ddl,
+    parent_ddl,
+    plan_detach,
+    plan_migration,
+    search_variants,
+)
+from rag_pipeline.store import (
+    INDEXED_METADATA_KEYS,
+    StorageLayout,
+    get_vector_store,
+    make_table_name,
+    storage_layout,
+)
+
+FIXED = (ChunkStrategy.FIXED, EmbedModelName.VOYAGE_3_LARGE)
+SEMANTIC = (ChunkStrategy.SEMANTIC, EmbedModelName.VOYAGE_3_LARGE)
+HIERARCHICAL = (ChunkStrategy.HIERARCHICAL, EmbedModelName.VOYAGE_3_5)
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def mappings(self):
+        return iter(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeConnection:
+    """Answers catalog lookups from ``partitions``: table -> relispartition."""
+
+    def __init__(self, partitions=None, rows=()):
+        self.partitions = partitions or {}
+        self.rows = list(rows)
+        self.executed = []
+
+    def execute(self, statement, params=None):
+        self.executed.append((str(statement), params))
+        if "pg_class" in str(statement):
+            name = params["name"]
+            found = name in self.partitions
+            return FakeResult([(self.partitions[name],)] if found else [])
+        return FakeResult(self.rows)
+
+
+class TestDDL:
+    def test_metadata_indexes_match_pgvectorstore(self):
+        strategy, model = HIERARCHICAL
+        name = make_table_name(strategy, model)
+        table = get_data_model(
+            declarative_base(),
+            name,
+            "public",
+            False,
+            "english",
+            True,
+            indexed_metadata_keys=INDEXED_METADATA_KEYS[strategy],
+        ).__table__
+        expected = {
+            str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+            .replace("public.", "")
+            .replace("USING btree ", "")
+            .replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS")
+            for index in table.indexes
+            if not index.name.endswith("_idx_1")
+        }
+        assert set(metadata_index_ddl(strategy, model)) == expected
+
+    def test_partition_has_variant_default(self):
+        [create] = create_partition_ddl(*FIXED)
+        assert "PARTITION OF data_rag_chunks" in create
+        assert "variant DEFAULT 'fixed_voyage_3_large'" in create
+        assert create.endswith("FOR VALUES IN ('fixed_voyage_3_large')")
+
+
+class TestPlanMigration:
+    def test_attaches_tables_and_creates_missing(self):
+        conn = FakeConnection({"data_fixed_voyage_3_large": False})
+        statements = plan_migration(conn, [FIXED, SEMANTIC])
+        assert statements[: len(parent_ddl())] == parent_ddl()
+        rest = statements[len(parent_ddl()) :]
+        assert rest[0].startswith("ALTER TABLE data_fixed_voyage_3_large ADD COLUMN")
+        assert rest[1].endswith(
+            "ATTACH PARTITION data_fixed_voyage_3_large "
+            "FOR VALUES IN ('fixed_voyage_3_large')"
+        )
+        assert rest[2:] == create_partition_ddl(*SEMANTIC)
+
+    def test_skips_existing_partitions(self):
+        conn = FakeConnection({"data_fixed_voyage_3_large": True})
+        assert plan_migration(conn, [FIXED]) == parent_ddl()
+
+    def test_detach_only_partitions(self):
+        conn = FakeConnection(
+            {"data_fixed_voyage_3_large": True, "data_semantic_voyage_3_large": False}
+        )
+        assert plan_detach(conn, [FIXED, SEMANTIC]) == [
+            f"ALTER TABLE {PARTITIONED_TABLE} "
+            "DETACH PARTITION data_fixed_voyage_3_large",
+            "ALTER TABLE data_fixed_voyage_3_large DROP COLUMN variant",
+        ]
+
+
+class TestSearchVariants:
+    def test_one_statement_for_all_variants(self):
+        rows = [
+            {"variant": "fixed_voyage_3_large", "node_id": "a", "score": 0.9},
+            {"variant": "semantic_voyage_3_large", "node_id": "b", "score": 0.8},
+        ]
+        conn = FakeConnection(rows=rows)
+        results = search_variants(
+            conn,
+            {
+                "fixed_voyage_3_large": [0.1, 0.2],
+                "semantic_voyage_3_large": [0.3, 0.4],
+                "fixed_voyage_3_5": [0.5, 0.6],
+            },
+            top_k=3,
+        )
+        [(sql, params)] = conn.executed
+        assert sql.count("UNION ALL") == 2
+        assert params["k"] == 3
+        assert params["q1"] == "[0.3,0.4]"
+        assert params["v2"] == "fixed_voyage_3_5"
+        assert [r["node_id"] for r in results["semantic_voyage_3_large"]] == ["b"]
+        assert results["fixed_voyage_3_5"] == []
+
+    def test_no_variants(self):
+        conn = FakeConnection()
+        assert search_variants(conn, {}, top_k=3) == {}
+        assert conn.executed == []
+
+
+class TestStorageLayout:
+    def test_defaults_to_tables(self, monkeypatch):
+        monkeypatch.delenv("RAG_STORAGE_LAYOUT", raising=False)
+        assert storage_layout() == StorageLayout.TABLES
+        monkeypatch.setenv("RAG_STORAGE_LAYOUT", "sharded")
+        with pytest.raises(ValueError):
+            storage_layout()
+
+    @pytest.mark.parametrize("layout", ["tables", "partitioned"])
+    def test_partition_ensured_only_when_partitioned(self, monkeypatch, layout):
+        monkeypatch.setenv("RAG_STORAGE_LAYOUT", layout)
+        for var in ("POSTGRES_DB", "POSTGRES_PASSWORD", "POSTGRES_USER"):
+            monkeypatch.setenv(var, "rag")
+        with (
+            patch("rag_pipeline.partitions.ensure_partition") as ensure,
+            patch("rag_pipeline.store.PGVectorStore.from_params") as from_params,
+        ):
+            get_vector_store(*FIXED)
+        assert ensure.called == (layout == "partitioned")
+        assert from_params.call_args.kwargs["table_name"] == "fixed_voyage_3_large"
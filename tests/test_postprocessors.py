@@ -0,0 +1,99 @@
+import pytest
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from rag_pipeline.offline import FakeLLM, HashEmbedding
+from rag_pipeline.postprocessors import AdaptiveTopK, MinTopScore, cut_point, stats
+from rag_pipeline.query import get_query_engine
+
+TEXTS = [
+    "The MCL for bromate is 0.010 mg/L.",
+    "Bromate forms when ozone reacts with bromide.",
+    "Chlorite is limited to 1.0 mg/L.",
+    "Haloacetic acids are limited to 0.060 mg/L.",
+]
+
+
+def scored(*scores):
+    return [
+        NodeWithScore(node=TextNode(id_=str(i), text=f"chunk {i}"), score=score)
+        for i, score in enumerate(scores)
+    ]
+
+
+class CountingLLM(FakeLLM):
+    calls: int = 0
+
+    def _answer_tokens(self, prompt: str) -> list[str]:
+        self.calls += 1
+        return super()._answer_tokens(prompt)
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    stats.reset()
+
+
+@pytest.fixture
+def make_engine(monkeypatch):
+    """``get_query_engine`` over an in-memory index with a counting LLM."""
+    llm = CountingLLM()
+    index = VectorStoreIndex(
+        [TextNode(text=text) for text in TEXTS], embed_model=HashEmbedding()
+    )
+    monkeypatch.setattr("rag_pipeline.query._cached_llm", lambda llm_model: llm)
+    monkeypatch.setattr("rag_pipeline.query._cached_index", lambda s, m: index)
+
+    def make(**kwargs):
+        return get_query_engine("fixed", "voyage-3.5", similarity_top_k=4, **kwargs)
+
+    return make, llm
+
+
+class TestCutPoint:
+    def test_cuts_at_largest_gap(self):
+        assert cut_point([0.9, 0.5, 0.45, 0.4]) == 1
+        assert cut_point([0.9, 0.85, 0.8, 0.4, 0.38]) == 3
+
+    def test_flat_scores_keep_everything(self):
+        assert cut_point([0.6, 0.58, 0.57, 0.55]) == 4
+
+    def test_min_k(self):
+        assert cut_point([0.9, 0.5, 0.45, 0.2], min_k=2) == 3
+        assert cut_point([0.9], min_k=2) == 1
+        assert cut_point([]) == 0
+
+
+class TestAdaptiveTopK:
+    def test_sorts_cuts_and_records(self):
+        nodes = AdaptiveTopK().postprocess_nodes(scored(0.4, 0.9, 0.42))
+        assert [n.score for n in nodes] == [0.9]
+        AdaptiveTopK().postprocess_nodes(scored(0.6, 0.59))
+        assert stats.counts() == ({1: 1, 2: 1}, 0)
+        assert stats.summary() == "top-1: 1, top-2: 1"
+
+
+class TestMinTopScore:
+    def test_drops_all_below_threshold(self):
+        assert MinTopScore(min_score=0.5).postprocess_nodes(scored(0.4, 0.3)) == []
+        nodes = scored(0.6, 0.3)
+        assert MinTopScore(min_score=0.5).postprocess_nodes(nodes) == nodes
+        assert stats.counts() == ({}, 1)
+
+
+class TestQueryEngine:
+    def test_skip_avoids_llm(self, make_engine):
+        make, llm = make_engine
+        response = make(min_score=2.0, adaptive=True).query("bromate MCL")
+        assert response.source_nodes == []
+        assert llm.calls == 0
+        assert stats.counts() == ({}, 1)
+
+    def test_adaptive_keeps_at_most_top_k(self, make_engine):
+        make, llm = make_engine
+        response = make(min_score=-1.0, adaptive=True).query("bromate MCL")
+        assert 1 <= len(response.source_nodes) <= 4
+        assert llm.calls == 1
+        kept, skipped = stats.counts()
+        assert kept == {len(response.source_nodes): 1}
+        assert skipped == 0
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from rag_pipeline.offline import HashEmbedding
+from rag_pipeline.profiling import Profile, ProfilerBusy, current, span
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSpan:
+    def test_no_op_without_profile(self):
+        assert current() is None
+        with span("idle"):
+            pass
+
+    def test_records_stage_spans(self):
+        with Profile(interval=0.001) as profile:
+            with span("outer"):
+                with span("inner"):
+                    busy(0.02)
+        names = [(s.name, s.depth) for s in profile.spans]
+        assert names == [("inner", 1), ("outer", 0)]
+        totals = {name: ms for name, _, ms in profile.span_totals()}
+        assert totals["outer"] >= totals["inner"] >= 20
+        assert current() is None
+
+    def test_nested_same_name_counted_once(self):
+        with Profile() as profile:
+            with span("step"):
+                with span("step"):
+                    busy(0.01)
+        [(name, calls, ms)] = profile.span_totals()
+        assert calls == 2
+        assert ms == pytest.approx(max(s.ms for s in profile.spans))
+
+    def test_captures_llama_index_spans(self):
+        with Profile() as profile:
+            HashEmbedding().get_query_embedding("bromate")
+        assert "HashEmbedding.get_query_embedding" in {s.name for s in profile.spans}
+
+    def test_context_profile_ignores_other_threads(self):
+        def work():
+            with span("elsewhere"):
+                pass
+
+        with Profile(all_threads=False) as profile:
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        assert profile.spans == []
+
+
+class TestSampling:
+    def test_folded_stacks_start_with_stages(self):
+        with Profile(interval=0.001) as profile:
+            with span("hot"):
+                busy(0.05)
+        lines = profile.folded().splitlines()
+        assert lines
+        stack, count = lines[0].rsplit(" ", 1)
+        assert int(count) >= 1
+        hot = [line for line in lines if line.startswith("[hot];")]
+        assert any(f"{__name__}:busy" in line for line in hot)
+
+    def test_top_functions(self):
+        with Profile(interval=0.001) as profile:
+            busy(0.05)
+        top = profile.top()
+        assert top[0][0] == f"{__name__}:busy"
+        assert all(0 <= own <= total <= 1 for _, own, total in top)
+
+
+class TestCProfile:
+    def test_writes_pstats_and_summary(self, tmp_path):
+        with Profile("cprofile") as profile:
+            with span("hot"):
+                busy(0.01)
+        paths = profile.write(tmp_path / "run")
+        assert [p.name for p in paths] == ["run.pstats", "run.spans.json", "run.txt"]
+        summary = (tmp_path / "run.txt").read_text()
+        assert "hot" in summary
+        assert any("busy" in func for func, _, _ in profile.top())
+
+    def test_one_trace_at_a_time(self):
+        with Profile("cprofile"):
+            with pytest.raises(ProfilerBusy):
+                Profile("cprofile", all_threads=False).start()
+            assert current() is not None
+        with Profile("cprofile") as profile:
+            pass
+        assert profile.stats is not None
+
+    def test_rejects_unknown_mode(self):
+        with pytest.raises(ValueError):
+            Profile("perf")
+
+
+class TestServerTiming:
+    def test_sanitizes_span_names(self):
+        with Profile() as profile:
+            with span("index:fixed voyage"):
+                pass
+        header = profile.server_timing()
+        assert header.startswith("total;dur=")
+        assert "index_fixed_voyage;dur=" in header
@@ -1,4 +1,10 @@
-from rag_pipeline.query import DEFAULT_MODEL, DEFAULT_TOP_K
+import os
+from unittest.mock import patch
+
+from llama_index.llms.anthropic import Anthropic
+
+from rag_pipeline.offline import FakeLLM
+from rag_pipeline.query import DEFAULT_MODEL, DEFAULT_TOP_K, get_llm
 
 
 class TestQueryDefaults:
@@ -7,3 +13,23 @@ class TestQueryDefaults:
 
     def test_default_top_k(self):
         assert DEFAULT_TOP_K > 0
+
+
+class TestGetLLM:
+    @patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test-key"})
+    def test_defaults_to_anthropic(self):
+        assert isinstance(get_llm(), Anthropic)
+
+    @patch.dict(
+        os.environ,
+        {
+            "LLM_BACKEND": "fake",
+            "FAKE_LLM_LATENCY": "0.25",
+            "FAKE_LLM_TOKENS_PER_SEC": "40",
+        },
+    )
+    def test_fake_backend(self):
+        llm = get_llm()
+        assert isinstance(llm, FakeLLM)
+        assert llm.latency == 0.25
+        assert llm.tokens_per_second == 40
@@ -0,0 +1,137 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+from llama_index.core.schema import QueryBundle
+
+from rag_pipeline.cache import QUERY_EMBEDDINGS_COLLECTION
+from rag_pipeline.embed import EmbedModelName, get_embed_model
+from rag_pipeline.offline import HashEmbedding
+from rag_pipeline.query import query
+from rag_pipeline.query_vectors import (
+    PrecomputedQueryStore,
+    QueryVectors,
+    load_query_vectors,
+    load_questions,
+    precompute,
+)
+
+QUESTIONS = [
+    "What is the maximum contaminant level for bromate?",
+    "What are the BAT for PFAS removal?",
+]
+
+
+@pytest.fixture
+def hash_backend(monkeypatch):
+    monkeypatch.setenv("EMBED_BACKEND", "hash")
+    monkeypatch.delenv("RAG_QUERY_VECTORS", raising=False)
+    monkeypatch.delenv("RAG_CACHE_PATH", raising=False)
+    load_query_vectors.cache_clear()
+
+
+@pytest.fixture
+def vectors_file(hash_backend, tmp_path):
+    path = tmp_path / "query_vectors.npz"
+    precompute(QUESTIONS).save(path)
+    return path
+
+
+class TestLoadQuestions:
+    def test_reads_both_field_names_and_dedupes(self, tmp_path):
+        path = tmp_path / "q.jsonl"
+        rows = [
+            {"question": "a?"},
+            {"user_input": "b?", "reference": "b"},
+            {"question": " a? "},
+            {"answer": "skipped"},
+        ]
+        path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n")
+        assert load_questions([path]) == ["a?", "b?"]
+
+
+class TestPrecompute:
+    def test_one_matrix_per_model(self, hash_backend):
+        vectors = precompute(QUESTIONS)
+        assert set(vectors.vectors) == {m.value for m in EmbedModelName}
+        for matrix in vectors.vectors.values():
+            assert matrix.shape == (len(QUESTIONS), 1024)
+            assert matrix.dtype == np.float32
+
+    def test_matches_direct_embedding(self, hash_backend):
+        vectors = precompute(QUESTIONS, [EmbedModelName.VOYAGE_3_5])
+        direct = HashEmbedding(model_name="voyage-3.5").get_query_embedding(
+            QUESTIONS[1]
+        )
+        np.testing.assert_allclose(vectors.get("voyage-3.5", QUESTIONS[1]), direct)
+
+    def test_round_trip(self, vectors_file):
+        loaded = QueryVectors.load(vectors_file)
+        assert loaded.questions == QUESTIONS
+        assert loaded.backend == "hash"
+        assert loaded.get("voyage-law-2", QUESTIONS[0]).shape == (1024,)
+        assert loaded.get("voyage-law-2", "unknown?") is None
+
+
+class TestGetEmbedModelWithVectors:
+    def test_known_question_skips_embedding(self, vectors_file, monkeypatch):
+        monkeypatch.setenv("RAG_QUERY_VECTORS", str(vectors_file))
+        embed_model = get_embed_model(EmbedModelName.VOYAGE_3_LARGE)
+        assert isinstance(embed_model.query_cache, PrecomputedQueryStore)
+        expected = QueryVectors.load(vectors_file).get("voyage-3-large", QUESTIONS[0])
+        monkeypatch.setattr(
+            HashEmbedding, "_get_query_embedding", MagicMock(side_effect=AssertionError)
+        )
+        np.testing.assert_allclose(
+            embed_model.get_query_embedding(QUESTIONS[0]), expected
+        )
+
+    def test_documents_never_get_query_vectors(self, vectors_file, monkeypatch):
+        monkeypatch.setenv("RAG_QUERY_VECTORS", str(vectors_file))
+        embed_model = get_embed_model(EmbedModelName.VOYAGE_3_LARGE)
+        store = embed_model.query_cache
+        assert store.get(QUESTIONS[0], QUERY_EMBEDDINGS_COLLECTION) is not None
+        assert store.get(QUESTIONS[0], "embeddings") is None
+        with patch.object(
+            HashEmbedding, "_get_text_embeddings", return_value=[[0.5]]
+        ) as embed:
+            assert embed_model.get_text_embedding_batch([QUESTIONS[0]]) == [[0.5]]
+        embed.assert_called_once_with([QUESTIONS[0]])
+
+    def test_unknown_question_is_embedded(self, vectors_file, monkeypatch):
+        monkeypatch.setenv("RAG_QUERY_VECTORS", str(vectors_file))
+        embed_model = get_embed_model(EmbedModelName.VOYAGE_3_LARGE)
+        assert len(embed_model.get_query_embedding("Something new?")) == 1024
+
+    def test_falls_back_to_shared_cache(self, vectors_file, monkeypatch, tmp_path):
+        monkeypatch.setenv("RAG_QUERY_VECTORS", str(vectors_file))
+        monkeypatch.setenv("RAG_CACHE_PATH", str(tmp_path / "cache.sqlite"))
+        embed_model = get_embed_model(EmbedModelName.VOYAGE_3_5)
+        embed_model.get_query_embedding("Something new?")
+        store = embed_model.query_cache
+        assert (
+            store.fallback.get("Something new?", QUERY_EMBEDDINGS_COLLECTION)
+            is not None
+        )
+
+    def test_ignores_vectors_from_other_backend(self, vectors_file, monkeypatch):
+        monkeypatch.setenv("RAG_QUERY_VECTORS", str(vectors_file))
+        monkeypatch.setenv("EMBED_BACKEND", "voyage")
+        monkeypatch.setenv("VOYAGE_API_KEY", "test-key")
+        embed_model = get_embed_model(EmbedModelName.VOYAGE_3_5)
+        assert embed_model.query_cache is None
+
+
+class TestQueryWithEmbedding:
+    def test_passes_embedding_in_bundle(self):
+        engine = MagicMock()
+        query(engine, QUESTIONS[0], embedding=[0.1, 0.2])
+        (bundle,), _ = engine.query.call_args
+        assert isinstance(bundle, QueryBundle)
+        assert bundle.embedding == [0.1, 0.2]
+
+    def test_plain_question_without_embedding(self):
+        engine = MagicMock()
+        query(engine, QUESTIONS[0])
+        engine.query.assert_called_once_with(QUESTIONS[0])
@@ -0,0 +1,119 @@
+import pytest
+from llama_index.core import VectorStoreIndex
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+
+from rag_pipeline.chunkers import FixedSizeChunker, HierarchicalChunker
+from rag_pipeline.chunkset import LEVEL_KEY, ROOT_ID_KEY, ChunkSet
+from rag_pipeline.offline import HashEmbedding
+from rag_pipeline.query import get_query_engine
+from rag_pipeline.retrievers import (
+    CoarseToFineRetriever,
+    MissingHierarchyError,
+    flat_retrieve,
+    recall,
+)
+from tests.test_chunkset import DOCS
+
+QUESTION = "What is the maximum contaminant level for bromate?"
+
+
+class CountingEmbedding(HashEmbedding):
+    calls: int = 0
+
+    def _get_query_embedding(self, query: str) -> list[float]:
+        self.calls += 1
+        return super()._get_query_embedding(query)
+
+
+@pytest.fixture
+def chunks():
+    return ChunkSet.from_documents(HierarchicalChunker(chunk_sizes=[128, 64, 32]), DOCS)
+
+
+@pytest.fixture
+def embed_model():
+    return CountingEmbedding()
+
+
+@pytest.fixture
+def index(chunks, embed_model):
+    index = VectorStoreIndex(nodes=[], embed_model=embed_model)
+    for batch in chunks.iter_nodes():
+        index.insert_nodes(batch)
+    return index
+
+
+class TestCoarseToFineRetriever:
+    def test_returns_descendants_of_top_roots(self, index, embed_model):
+        retriever = CoarseToFineRetriever(
+            index, embed_model, similarity_top_k=4, parent_top_k=1
+        )
+        bundle = QueryBundle(QUESTION)
+        (root,) = retriever.retrieve_roots(bundle)
+        results = retriever.retrieve(bundle)
+        assert 0 < len(results) <= 4
+        for result in results:
+            assert result.node.metadata[ROOT_ID_KEY] == root.node.node_id
+            assert result.node.metadata[LEVEL_KEY] > 0
+
+    def test_roots_are_level_zero(self, index, embed_model):
+        retriever = CoarseToFineRetriever(index, embed_model, parent_top_k=2)
+        roots = retriever.retrieve_roots(QueryBundle(QUESTION))
+        assert len(roots) == 2
+        assert all(r.node.metadata[LEVEL_KEY] == 0 for r in roots)
+
+    def test_embeds_query_once(self, index, embed_model):
+        retriever = CoarseToFineRetriever(index, embed_model)
+        embed_model.calls = 0
+        retriever.retrieve(QUESTION)
+        assert embed_model.calls == 1
+
+    def test_uses_supplied_embedding(self, index, embed_model):
+        bundle = QueryBundle(
+            QUESTION, embedding=embed_model.get_query_embedding(QUESTION)
+        )
+        embed_model.calls = 0
+        CoarseToFineRetriever(index, embed_model).retrieve(bundle)
+        assert embed_model.calls == 0
+
+    def test_all_roots_matches_flat_search(self, index, embed_model, chunks):
+        n_roots = int((chunks.hierarchy()[0] == 0).sum())
+        retriever = CoarseToFineRetriever(index, embed_model, parent_top_k=n_roots)
+        bundle = QueryBundle(QUESTION)
+        coarse = retriever.retrieve(bundle)
+        assert recall(coarse, flat_retrieve(index, bundle)) == 1.0
+
+    def test_index_without_hierarchy_metadata(self):
+        nodes = FixedSizeChunker(chunk_size=64, chunk_overlap=10).chunk(DOCS)
+        embed_model = HashEmbedding()
+        index = VectorStoreIndex(nodes=nodes, embed_model=embed_model)
+        with pytest.raises(MissingHierarchyError, match="--rechunk"):
+            CoarseToFineRetriever(index, embed_model).retrieve(QUESTION)
+
+    def test_empty_index(self):
+        embed_model = HashEmbedding()
+        index = VectorStoreIndex(nodes=[], embed_model=embed_model)
+        assert CoarseToFineRetriever(index, embed_model).retrieve(QUESTION) == []
+
+
+class TestRecall:
+    def node(self, node_id: str) -> NodeWithScore:
+        return NodeWithScore(node=TextNode(id_=node_id, text=node_id), score=1.0)
+
+    def test_partial_overlap(self):
+        retrieved = [self.node("a"), self.node("b")]
+        reference = [self.node("a"), self.node("c")]
+        assert recall(retrieved, reference) == 0.5
+
+    def test_empty_reference(self):
+        assert recall([self.node("a")], []) == 1.0
+
+
+class TestQueryEngineOption:
+    def test_rejects_flat_strategies(self, monkeypatch):
+        monkeypatch.setattr("rag_pipeline.query._cached_llm", lambda llm_model: None)
+        monkeypatch.setattr(
+            "rag_pipeline.query._cached_index", lambda strategy, model: None
+        )
+        with pytest.raises(ValueError, match="hierarchical"):
+            get_query_engine("fixed", "voyage-3.5", coarse_to_fine=True)
@@ -0,0 +1,135 @@
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from eval.analysis import METRICS, VARIANTS
+from eval.sharding import (
+    QUESTIONS_FILE,
+    load_eval_questions,
+    merge_shards,
+    parse_shard,
+    question_set_key,
+    shard_units,
+    shards_dir,
+    split_results,
+    work_units,
+    write_unit,
+)
+
+QUESTIONS = [{"user_input": f"q{i}?", "reference": f"r{i}"} for i in range(7)]
+
+
+def evaluate_unit(unit):
+    """Deterministic stand-in for a RAGAS run over one unit."""
+    indices = range(unit.start, unit.stop)
+    return {
+        "strategy": unit.strategy,
+        "model": unit.model,
+        "start": unit.start,
+        "stop": unit.stop,
+        "per_sample": {m: [i / 10 for i in indices] for m in METRICS},
+        "samples": [{"user_input": f"q{i}?"} for i in indices],
+    }
+
+
+class TestLoadEvalQuestions:
+    def test_bundled_questions(self):
+        questions = load_eval_questions(QUESTIONS_FILE)
+        assert len(questions) == 8
+        assert all(q["user_input"] and q["reference"] for q in questions)
+
+    def test_jsonl_accepts_question_field(self, tmp_path):
+        path = tmp_path / "q.jsonl"
+        path.write_text(
+            json.dumps({"question": "a?", "reference": "a"})
+            + "\n\n"
+            + json.dumps({"user_input": "b?", "reference": "b", "extra": 1})
+            + "\n"
+        )
+        assert load_eval_questions(path) == [
+            {"user_input": "a?", "reference": "a"},
+            {"user_input": "b?", "reference": "b"},
+        ]
+
+    def test_parquet(self, tmp_path):
+        path = tmp_path / "q.parquet"
+        pq.write_table(pa.Table.from_pylist(QUESTIONS), path)
+        assert load_eval_questions(path) == QUESTIONS
+
+
+class TestWorkUnits:
+    def test_cover_every_variant_and_question(self):
+        units = work_units(7, unit_size=3)
+        assert len(units) == len(VARIANTS) * 3
+        assert [u.variant for u in units[::3]] == VARIANTS
+        assert [(u.start, u.stop) for u in units[:3]] == [(0, 3), (3, 6), (6, 7)]
+
+    @pytest.mark.parametrize("count", [1, 2, 5, 27, 40])
+    def test_shards_partition_units(self, count):
+        units = work_units(7, unit_size=3)
+        shards = [shard_units(units, i, count) for i in range(count)]
+        assert [u for shard in shards for u in shard] == units
+
+    def test_parse_shard(self):
+        assert parse_shard("2/8") == (2, 8)
+        for bad in ["8/8", "-1/4", "1/0", "1", "a/b"]:
+            with pytest.raises(ValueError):
+                parse_shard(bad)
+
+    def test_question_set_key_changes_with_questions(self):
+        changed = [*QUESTIONS[:-1], {"user_input": "other?", "reference": "r6"}]
+        assert question_set_key(QUESTIONS) == question_set_key(list(QUESTIONS))
+        assert question_set_key(QUESTIONS) != question_set_key(changed)
+        assert shards_dir(QUESTIONS, 3) != shards_dir(QUESTIONS, 4)
+
+
+class TestMergeShards:
+    def test_independent_of_completion_order(self, tmp_path):
+        units = work_units(len(QUESTIONS), unit_size=3)
+        merged = []
+        for order in (units, units[::-1]):
+            out_dir = tmp_path / str(len(merged))
+            for unit in order:
+                write_unit(unit.path(out_dir), evaluate_unit(unit))
+            merged.append(merge_shards(out_dir, len(QUESTIONS)))
+        assert json.dumps(merged[0]) == json.dumps(merged[1])
+
+        variant = merged[0][VARIANTS[0]]
+        assert list(merged[0]) == VARIANTS
+        assert variant["per_sample"][METRICS[0]] == [i / 10 for i in range(7)]
+        assert variant["scores"][METRICS[0]] == pytest.approx(0.3)
+        assert [s["user_input"] for s in variant["samples"]] == [
+            q["user_input"] for q in QUESTIONS
+        ]
+
+    def test_skips_incomplete_variants(self, tmp_path):
+        units = work_units(len(QUESTIONS), unit_size=3)
+        for unit in units:
+            if not (unit.variant == VARIANTS[1] and unit.start == 3):
+                write_unit(unit.path(tmp_path), evaluate_unit(unit))
+        results = merge_shards(tmp_path, len(QUESTIONS))
+        assert VARIANTS[1] not in results
+        assert len(results) == len(VARIANTS) - 1
+
+
+class TestSplitResults:
+    def test_round_trips_unsharded_results(self, tmp_path):
+        units = work_units(len(QUESTIONS), unit_size=len(QUESTIONS))
+        for unit in units:
+            write_unit(unit.path(tmp_path / "full"), evaluate_unit(unit))
+        results = merge_shards(tmp_path / "full", len(QUESTIONS))
+
+        split_results(results, QUESTIONS, tmp_path / "split", unit_size=3)
+        assert merge_shards(tmp_path / "split", len(QUESTIONS)) == results
+
+    def test_ignores_other_question_sets(self, tmp_path):
+        results = {
+            VARIANTS[0]: {
+                "per_sample": {m: [1.0] for m in METRICS},
+                "samples": [{"user_input": "elsewhere?"}],
+            }
+        }
+        split_results(results, QUESTIONS, tmp_path, unit_size=3)
+        assert not any(tmp_path.iterdir())
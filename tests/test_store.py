@@ -1,6 +1,10 @@
-from rag_pipeline.chunkers import ChunkStrategy
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+
+from rag_pipeline.chunkers import ChunkStrategy, FixedSizeChunker
+from rag_pipeline.chunkset import ChunkSet
 from rag_pipeline.embed import EmbedModelName
-from rag_pipeline.store import make_table_name
+from rag_pipeline.store import build_index, make_table_name
+from tests.test_chunkset import DOCS
 
 
 class TestMakeTableName:
@@ -25,3 +29,41 @@ class TestMakeTableName:
             for m in EmbedModelName:
                 name = make_table_name(s, m)
                 assert name.isidentifier(), f"{name} is not a valid identifier"
+
+
+class RowVectorStore(BasePydanticVectorStore):
+    """Insert-only rows, like a PGVectorStore table."""
+
+    stores_text: bool = True
+    rows: list = []
+
+    @property
+    def client(self):
+        return None
+
+    def add(self, nodes, **kwargs):
+        self.rows.extend(node.node_id for node in nodes)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id, **kwargs):
+        raise NotImplementedError
+
+    def clear(self):
+        self.rows.clear()
+
+    def query(self, query, **kwargs):
+        raise NotImplementedError
+
+
+class TestBuildIndex:
+    def test_rebuilding_keeps_one_row_per_chunk(self, monkeypatch):
+        monkeypatch.setenv("EMBED_BACKEND", "hash")
+        monkeypatch.delenv("RAG_CACHE_PATH", raising=False)
+        store = RowVectorStore(rows=[])
+        monkeypatch.setattr("rag_pipeline.store.get_vector_store", lambda s, m: store)
+        chunks = ChunkSet.from_documents(FixedSizeChunker(chunk_size=64), DOCS)
+        for _ in range(2):
+            build_index(chunks, ChunkStrategy.FIXED, EmbedModelName.VOYAGE_3_5)
+        assert sorted(store.rows) == sorted(
+            chunks.node_id(i) for i in range(len(chunks))
+        )